@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compares the transports of SchedyDB when many threads pull and push jobs
+concurrently, against a local stand-in of the Schedy service that speaks both
+HTTP/1.1 and HTTP/2 (cleartext, with prior knowledge).
+
+The stand-in runs in a separate process, and serves an in-memory SQLite
+backend (see schedy.sqlite) with Hypercorn. It adds a fixed latency to each
+response to emulate the network, and counts the connections opened by the
+clients.
+
+Requires Python 3, hypercorn and httpx[http2].
+
+Usage: python benchmarks/http2_transport.py [-t THREADS] [-j JOBS] [-l LATENCY_MS]
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schedy
+from schedy.sqlite import SQLiteBackend
+from schedy.transport import Headers, HTTP2Transport
+
+class StandInApp(object):
+    def __init__(self, latency):
+        self.latency = latency
+        self.backend = SQLiteBackend('memory://', memory=True)
+        self.connections = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['path'] == '/connections':
+            # Returns and resets the number of connections
+            content = json.dumps(len(self.connections)).encode('ascii')
+            self.connections.clear()
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-length', str(len(content)).encode('ascii'))]})
+            await send({'type': 'http.response.body', 'body': content})
+            return
+        self.connections.add(tuple(scope['client']))
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        headers = Headers((k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers'])
+        params = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+        response = self.backend.request(scope['method'], scope['path'], params=params, data=body.decode('utf-8') or None, headers=headers)
+        await asyncio.sleep(self.latency)
+        content = response.text.encode('utf-8')
+        response_headers = [(k.encode('latin-1'), str(v).encode('latin-1')) for k, v in response.headers.items()]
+        response_headers.append((b'content-length', str(len(content)).encode('ascii')))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+def serve(latency, port):
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+    config = Config()
+    config.bind = ['127.0.0.1:{}'.format(port)]
+    config.accesslog = None
+    config.errorlog = None
+    config.keep_alive_timeout = 60
+    # Hypercorn closes a connection after 1000 requests by default, which
+    # would measure the reconnections rather than the multiplexing
+    config.keep_alive_max_requests = 10 ** 9
+    asyncio.run(hypercorn_serve(StandInApp(latency), config))
+
+def start_server(latency, port):
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', '-l', str(latency), '-p', str(port)])
+    url = 'http://127.0.0.1:{}/'.format(port)
+    for _ in range(100):
+        try:
+            urlopen(url + 'connections').read()
+            return server, url
+        except IOError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('The stand-in service did not start.')
+
+def run_transport(name, transport, url, num_threads, num_jobs):
+    db = schedy.SchedyDB(config_override={'root': url, 'email': 'bench', 'token': 'bench'}, max_connections=num_threads, transport=transport)
+    exp = schedy.ManualSearch('bench-{}'.format(name))
+    db.add_experiment(exp)
+    for i in range(num_jobs):
+        exp.add_job(hyperparameters={'i': i})
+
+    def work():
+        while True:
+            try:
+                job = exp.next_job()
+            except schedy.errors.NoJobError:
+                return
+            job.results = {'loss': job.hyperparameters['i']}
+            job.status = schedy.Job.DONE
+            job.put()
+
+    threads = [threading.Thread(target=work) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the transports of SchedyDB.')
+    parser.add_argument('-t', '--threads', type=int, default=64, help='Number of worker threads.')
+    parser.add_argument('-j', '--jobs', type=int, default=1000, help='Number of jobs to process.')
+    parser.add_argument('-l', '--latency', type=float, default=5, help='Latency added to each response, in milliseconds.')
+    parser.add_argument('-p', '--port', type=int, default=8765, help='Port of the stand-in service.')
+    parser.add_argument('--serve', action='store_true', help='Only run the stand-in service.')
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.latency / 1000, args.port)
+        return
+    server, url = start_server(args.latency, args.port)
+    try:
+        transports = [
+            ('requests', 'requests'),
+            ('http.client', 'http.client'),
+            # Cleartext HTTP/2 must be used with prior knowledge
+            ('http2', HTTP2Transport(args.threads, http1=False)),
+        ]
+        for name, transport in transports:
+            elapsed = run_transport(name, transport, url, args.threads, args.jobs)
+            num_connections = json.loads(urlopen(url + 'connections').read().decode('ascii'))
+            print('{:<12} {:8.1f} jobs/s ({} connections)'.format(name, args.jobs / elapsed, num_connections))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == '__main__':
+    main()
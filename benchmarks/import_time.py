@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Measures the time needed to import Schedy and to start the command line tool,
+and checks that heavy modules are not imported before they are needed.
+
+Usage: python benchmarks/import_time.py [-n NUM_RUNS]
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+#: Modules that should not be imported at startup.
+HEAVY_MODULES = ('numpy', 'requests', 'urllib3', 'tabulate', 'subprocess')
+
+SCENARIOS = [
+    ('import schedy', 'import schedy'),
+    ('import schedy.cmd', 'import schedy.cmd'),
+    ('schedy --help', 'import sys; sys.argv = ["schedy", "--help"]\nimport schedy.cmd\ntry:\n    schedy.cmd.main()\nexcept SystemExit:\n    pass'),
+]
+
+REPORT_CODE = '''
+import sys, json
+{code}
+sys.stdout = sys.__stdout__
+print()
+print(json.dumps([m for m in {modules!r} if m in sys.modules]))
+'''
+
+def run_scenario(code, num_runs):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [env.get('PYTHONPATH')] if p])
+    timer = timeit.Timer(lambda: subprocess.check_output([sys.executable, '-c', code], env=env))
+    times = sorted(timer.repeat(repeat=num_runs, number=1))
+    baseline = sorted(timeit.Timer(lambda: subprocess.check_output([sys.executable, '-c', 'pass'])).repeat(repeat=num_runs, number=1))
+    output = subprocess.check_output([sys.executable, '-c', REPORT_CODE.format(code=code, modules=HEAVY_MODULES)], env=env)
+    loaded = json.loads(output.decode().strip().splitlines()[-1])
+    return times[len(times) // 2], baseline[len(baseline) // 2], loaded
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Schedy import and startup times.')
+    parser.add_argument('-n', '--num-runs', type=int, default=20, help='Number of runs per scenario.')
+    args = parser.parse_args()
+    for name, code in SCENARIOS:
+        median, baseline, loaded = run_scenario(code, args.num_runs)
+        print('{:<20} {:7.1f} ms (interpreter: {:5.1f} ms, heavy modules loaded: {})'.format(
+            name,
+            median * 1000,
+            baseline * 1000,
+            ', '.join(loaded) or 'none'))
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import schedy
+import schedy.artifacts
 import keras
 from keras.datasets import mnist
 from keras.models import Model
@@ -42,9 +43,10 @@ def make_model(job):
         loss=keras.losses.categorical_crossentropy,
         metrics=['accuracy'],
     )
-    # Reload the weights if we are resuming from previous work
-    weights_path = job.results.get('weights_path')
-    if weights_path:
+    # Reload the weights if we are resuming from previous work. The weights
+    # are inherited from the previous job without being copied.
+    if 'weights' in job.results.get(schedy.artifacts.ARTIFACTS_RESULT, {}):
+        weights_path = job.load_artifact('weights')
         model.load_weights(weights_path)
         print('Reloaded weights from ' + weights_path)
     return model
@@ -77,10 +79,12 @@ def main(args):
         job.results['min_loss'] = min(job.results['loss'])
         job.results['max_accuracy'] = max(job.results['accuracy'])
         # Do not forget to save the weights, as the next job that will need to
-        # load these
+        # load these. They are moved to the artifact store, which only keeps
+        # one copy of identical checkpoints.
         weights_path = os.path.join(args.models_dir, job.job_id + '.h5')
-        job.results['weights_path'] = weights_path
         model.save_weights(weights_path)
+        job.save_artifact('weights', weights_path)
+        os.remove(weights_path)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -5,4 +5,5 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 from .core import *
 from .experiments import *
 from .jobs import *
+from .worker import *
 
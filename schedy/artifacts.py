@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+'''
+Content-addressed store for the files produced by the jobs (e.g. the
+checkpoints of a model).
+
+Each file is stored once, under the SHA-256 hash of its content, and the jobs
+only record the hashes of their artifacts in their results (under
+:py:data:`ARTIFACTS_RESULT`). When a job continues the training of another job
+(e.g. with Population Based Training), it inherits these results, and thus
+the checkpoints, without copying any file.
+
+Files are added to the store with a reflink (copy-on-write clone) when the
+file system supports it, so that storing a checkpoint does not copy it
+either, and are copied otherwise. The files of the store are read-only, and
+never share their content with the files of the user, which can thus be
+overwritten (e.g. with the checkpoint of the next job).
+
+To share the artifacts between several machines, the directory of the store
+must be on a shared file system. It is set with the ``artifacts_dir`` key of
+the configuration, and defaults to ``~/.schedy/artifacts``.
+
+Example:
+    >>> with exp.next_job() as job:
+    >>>     if 'weights' in job.results.get(schedy.artifacts.ARTIFACTS_RESULT, {}):
+    >>>         model.load_weights(job.load_artifact('weights'))
+    >>>     model.fit(...)
+    >>>     # Overwriting the file of the previous job leaves its artifact intact
+    >>>     model.save_weights('weights.h5')
+    >>>     job.save_artifact('weights', 'weights.h5')
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import time
+import uuid
+
+import six
+
+logger = logging.getLogger(__name__)
+
+#: Name of the result containing the artifacts of a job, as a dictionary
+#: mapping the name of each artifact to the hash of its content.
+ARTIFACTS_RESULT = 'artifacts'
+
+_CHUNK_SIZE = 1 << 20
+# ioctl request of Linux to clone a file (copy-on-write)
+_FICLONE = 0x40049409
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+def _default_artifacts_dir():
+    return os.path.join(os.path.expanduser('~'), '.schedy', 'artifacts')
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+def _reflink(source, destination):
+    import fcntl
+    with open(source, 'rb') as source_file:
+        with open(destination, 'wb') as destination_file:
+            fcntl.ioctl(destination_file.fileno(), _FICLONE, source_file.fileno())
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ArtifactStore(object):
+    def __init__(self, root=None):
+        '''
+        Store of artifacts in a local (or shared) directory. The directory is
+        created when the first artifact is added.
+
+        Args:
+            root (str): Path to the directory of the store. By default,
+                ``~/.schedy/artifacts`` is used.
+        '''
+        self.root = root if root is not None else _default_artifacts_dir()
+
+    def path(self, digest):
+        '''
+        Returns the path to the file of an artifact.
+
+        Args:
+            digest (str): Hash of the artifact.
+
+        Returns:
+            str: The path to the file, which might not exist.
+        '''
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:])
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def add(self, path_or_bytes):
+        '''
+        Adds a file to the store, unless a file with the same content is
+        stored already.
+
+        A file is added with a reflink if possible, and copied otherwise.
+        Either way, the file given as argument can be modified afterwards
+        without changing the artifact.
+
+        Args:
+            path_or_bytes (str or bytes): Path to the file, or content of the
+                artifact (as a ``bytearray`` with Python 2).
+
+        Returns:
+            str: The hash of the artifact.
+        '''
+        tmp_dir = os.path.join(self.root, 'tmp')
+        _makedirs(tmp_dir)
+        # With Python 2, paths are byte strings too
+        if isinstance(path_or_bytes, bytearray) or (six.PY3 and isinstance(path_or_bytes, bytes)):
+            digest = hashlib.sha256(path_or_bytes).hexdigest()
+            if self._touch(digest):
+                return digest
+            fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(path_or_bytes)
+        else:
+            digest = _file_digest(path_or_bytes)
+            if self._touch(digest):
+                return digest
+            tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+            self._clone(path_or_bytes, tmp_path)
+        self._store(tmp_path, digest)
+        return digest
+
+    def _store(self, tmp_path, digest):
+        # Moves a temporary file of the store to the path of its content,
+        # which it must not share with any file of the user
+        try:
+            os.chmod(tmp_path, _READ_ONLY)
+            blob_path = self.path(digest)
+            _makedirs(os.path.dirname(blob_path))
+            # Atomic, so that concurrent workers adding the same content never
+            # see an incomplete file
+            os.rename(tmp_path, blob_path)
+        except OSError:
+            # On Windows, renaming fails if another worker added the same
+            # content in the meantime
+            if digest not in self:
+                raise
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+
+    def _touch(self, digest):
+        # Returns whether the artifact is stored. Its ctime is updated, so
+        # that collect_garbage keeps it until the results of the job which
+        # added it again are updated.
+        try:
+            os.utime(self.path(digest), None)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                return False
+            if e.errno not in (errno.EPERM, errno.EACCES):
+                raise
+            # Added by another user
+            logger.debug('Could not update the time of artifact %s.', digest, exc_info=True)
+            return digest in self
+        return True
+
+    def _clone(self, source, destination):
+        # A hard link would be cheaper, but the artifact would then change
+        # when the file of the user is overwritten
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            _reflink(source, destination)
+            return
+        except (ImportError, IOError, OSError):
+            if os.path.lexists(destination):
+                os.remove(destination)
+        logger.debug('Could not clone %s into the artifact store, copying it.', source)
+        shutil.copyfile(source, destination)
+
+    def refcounts(self, experiments):
+        '''
+        Counts the references to each artifact, that is to say the number of
+        jobs whose results contain it.
+
+        Args:
+            experiments (list of schedy.Experiment): Experiments whose jobs
+                use this store.
+
+        Returns:
+            dict: A dictionary mapping the hash of each referenced artifact to
+            its number of references.
+        '''
+        counts = dict()
+        for experiment in experiments:
+            for job in experiment.all_jobs(fields=['results.' + ARTIFACTS_RESULT]):
+                for digest in set((job.results.get(ARTIFACTS_RESULT) or {}).values()):
+                    counts[digest] = counts.get(digest, 0) + 1
+        return counts
+
+    def collect_garbage(self, experiments, grace_period=60 * 60):
+        '''
+        Deletes the artifacts that are not referenced by any job anymore.
+
+        Artifacts are added to the store before the results of their job are
+        updated, so the artifacts added recently are always kept.
+
+        Args:
+            experiments (list of schedy.Experiment): All the experiments
+                whose jobs use this store. The artifacts of any other
+                experiment are deleted.
+            grace_period (float): Age of the most recent artifacts that are
+                kept even if they are not referenced, in seconds.
+
+        Returns:
+            list: The hashes of the deleted artifacts.
+        '''
+        counts = self.refcounts(experiments)
+        objects_dir = os.path.join(self.root, 'objects')
+        if not os.path.isdir(objects_dir):
+            return []
+        deleted = []
+        min_ctime = time.time() - grace_period
+        for prefix in os.listdir(objects_dir):
+            prefix_dir = os.path.join(objects_dir, prefix)
+            for suffix in os.listdir(prefix_dir):
+                digest = prefix + suffix
+                if counts.get(digest, 0) > 0:
+                    continue
+                blob_path = os.path.join(prefix_dir, suffix)
+                # The ctime changes when the artifact is linked into the store
+                if os.stat(blob_path).st_ctime > min_ctime:
+                    continue
+                os.remove(blob_path)
+                deleted.append(digest)
+        return deleted
+
+def _save_artifact(job, name, path_or_bytes, store):
+    digest = store.add(path_or_bytes)
+    artifacts = dict(job.results.get(ARTIFACTS_RESULT) or {})
+    artifacts[name] = digest
+    results = dict(job.results)
+    results[ARTIFACTS_RESULT] = artifacts
+    job.results = results
+    return digest
+
+def _load_artifact(job, name, store):
+    artifacts = job.results.get(ARTIFACTS_RESULT) or {}
+    if name not in artifacts:
+        raise KeyError('Job {} has no artifact named {!r}.'.format(job.job_id, name))
+    path = store.path(artifacts[name])
+    if not os.path.exists(path):
+        raise IOError(errno.ENOENT, 'Artifact {!r} of job {} is missing from the store'.format(name, job.job_id), path)
+    return path
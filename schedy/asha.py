@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+'''
+Client-side Asynchronous Successive Halving (ASHA) scheduler (see `paper
+<https://arxiv.org/pdf/1810.05934.pdf>`_).
+
+Each job trains a configuration with a budget (e.g. a number of epochs) given
+by a hyperparameter. The jobs of the lowest budget start from random
+configurations. As soon as a job is among the best of its budget, a
+continuation job is queued with the same configuration and a larger budget.
+Jobs are never delayed to wait for other jobs.
+
+Example:
+    >>> exp = db.get_experiment('ManualExperiment')
+    >>> scheduler = schedy.asha.ASHAScheduler(exp, {
+    >>>     'learning_rate': schedy.random.LogUniform(1e-5, 1e-1),
+    >>> }, result_name='loss', min_resource=1, max_resource=27, max_configs=243)
+    >>> while True:
+    >>>     scheduler.fill_queue(num_workers)
+    >>>     time.sleep(10)
+
+The worker uses ``job.hyperparameters['resource']`` as its budget, and can
+resume the training of the job ``job.hyperparameters.get('asha_parent')``.
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+import math
+
+from . import errors
+from .jobs import Job
+from .pbt import MINIMIZE, MAXIMIZE
+from .random import _make_rng
+
+logger = logging.getLogger(__name__)
+
+class ASHAScheduler(object):
+    def __init__(self, experiment, distributions, result_name, objective=MINIMIZE, min_resource=1, max_resource=81, reduction_factor=3, max_configs=None, resource_name='resource', parent_name='asha_parent', seed=None):
+        '''
+        Schedules the jobs of an experiment (usually a
+        :py:class:`schedy.ManualSearch`) using Asynchronous Successive
+        Halving. Requires NumPy.
+
+        The budget of the jobs of rung ``k`` is ``min_resource *
+        reduction_factor ** k``, up to ``max_resource``. A job of rung ``k``
+        is promoted to rung ``k + 1`` if it is among the best
+        ``1 / reduction_factor`` completed jobs of its rung.
+
+        A completed job is marked as ``PRUNED`` when it can no longer be
+        promoted. Since more jobs can always complete, this is only known
+        when the number of configurations is bounded by ``max_configs``.
+
+        Args:
+            experiment (schedy.Experiment): Experiment whose jobs are
+                scheduled.
+            distributions (dict): A dictionary of distributions (see
+                :py:mod:`schedy.random`) from which the configurations of the
+                lowest rung are sampled.
+            result_name (str): The name of the result to optimize. Jobs
+                without this result cannot be promoted.
+            objective (str): The objective of the optimization, either
+                :py:attr:`schedy.pbt.MINIMIZE` or
+                :py:attr:`schedy.pbt.MAXIMIZE`.
+            min_resource (int): Budget of the jobs of the lowest rung.
+            max_resource (int): Maximum budget of a job.
+            reduction_factor (int): Inverse of the proportion of the jobs of
+                a rung that are promoted.
+            max_configs (int): Maximum number of configurations to try. By
+                default, new configurations are queued whenever no job can be
+                promoted, and no job is ever pruned.
+            resource_name (str): Name of the hyperparameter containing the
+                budget of a job.
+            parent_name (str): Name of the hyperparameter containing the id
+                of the job continued by a job (for jobs above the lowest
+                rung).
+            seed (numpy.random.Generator or int): Random generator, or seed of
+                a new generator.
+        '''
+        if objective not in (MINIMIZE, MAXIMIZE):
+            raise ValueError('Invalid objective: {!r}.'.format(objective))
+        if reduction_factor < 2:
+            raise ValueError('The reduction factor must be at least 2, found {}.'.format(reduction_factor))
+        if not 0 < min_resource <= max_resource:
+            raise ValueError('Expected 0 < min_resource <= max_resource.')
+        self.experiment = experiment
+        self.distributions = distributions
+        self.result_name = result_name
+        self.objective = objective
+        self.min_resource = min_resource
+        self.max_resource = max_resource
+        self.reduction_factor = reduction_factor
+        self.max_configs = max_configs
+        self.resource_name = resource_name
+        self.parent_name = parent_name
+        self._rng = _make_rng(seed)
+        # Small tolerance so that exact powers are not rounded down
+        self.num_rungs = int(math.floor(math.log(max_resource / min_resource) / math.log(reduction_factor) + 1e-9)) + 1
+
+    def resource(self, rung):
+        '''
+        Returns the budget of the jobs of a rung.
+
+        Args:
+            rung (int): Index of the rung, starting at 0.
+
+        Returns:
+            The budget of the jobs of this rung.
+        '''
+        return self.min_resource * self.reduction_factor ** rung
+
+    def fill_queue(self, num_jobs):
+        '''
+        Promotes the best jobs and queues new configurations until
+        ``num_jobs`` jobs are queued, then prunes the jobs that can no
+        longer be promoted.
+
+        Args:
+            num_jobs (int): Number of queued jobs to reach, usually the number
+                of workers.
+
+        Returns:
+            list of :py:class:`schedy.Job`: The new jobs.
+        '''
+        state = self._load_state()
+        new_jobs = []
+        num_missing = num_jobs - state.num_queued
+        while num_missing > 0:
+            hyperparameters = self._promote(state)
+            if hyperparameters is None:
+                if self.max_configs is not None and state.num_configs >= self.max_configs:
+                    break
+                hyperparameters = self._sample_config()
+                state.num_configs += 1
+            job = self.experiment.add_job(hyperparameters=hyperparameters)
+            state.totals[self._rung(job)] += 1
+            new_jobs.append(job)
+            num_missing -= 1
+        self._prune(state)
+        return new_jobs
+
+    def _rung(self, job):
+        try:
+            resource = float(job.hyperparameters[self.resource_name])
+        except (KeyError, TypeError, ValueError):
+            return None
+        rung = int(round(math.log(resource / self.min_resource) / math.log(self.reduction_factor)))
+        if not 0 <= rung < self.num_rungs:
+            return None
+        return rung
+
+    def _loss(self, job):
+        try:
+            loss = float(job.results[self.result_name])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if math.isnan(loss):
+            return None
+        return -loss if self.objective == MAXIMIZE else loss
+
+    def _load_state(self):
+        state = _ASHAState(self.num_rungs)
+        fields = ['hyperparameters', 'results.' + self.result_name]
+        for job in self.experiment.all_jobs(fields=fields):
+            rung = self._rung(job)
+            if rung is None:
+                continue
+            if rung == 0:
+                state.num_configs += 1
+            state.totals[rung] += 1
+            if job.status == Job.QUEUED:
+                state.num_queued += 1
+            if job.status not in (Job.QUEUED, Job.RUNNING):
+                state.settled[rung] += 1
+            parent = job.hyperparameters.get(self.parent_name)
+            if parent is not None:
+                state.promoted.add(str(parent))
+            if job.status in (Job.DONE, Job.PRUNED):
+                loss = self._loss(job)
+                if loss is not None:
+                    state.completed[rung].append((loss, job))
+        for jobs in state.completed:
+            jobs.sort(key=lambda item: item[0])
+        return state
+
+    def _promote(self, state):
+        # Promote from the highest rungs first, so that the best
+        # configurations finish as early as possible
+        for rung in reversed(range(self.num_rungs - 1)):
+            completed = state.completed[rung]
+            num_promotable = len(completed) // self.reduction_factor
+            for _, job in completed[:num_promotable]:
+                if job.job_id in state.promoted or job.status == Job.PRUNED:
+                    continue
+                state.promoted.add(job.job_id)
+                hyperparameters = dict(job.hyperparameters)
+                hyperparameters[self.resource_name] = self.resource(rung + 1)
+                hyperparameters[self.parent_name] = job.job_id
+                return hyperparameters
+        return None
+
+    def _sample_config(self):
+        hyperparameters = {name: dist.sample(1, self._rng).tolist()[0] for name, dist in self.distributions.items()}
+        hyperparameters[self.resource_name] = self.resource(0)
+        return hyperparameters
+
+    def _prune(self, state):
+        if self.max_configs is None:
+            return
+        # Upper bound of the final number of jobs of the current rung: the
+        # existing jobs, plus one for each job of the previous rung that can
+        # still be promoted, either because it is not finished yet (or not
+        # even created), or because it is completed and not pruned
+        max_size = max(self.max_configs, state.totals[0])
+        # The jobs of the highest rung are final and never pruned
+        for rung in range(self.num_rungs - 1):
+            # Later jobs can only push a job down the ranking of its rung
+            num_promotable = max_size // self.reduction_factor
+            candidates = 0
+            for rank, (_, job) in enumerate(state.completed[rung]):
+                if job.job_id in state.promoted or job.status == Job.PRUNED:
+                    continue
+                if rank < num_promotable:
+                    candidates += 1
+                elif job.status == Job.DONE:
+                    self._prune_job(job)
+            max_size = state.totals[rung + 1] + candidates + max_size - state.settled[rung]
+
+    def _prune_job(self, job):
+        try:
+            # The jobs were retrieved with a field projection, and cannot be
+            # pushed back as is
+            full_job = self.experiment.get_job(job.job_id)
+            if full_job.status == Job.DONE:
+                full_job.status = Job.PRUNED
+                full_job.put()
+        except errors.SchedyError:
+            logger.warning('Could not prune job %s.', job.job_id, exc_info=True)
+
+class _ASHAState(object):
+    def __init__(self, num_rungs):
+        self.completed = [[] for _ in range(num_rungs)]
+        self.totals = [0] * num_rungs
+        self.settled = [0] * num_rungs
+        self.promoted = set()
+        self.num_configs = 0
+        self.num_queued = 0
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+'''
+Bulk import of jobs from JSON lines or CSV files, in the formats written by
+:py:mod:`schedy.export`.
+
+JSON lines files contain one object per line, with the keys
+``hyperparameters`` and optionally ``status`` and ``results`` (other keys,
+like ``id``, are ignored). CSV files contain one column per hyperparameter
+(``hyperparameter.<name>``) and per result (``result.<name>``), and
+optionally a ``status`` column. The values of the CSV cells are parsed as
+JSON if possible, and kept as strings otherwise (so that a JSON string is
+needed for a string like ``"1"``). Empty cells are missing values, while
+``null`` cells are None.
+
+The file is read as a stream, and the jobs are added concurrently by a pool
+of threads sharing the same :py:class:`schedy.SchedyDB` (and thus the same
+authentication token and connections).
+
+Example:
+    >>> with open('jobs.jsonl') as f:
+    >>>     num_added, num_failed = schedy.bulk.import_jobs(exp, schedy.bulk.read_jsonl(f))
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+
+from .jobs import _check_status
+
+#: Default number of threads adding the jobs.
+DEFAULT_WORKERS = 16
+
+class Record(object):
+    def __init__(self, line, text, job=None, error=None):
+        '''
+        Job read from a file.
+
+        Args:
+            line (int): Line number of the job in the file, starting at 1.
+            text (str): Text of the job in the file, for error reports.
+            job (dict): Arguments of :py:meth:`schedy.Experiment.add_job`, or
+                None if the job is invalid.
+            error (Exception): Why the job is invalid, if it is.
+        '''
+        self.line = line
+        self.text = text
+        self.job = job
+        self.error = error
+
+def _job_arguments(hyperparameters, status=None, results=None):
+    if not isinstance(hyperparameters, dict):
+        raise ValueError('The hyperparameters must be an object.')
+    job = {'hyperparameters': hyperparameters}
+    if status is not None:
+        if not _check_status(status):
+            raise ValueError('Invalid status: {!r}.'.format(status))
+        job['status'] = status
+    if results is not None:
+        if not isinstance(results, dict):
+            raise ValueError('The results must be an object.')
+        job['results'] = results
+    return job
+
+def read_jsonl(f):
+    '''
+    Reads jobs from a JSON lines file. Blank lines are ignored.
+
+    Args:
+        f (file-object): File opened in text mode.
+
+    Returns:
+        iterator of :py:class:`Record`: The jobs.
+    '''
+    for line, text in enumerate(f, 1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            data = json.loads(text)
+            if not isinstance(data, dict):
+                raise ValueError('Expected an object.')
+            job = _job_arguments(data.get('hyperparameters', {}), data.get('status'), data.get('results'))
+        except (TypeError, ValueError) as e:
+            yield Record(line, text, error=e)
+        else:
+            yield Record(line, text, job)
+
+def _parse_cell(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def read_csv(f):
+    '''
+    Reads jobs from a CSV file, whose first row contains the names of the
+    columns. Unknown columns (e.g. ``id``) are ignored.
+
+    Args:
+        f (file-object): File opened in text mode, with ``newline=''``
+            (binary mode with Python 2).
+
+    Returns:
+        iterator of :py:class:`Record`: The jobs.
+    '''
+    import csv
+    reader = csv.reader(f)
+    try:
+        columns = [_text(name) for name in next(reader)]
+    except StopIteration:
+        return
+    for row in reader:
+        row = [_text(cell) for cell in row]
+        line = reader.line_num
+        if not any(row):
+            continue
+        text = ','.join(row)
+        hyperparameters = dict()
+        results = dict()
+        status = None
+        try:
+            if len(row) > len(columns):
+                raise ValueError('Expected at most {} values, found {}.'.format(len(columns), len(row)))
+            for column, cell in zip(columns, row):
+                # Missing value
+                if cell == '':
+                    continue
+                category, _, name = column.partition('.')
+                if column == 'status':
+                    status = cell
+                elif category == 'hyperparameter' and name:
+                    hyperparameters[name] = _parse_cell(cell)
+                elif category == 'result' and name:
+                    results[name] = _parse_cell(cell)
+            job = _job_arguments(hyperparameters, status, results or None)
+        except ValueError as e:
+            yield Record(line, text, error=e)
+        else:
+            yield Record(line, text, job)
+
+def _text(value):
+    # The csv module of Python 2 only reads byte strings
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+def import_jobs(experiment, records, workers=DEFAULT_WORKERS, callback=None):
+    '''
+    Adds jobs to an experiment concurrently. Only a few jobs are read in
+    advance, so that the jobs can be streamed from a file of any size.
+
+    Args:
+        experiment (schedy.Experiment): The experiment.
+        records (iterable of Record): The jobs, usually returned by
+            :py:func:`read_jsonl` or :py:func:`read_csv`.
+        workers (int): Number of threads adding the jobs. Use a
+            :py:class:`schedy.SchedyDB` with at least as many connections.
+        callback (callable): Function called with each record, the new job
+            (or None if it could not be added) and the error (or None), in
+            the calling thread.
+
+    Returns:
+        tuple: The number of jobs added, and the number of jobs that could
+        not be added.
+    '''
+    import concurrent.futures
+    counts = [0, 0]
+
+    def report(record, job, error):
+        counts[error is not None] += 1
+        if callback is not None:
+            callback(record, job, error)
+
+    def collect(futures):
+        for future in futures:
+            record = pending.pop(future)
+            try:
+                job = future.result()
+            except Exception as e:
+                report(record, None, e)
+            else:
+                report(record, job, None)
+
+    pending = dict()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for record in records:
+            if record.error is not None:
+                report(record, None, record.error)
+                continue
+            # Bound the number of jobs read in advance
+            if len(pending) >= 2 * workers:
+                done, _ = concurrent.futures.wait(list(pending),
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+            pending[executor.submit(experiment.add_job, **record.job)] = record
+        collect(list(pending))
+    return counts[0], counts[1]
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+'''
+Local cache of the results of the training commands run by ``schedy run``.
+
+Deterministic training commands always produce the same results for the same
+command line and hyperparameters. With ``schedy run --cache-dir DIR``, the
+results of each successful command are saved in ``DIR``, and a job whose
+command was already run is completed with these results without running the
+command again. The version of the code and of the data, which are not part
+of the command line, can be added to the key of the cache with
+``--cache-salt``.
+
+The cache can be shared by several ``schedy run`` processes. Its size can be
+bounded, in which case the least recently used results are evicted.
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from . import encoding
+from .artifacts import _makedirs
+from .compat import json_dumps
+from .fingerprint import fingerprint
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = '.json'
+
+class ResultsCache(object):
+    def __init__(self, root, max_size=None):
+        '''
+        Directory containing the results of the training commands, in one
+        JSON file per key.
+
+        Args:
+            root (str): Path to the directory.
+            max_size (int): Maximum total size of the files, in bytes. When
+                it is exceeded, the least recently used results are deleted.
+                Default: no limit.
+        '''
+        self.root = root
+        self.max_size = max_size
+        # Estimate of the total size, only known exactly after a scan (other
+        # processes can use the cache too)
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(cmd_args, hyperparameters, salt=''):
+        '''
+        Computes the key of the results of a command.
+
+        Args:
+            cmd_args (list of str): Arguments of the command, as formatted for
+                the job.
+            hyperparameters (dict): Hyperparameters of the job, for the
+                commands which do not receive them as arguments.
+            salt (str): Additional part of the key, e.g. the version of the
+                code or of the data.
+
+        Returns:
+            str: The key.
+        '''
+        data = json_dumps([salt, list(cmd_args), fingerprint(hyperparameters)])
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        '''
+        Returns the path to the file containing the results of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            str: The path.
+        '''
+        return os.path.join(self.root, key[:2], key[2:] + _SUFFIX)
+
+    def get(self, key):
+        '''
+        Retrieves the results of a key, and marks them as recently used.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            dict: The results, or None if they are not in the cache.
+        '''
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                results = json.loads(f.read().decode('utf-8'))
+            # The modification time orders the results for the eviction
+            os.utime(path, None)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                logger.warning('Could not read the cached results %s.', path, exc_info=True)
+            return None
+        except ValueError:
+            logger.warning('Invalid cached results %s.', path, exc_info=True)
+            return None
+        if not isinstance(results, dict):
+            return None
+        return results
+
+    def put(self, key, results):
+        '''
+        Saves the results of a key, then evicts the least recently used
+        results if the cache is too large.
+
+        Args:
+            key (str): The key.
+            results (dict): The results.
+        '''
+        data = json_dumps(results, cls=encoding.SchedyJSONEncoder).encode('utf-8')
+        path = self.path(key)
+        _makedirs(os.path.dirname(path))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # Atomic, so that other processes never read incomplete results
+            os.rename(tmp_path, path)
+        except OSError:
+            # On Windows, renaming fails if the results were saved by another
+            # process in the meantime
+            if not os.path.exists(path):
+                raise
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+        if self.max_size is None:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data)
+            if self._size is None or self._size > self.max_size:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if not name.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(prefix_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    # Evicted by another process
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        self._size = sum(size for _, size, _ in entries)
+        if self._size <= self.max_size:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+            self._size -= size
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+'''
+Channel used by the training commands run by ``schedy run`` to report their
+results.
+
+Example:
+    >>> from schedy.channel import report_results
+    >>> for epoch in range(num_epochs):
+    >>>     loss = train_one_epoch()
+    >>>     report_results({'loss': loss, 'epoch': epoch}, partial=True)
+    >>> report_results({'loss': loss})
+
+Programs run by ``schedy run --persistent`` process several jobs. Python
+programs can use :py:func:`serve`:
+
+    >>> from schedy.channel import serve
+    >>> def train(hyperparameters):
+    >>>     return {'loss': train_model(**hyperparameters)}
+    >>> serve(train)
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import json
+import os
+import sys
+import traceback
+
+from .compat import json_dumps
+from .encoding import SchedyJSONEncoder
+
+#: Environment variable containing the file descriptor of the results pipe.
+RESULTS_FD_VARIABLE = 'SCHEDY_RESULTS_FD'
+#: Environment variable containing the path of the results file.
+RESULTS_FILE_VARIABLE = 'SCHEDY_RESULTS_FILE'
+#: Environment variable set for programs run by ``schedy run --persistent``.
+PERSISTENT_VARIABLE = 'SCHEDY_PERSISTENT'
+#: Beginning of the protocol messages of persistent programs.
+PROTOCOL_MESSAGE_PREFIX = '{"schedy":'
+
+RESULTS_HEADER = '--- RESULTS ---'
+PARTIAL_RESULTS_HEADER = '--- PARTIAL RESULTS ---'
+RESULTS_FOOTER = '--- END RESULTS ---'
+
+def report_results(results, partial=False):
+    '''
+    Reports results to ``schedy run``. The results are sent using the results
+    channel if ``schedy run`` provided one, or printed to the standard output
+    otherwise.
+
+    Args:
+        results (dict): A dictionary of result values.
+        partial (bool): If true, the results are intermediate results, that
+            ``schedy run`` will push to the job while the command is still
+            running. Otherwise, they are the final results of the command.
+    '''
+    if os.environ.get(PERSISTENT_VARIABLE):
+        _send_message('results', results=results, partial=partial)
+        return
+    fd = os.environ.get(RESULTS_FD_VARIABLE)
+    path = os.environ.get(RESULTS_FILE_VARIABLE)
+    if fd is None and path is None:
+        header = PARTIAL_RESULTS_HEADER if partial else RESULTS_HEADER
+        print('\n'.join((header, json_dumps(results, cls=SchedyJSONEncoder), RESULTS_FOOTER)))
+        sys.stdout.flush()
+        return
+    message = (json_dumps({'results': results, 'partial': partial}, cls=SchedyJSONEncoder) + '\n').encode('utf-8')
+    if fd is not None:
+        fd = int(fd)
+        while message:
+            message = message[os.write(fd, message):]
+    else:
+        with open(path, 'ab') as results_file:
+            results_file.write(message)
+
+def serve(train_func):
+    '''
+    Processes the jobs sent by ``schedy run --persistent``, until it closes
+    the standard input.
+
+    Args:
+        train_func (callable): Function called for each job with a dictionary
+            of hyperparameters as argument. It returns a dictionary of
+            results, or None if the results were reported using
+            :py:func:`report_results`. If it raises an exception, the job is
+            marked as crashed and the next job is processed.
+    '''
+    for line in iter(sys.stdin.readline, ''):
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            results = train_func(request['hyperparameters'])
+        except Exception as e:
+            traceback.print_exc()
+            _send_message('error', error='{}: {}'.format(type(e).__name__, e))
+            continue
+        if results is not None:
+            _send_message('results', results=results, partial=False)
+        _send_message('done')
+
+def _send_message(message_type, **kwargs):
+    # The type must be the first key, so that the message starts with
+    # PROTOCOL_MESSAGE_PREFIX
+    message = collections.OrderedDict([('schedy', message_type)])
+    message.update(sorted(kwargs.items()))
+    sys.stdout.write(json_dumps(message, cls=SchedyJSONEncoder, separators=(',', ':')) + '\n')
+    sys.stdout.flush()
+
+def _parse_message(line):
+    message = json.loads(line.decode('utf-8'))
+    return dict(message['results']), bool(message.get('partial', False))
+
+def _read_messages(read_file, callback):
+    with read_file:
+        for line in iter(read_file.readline, b''):
+            if line.strip():
+                callback(*_parse_message(line))
+
+def _follow_file(path, stop, callback, interval=0.5):
+    '''
+    Reads the messages appended to a file until ``stop`` is set, then reads the
+    remaining messages.
+    '''
+    with open(path, 'rb') as results_file:
+        pending = b''
+        while True:
+            stopped = stop.wait(interval)
+            pending += results_file.read()
+            lines = pending.split(b'\n')
+            # The last line is incomplete (or empty)
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    callback(*_parse_message(line))
+            if stopped:
+                break
+
+class _StdoutResultsParser(object):
+    '''
+    Parses the results blocks printed by a training command.
+    '''
+    def __init__(self):
+        self._block_header = None
+        self._block_lines = []
+
+    def feed(self, line, callback):
+        stripped = line.rstrip()
+        if stripped in (RESULTS_HEADER.encode(), PARTIAL_RESULTS_HEADER.encode()):
+            self._block_header = stripped.decode()
+            self._block_lines = []
+        elif stripped == RESULTS_FOOTER.encode():
+            self._close_block(callback)
+        elif self._block_header is not None:
+            self._block_lines.append(line)
+
+    def close(self, callback):
+        # The end of the final results block is optional
+        if self._block_header == RESULTS_HEADER:
+            self._close_block(callback)
+
+    def _close_block(self, callback):
+        if self._block_header is None:
+            return
+        partial = self._block_header == PARTIAL_RESULTS_HEADER
+        content = b''.join(self._block_lines)
+        self._block_header = None
+        self._block_lines = []
+        callback(dict(json.loads(content.decode('utf-8'))), partial)
@@ -4,21 +4,40 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import argparse
+import functools
+import itertools
 import schedy
+import schedy.bulk
+import schedy.channel
+import schedy.export
 import json
-from tabulate import tabulate
 import getpass
-from requests.compat import urljoin
+import numbers
+from six.moves.urllib.parse import urljoin
 import os
 import stat
 import errno
 import sys
+import tempfile
+import threading
+import time
 from six.moves import input
 from six import PY2, reraise, raise_from
-import subprocess
 from .compat import json_dumps
 
 DEFAULT_CATEGORY = 'schedy'
+#: Minimum time between two pushes of partial results, in seconds.
+PARTIAL_RESULTS_INTERVAL = 5
+#: Environment variables limiting the number of threads of numerical libraries.
+THREAD_COUNT_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+#: Minimum time between two updates of the progress of imports, in seconds.
+IMPORT_PROGRESS_INTERVAL = 1
+JOB_STATUSES = (schedy.Job.QUEUED, schedy.Job.RUNNING, schedy.Job.DONE, schedy.Job.CRASHED, schedy.Job.PRUNED)
+#: Job definition keys associated with the categories of the job tables.
+JOB_CATEGORY_KEYS = {
+    'hyperparameter': 'hyperparameters',
+    'result': 'results',
+}
 
 def setup_add(subparsers):
     parser = subparsers.add_parser('add', help='Add an experiment.')
@@ -40,9 +59,22 @@ def setup_add(subparsers):
     ).format(', '.join(schedy.random._DISTRIBUTION_TYPES.keys()))
     random_parser.add_argument('hyperparameters', nargs='+', help=RANDOM_HP_HELP)
     random_parser.set_defaults(parser=random_parser)
+    # Grid search
+    grid_parser = sched_subparsers.add_parser('grid', help='Grid search (queues all the combinations of the values)')
+    GRID_HP_HELP = (
+        'List of the hyperparameters. Each hyperparameter consists in two arguments: name values. '
+        '"values" is a JSON list of the values of the hyperparameter. '
+        'Example: learning_rate \'[0.1, 0.01, 0.001]\' activation \'["relu", "tanh"]\''
+    )
+    grid_parser.add_argument('hyperparameters', nargs='+', help=GRID_HP_HELP)
+    grid_parser.add_argument('--shuffle', action='store_true', help='Queue the combinations in a random order, so that the first jobs cover the whole grid.')
+    grid_parser.add_argument('--seed', type=int, help='Seed of the random order.')
+    grid_parser.add_argument('-j', '--workers', type=int, default=schedy.bulk.DEFAULT_WORKERS, help='Number of jobs added concurrently. Default: %(default)s.')
+    grid_parser.add_argument('--start', type=int, default=0, help='Number of combinations to skip, to resume an interrupted command with the same values and options. The experiment can then exist already.')
+    grid_parser.add_argument('--failures', help='File listing the combinations that could not be added, as JSON lines (EXPERIMENT.failures.jsonl by default). Only created if some jobs could not be added.')
+    grid_parser.set_defaults(parser=grid_parser)
 
 def cmd_add(args):
-    db = schedy.SchedyDB(config_path=args.config)
     if args.scheduler == 'manual':
         exp = schedy.ManualSearch(args.experiment, status=args.status)
     elif args.scheduler == 'random':
@@ -65,7 +97,39 @@ def cmd_add(args):
             except (TypeError, ValueError, KeyError) as e:
                 args.parser.error('Invalid distribution parameters for {} ({!r}).'.format(name, e))
         exp = schedy.RandomSearch(args.experiment, status=args.status, distributions=hyperparameters)
-    db.add_experiment(exp)
+    elif args.scheduler == 'grid':
+        if len(args.hyperparameters) % 2 != 0:
+            args.parser.error('Invalid hyperparameters (not a list of name/values).')
+        if args.workers < 1:
+            args.parser.error('The number of workers must be at least 1.')
+        if args.start < 0:
+            args.parser.error('The start cannot be negative.')
+        values = {}
+        for name, values_txt in zip(args.hyperparameters[::2], args.hyperparameters[1::2]):
+            if name in values:
+                args.parser.error('Duplicate hyperparameter: {}.'.format(name))
+            try:
+                values[name] = json.loads(values_txt)
+            except ValueError as e:
+                args.parser.error('Invalid values for {} ({!r}).'.format(name, e))
+        try:
+            exp = schedy.GridSearch(args.experiment, values, shuffle=args.shuffle, seed=args.seed, status=args.status)
+        except ValueError as e:
+            args.parser.error(str(e))
+    db = schedy.SchedyDB(config_path=args.config, max_connections=max(getattr(args, 'workers', 0), schedy.core.DEFAULT_MAX_CONNECTIONS))
+    # Resumed grid searches exist already
+    db.add_experiment(exp, exist_ok=getattr(args, 'start', 0) > 0)
+    if args.scheduler == 'grid':
+        failures_path = args.failures
+        if failures_path is None:
+            failures_path = args.experiment + '.failures.jsonl'
+        progress = _ImportProgress(failures_path)
+        try:
+            exp.add_jobs(start=args.start, workers=args.workers, callback=progress.update)
+        finally:
+            progress.close()
+        if progress.num_failed > 0:
+            sys.exit(1)
 
 def setup_rm(subparsers):
     parser = subparsers.add_parser('rm', help='Remove an experiment or a job.')
@@ -119,37 +183,232 @@ def setup_list(subparsers):
     parser.add_argument('-s', '--sort', action='append', help='Field by which we should sort. You can specify multiple fields using this argument multiple times.')
     parser.add_argument('-d', '--decreasing', action='store_true', help='Sort in reverse order (decreasing values).')
     parser.add_argument('-f', '--field', action='append', help='Specify this option multiple times to select the fields you want to diply (all by default).')
+    parser.add_argument('--status', action='append', choices=JOB_STATUSES, help='Only list the jobs with this status. You can specify multiple statuses using this argument multiple times.')
+    parser.add_argument('-w', '--where', nargs=2, action='append', metavar=('FIELD', 'VALUE'), help='Only list the jobs for which FIELD (e.g. hyperparameter.x or result.loss) is equal to VALUE. VALUE must be a valid JSON value. You can specify this option multiple times.')
+    parser.add_argument('--top', type=int, metavar='K', help='Only list the first K rows according to the sort fields (see --sort). Only K rows are kept in memory.')
+
+def parse_where(args):
+    where = dict()
+    for field, value_txt in args.where or []:
+        try:
+            where[job_field(field)] = json.loads(value_txt)
+        except KeyError as e:
+            args.parser.error(str(e))
+        except (TypeError, ValueError) as e:
+            args.parser.error('Invalid value for field {} ({!r}).'.format(field, e))
+    return where
 
 def cmd_list(args):
     db = schedy.SchedyDB(config_path=args.config)
+    if args.top is not None and args.sort is None:
+        args.parser.error('--top requires at least one sort field (--sort).')
     if args.experiment is None:
-        experiments = db.get_experiments()
-        table = exp_table(experiments)
+        if args.status is not None or args.where is not None:
+            args.parser.error('Filters can only be used when listing jobs.')
+        rows = exp_rows(db.get_experiments())
     else:
+        where = parse_where(args)
+        # Only retrieve the fields that will be displayed or used
+        if args.field is not None:
+            shown_fields = list(args.field)
+        elif not args.table and not args.paragraph:
+            shown_fields = []
+        else:
+            shown_fields = None
+        fields = None
+        if shown_fields is not None:
+            fields = job_fields(shown_fields + (args.sort or []))
         exp = db.get_experiment(args.experiment)
-        jobs = exp.all_jobs()
-        table = job_table(jobs)
-    if args.sort is not None:
+        rows = job_rows(exp.all_jobs(status=args.status, fields=fields, where=where))
+    if args.top is not None:
         try:
-            table.sort(args.sort, reverse=args.decreasing)
+            rows = top_rows(rows, args.sort, args.top, reverse=args.decreasing)
         except KeyError as e:
             args.parser.error(str(e))
-    if args.field is not None:
-        table.filter_fields(args.field)
-    if args.table:
-        table.print_table()
-    elif args.paragraph:
-        table.print_paragraphs()
+    # Sorted tables and tables with headers need all the rows, other tables are
+    # printed as the rows are received
+    if args.sort is not None or args.table:
+        table = TableData(rows)
+        if args.sort is not None:
+            try:
+                table.sort(args.sort, reverse=args.decreasing)
+            except KeyError as e:
+                args.parser.error(str(e))
     else:
-        if args.field is None:
-            table.filter_categories([DEFAULT_CATEGORY])
-        table.print_table('plain', include_headers=False)
+        table = TableStream(rows)
+    try:
+        if args.field is not None:
+            table.filter_fields(args.field)
+        if args.table:
+            table.print_table()
+        elif args.paragraph:
+            table.print_paragraphs()
+        else:
+            if args.field is None:
+                table.filter_categories([DEFAULT_CATEGORY])
+            table.print_table('plain', include_headers=False)
+    except KeyError as e:
+        args.parser.error(str(e))
+
+def setup_stats(subparsers):
+    parser = subparsers.add_parser('stats', help='Show statistics about the results of the jobs of an experiment.')
+    parser.set_defaults(func=cmd_stats, parser=parser)
+    parser.add_argument('experiment', help='Name of the experiment.')
+    parser.add_argument('-r', '--result', action='append', help='Name of a result to summarize (all the numeric results by default). You can specify this option multiple times.')
+    parser.add_argument('-q', '--quantile', type=float, action='append', help='Quantile to show, between 0 and 1 (by default 0.25, 0.5 and 0.75). You can specify this option multiple times.')
+    parser.add_argument('--status', action='append', choices=JOB_STATUSES, help='Only consider the jobs with this status. You can specify multiple statuses using this argument multiple times.')
+    parser.add_argument('-w', '--where', nargs=2, action='append', metavar=('FIELD', 'VALUE'), help='Only consider the jobs for which FIELD (e.g. hyperparameter.x or result.loss) is equal to VALUE. VALUE must be a valid JSON value. You can specify this option multiple times.')
+
+def cmd_stats(args):
+    from tabulate import tabulate
+    quantiles = args.quantile or [0.25, 0.5, 0.75]
+    for q in quantiles:
+        if not 0 <= q <= 1:
+            args.parser.error('Quantiles must be between 0 and 1, found {}.'.format(q))
+    db = schedy.SchedyDB(config_path=args.config)
+    exp = db.get_experiment(args.experiment)
+    summary = exp.summary(results=args.result, status=args.status, where=parse_where(args))
+    statuses = ', '.join('{}: {}'.format(status, summary.statuses[status]) for status in JOB_STATUSES if status in summary.statuses)
+    print('Jobs: {}{}'.format(summary.num_jobs, ' ({})'.format(statuses) if statuses else ''))
+    headers = ['result', 'count', 'mean', 'min'] + ['{:g}%'.format(q * 100) for q in quantiles] + ['max']
+    rows = []
+    for name in args.result or sorted(summary.results):
+        sketch = summary.results.get(name)
+        if sketch is None:
+            rows.append([name, 0] + [None] * (len(headers) - 2))
+            continue
+        rows.append([name, sketch.count, sketch.mean, sketch.min] + sketch.quantiles(quantiles) + [sketch.max])
+    if rows:
+        print()
+        print(tabulate(rows, headers, tablefmt='psql'))
+
+def setup_export(subparsers):
+    parser = subparsers.add_parser('export', help='Export the jobs of an experiment to a JSON lines, CSV or Parquet file.')
+    parser.set_defaults(func=cmd_export, parser=parser)
+    parser.add_argument('experiment', help='Name of the experiment.')
+    parser.add_argument('-o', '--output', help='Output file (standard output by default, except for Parquet).')
+    parser.add_argument('--format', choices=schedy.export.FORMATS, help='Format of the output (guessed from the extension of the output file, JSON lines by default).')
+    parser.add_argument('--status', action='append', choices=JOB_STATUSES, help='Only export the jobs with this status. You can specify multiple statuses using this argument multiple times.')
+    parser.add_argument('-w', '--where', nargs=2, action='append', metavar=('FIELD', 'VALUE'), help='Only export the jobs for which FIELD (e.g. hyperparameter.x or result.loss) is equal to VALUE. VALUE must be a valid JSON value. You can specify this option multiple times.')
+
+def cmd_export(args):
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.output or '')[1].lstrip('.').lower()
+        fmt = extension if extension in schedy.export.FORMATS else schedy.export.JSONL
+    if fmt == schedy.export.PARQUET and args.output is None:
+        args.parser.error('An output file is required for the Parquet format.')
+    db = schedy.SchedyDB(config_path=args.config)
+    exp = db.get_experiment(args.experiment)
+    jobs = exp.all_jobs(status=args.status, where=parse_where(args))
+    if fmt == schedy.export.PARQUET:
+        schedy.export.write_parquet(jobs, args.output)
+        return
+    write = schedy.export.write_csv if fmt == schedy.export.CSV else schedy.export.write_jsonl
+    if args.output is None:
+        write(jobs, sys.stdout)
+    elif PY2:
+        with open(args.output, 'wb') as f:
+            write(jobs, f)
+    else:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            write(jobs, f)
+
+def setup_import(subparsers):
+    parser = subparsers.add_parser('import', help='Add the jobs of a JSON lines or CSV file to an existing experiment.')
+    parser.set_defaults(func=cmd_import, parser=parser)
+    parser.add_argument('experiment', help='Name of the experiment.')
+    parser.add_argument('input', help='Input file, in the format written by schedy export, or - for the standard input.')
+    parser.add_argument('--format', choices=(schedy.export.JSONL, schedy.export.CSV), help='Format of the input (guessed from the extension of the input file, JSON lines by default).')
+    parser.add_argument('-j', '--workers', type=int, default=schedy.bulk.DEFAULT_WORKERS, help='Number of jobs added concurrently. Default: %(default)s.')
+    parser.add_argument('--failures', help='File listing the jobs that could not be added, as JSON lines (INPUT.failures.jsonl by default). Only created if some jobs could not be added.')
+
+def cmd_import(args):
+    if args.workers < 1:
+        args.parser.error('The number of workers must be at least 1.')
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.input)[1].lstrip('.').lower()
+        fmt = schedy.export.CSV if extension == schedy.export.CSV else schedy.export.JSONL
+    failures_path = args.failures
+    if failures_path is None:
+        failures_path = 'schedy-import.failures.jsonl' if args.input == '-' else args.input + '.failures.jsonl'
+    db = schedy.SchedyDB(config_path=args.config, max_connections=max(args.workers, schedy.core.DEFAULT_MAX_CONNECTIONS))
+    exp = db.get_experiment(args.experiment)
+    progress = _ImportProgress(failures_path)
+    try:
+        if args.input == '-':
+            f = sys.stdin
+        elif PY2:
+            f = open(args.input, 'rb' if fmt == schedy.export.CSV else 'r')
+        else:
+            f = open(args.input, 'r', newline='', encoding='utf-8')
+        try:
+            read = schedy.bulk.read_csv if fmt == schedy.export.CSV else schedy.bulk.read_jsonl
+            schedy.bulk.import_jobs(exp, read(f), workers=args.workers, callback=progress.update)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    finally:
+        progress.close()
+    if progress.num_failed > 0:
+        sys.exit(1)
+
+class _ImportProgress(object):
+    '''
+    Shows the progress of an import on the standard error, and writes the jobs
+    that could not be added to the failure report.
+    '''
+    def __init__(self, failures_path):
+        self.failures_path = failures_path
+        self.num_added = 0
+        self.num_failed = 0
+        self._failures = None
+        self._start = time.time()
+        self._last_update = self._start
+        self._interactive = sys.stderr.isatty()
+
+    def update(self, record, job, error):
+        if error is None:
+            self.num_added += 1
+        else:
+            self.num_failed += 1
+            if self._failures is None:
+                self._failures = open(self.failures_path, 'w')
+            self._failures.write(json_dumps({
+                'line': record.line,
+                'error': _error_message(error),
+                'record': record.text,
+            }) + '\n')
+        now = time.time()
+        if now - self._last_update >= IMPORT_PROGRESS_INTERVAL:
+            self._last_update = now
+            self._show(end='\r' if self._interactive else '\n')
+
+    def _show(self, end):
+        elapsed = time.time() - self._start
+        rate = (self.num_added + self.num_failed) / elapsed if elapsed > 0 else 0
+        message = '{} jobs added, {} failed ({:.0f} jobs/s)'.format(self.num_added, self.num_failed, rate)
+        print(message, end=end, file=sys.stderr)
+        sys.stderr.flush()
+
+    def close(self):
+        self._show(end='\n')
+        if self._failures is not None:
+            self._failures.close()
+            print('The jobs that could not be added are listed in {}.'.format(self.failures_path), file=sys.stderr)
+
+def _error_message(error):
+    message = str(error)
+    if not message:
+        return error.__class__.__name__
+    return '{}: {}'.format(error.__class__.__name__, message)
 
 def setup_push(subparsers):
     parser = subparsers.add_parser('push', help='Manually add a job to an existing experiment.')
     parser.set_defaults(func=cmd_push)
     parser.add_argument('experiment', help='Name of the experiment for the job.')
-    parser.add_argument('-s', '--status', choices=(schedy.Job.QUEUED, schedy.Job.RUNNING, schedy.Job.DONE, schedy.Job.CRASHED, schedy.Job.PRUNED), help='Status of the job.')
+    parser.add_argument('-s', '--status', choices=JOB_STATUSES, help='Status of the job.')
     parser.add_argument('-r', '--results', nargs='+', help='Optional results for the job. Each result must be provided as a pair: name value. value must be a valid JSON value. For example: -r accuracy 0.9 loss_history \'[0.9, 0.8, 0.7]\'')
     parser.add_argument('-p', '--hyperparameters', nargs='+', required=True, help='Hyperparameters for the job. Each hyperparameter must be provided as a pair: name value. value must be a valid JSON value. For example: -p learning_rate 0.01 num_layers 3 size_layers \'[512, 1024, 512]\'')
     parser.set_defaults(parser=parser)
@@ -275,64 +534,547 @@ Example output:
         "recall": 0.9
     }
     --- END RESULTS ---
+
+The command can also report intermediate results while it is running, using
+a "--- PARTIAL RESULTS ---" block terminated by "--- END RESULTS ---". They
+are pushed to the job while it is running, at most once every few seconds.
+
+With --persistent, the training command is started once (the %j and %h
+formatters cannot be used) and processes several jobs. It reads the jobs from
+its standard input, as JSON lines such as:
+
+    {"schedy": "job", "experiment": "MyExperiment", "job": "abc",
+     "hyperparameters": {"learning_rate": 0.01}}
+
+It reports the results of the job, and its completion (or failure), by
+writing JSON lines starting with '{"schedy":' to its standard output:
+
+    {"schedy":"results","results":{"loss":0.1},"partial":false}
+    {"schedy":"done"}
+    {"schedy":"error","error":"<error message>"}
+
+Python commands can use schedy.channel.serve to implement this protocol. The
+command is restarted if it exits, and stopped by closing its standard input.
+
+With --fork-server, the command must be the path of a Python script (or -m
+and the name of a module) followed by its arguments, without the Python
+interpreter. A template process imports the modules given with --preload once,
+and forks a new process running the script for each job. The jobs keep their
+own process, but they share the preloaded modules and do not pay their import
+time. Thread count variables set by --cpus-per-job do not apply to the
+preloaded modules.
+
+With --results-channel pipe or file, the standard output of the command is
+not parsed. Python commands should then report their results using
+schedy.channel.report_results. Other commands can write JSON lines such as
+{"results": {"loss": 0.1}, "partial": false} to the file descriptor given by
+the SCHEDY_RESULTS_FD environment variable (pipe), or append them to the file
+given by the SCHEDY_RESULTS_FILE environment variable (file).
+
+With --cache-dir, the results of each successful command are saved in a
+local cache, under a key made of the formatted command line, the
+hyperparameters and the --cache-salt value. A job whose key is in the cache
+is completed with the cached results without running the command. Use this
+with deterministic commands only, and change the salt whenever the code or
+the data change. Commands using %j are run for every job, as their command
+lines differ.
 '''
     parser = subparsers.add_parser('run', help='Run a training command using hyperparameters pulled from Schedy.', description=desc_text, formatter_class=argparse.RawTextHelpFormatter)
-    parser.set_defaults(func=cmd_run)
-    parser.add_argument('--once', action='store_true', help='Run the command only once (instead of running it until there are no jobs left).')
+    parser.set_defaults(func=cmd_run, parser=parser)
+    parser.add_argument('--once', action='store_true', help='Run the command only once (instead of running it until there are no jobs left). With --parallel, each slot runs the command once.')
+    parser.add_argument('--parallel', type=int, metavar='N', help='Number of jobs to run in parallel (default: 1, or as many as possible with --cpus-per-job). The output lines of the commands are then prefixed with the id of their job.')
+    parser.add_argument('--cpus-per-job', type=int, metavar='N', help='Pin each command to its own set of N CPU cores, and limit the number of threads of OpenMP, MKL and OpenBLAS to N (Linux only).')
     parser.add_argument('--allow-empty-results', action='store_true', help='Allow the training command to omit returning any result.')
+    parser.add_argument('--results-channel', choices=('stdout', 'pipe', 'file'), default='stdout', help='How the training command reports its results (default: stdout).')
+    parser.add_argument('--persistent', action='store_true', help='Start the training command once, and send it the jobs using the protocol described above.')
+    parser.add_argument('--max-jobs-per-process', type=int, metavar='N', help='With --persistent, restart the training command after it has processed N jobs.')
+    parser.add_argument('--fork-server', action='store_true', help='Run the training command, a Python script, in a process forked from a template process (see above).')
+    parser.add_argument('--preload', action='append', default=[], metavar='MODULE', help='With --fork-server, module imported by the template process. You can specify this option multiple times.')
     parser.add_argument('--ignore-errors', action='store_true', help='Continue running even if the training command fails.')
+    parser.add_argument('--cache-dir', metavar='DIR', help='Cache the results of the training command in DIR, and reuse them for the jobs with the same command line and hyperparameters (see above).')
+    parser.add_argument('--cache-salt', default='', metavar='SALT', help='With --cache-dir, additional part of the key of the cached results, e.g. the version of the code and of the data.')
+    parser.add_argument('--cache-max-size', type=parse_size, metavar='SIZE', help='With --cache-dir, maximum size of the cache, in bytes or with a K, M or G suffix. The least recently used results are evicted first. Default: no limit.')
     parser.add_argument('experiment', help='Name of the experiment from which jobs will be pulled.')
     parser.add_argument('cmd', nargs='+', help='The command to run, which contains formatters as specified above.')
 
 class SubcommandError(RuntimeError):
     pass
 
+class JobOutput(object):
+    def __init__(self, prefix_lines=False):
+        '''
+        Writes the output of the training commands to the standard output.
+        Lines are written atomically, so that the outputs of concurrent
+        commands are not mixed up.
+
+        Args:
+            prefix_lines (bool): If true, each line is prefixed with the id of
+                the job that produced it.
+        '''
+        self.prefix_lines = prefix_lines
+        self._lock = threading.Lock()
+
+    def _prefix(self, job):
+        if self.prefix_lines and job is not None:
+            return '[{}] '.format(job.job_id)
+        return ''
+
+    def write_line(self, job, line):
+        if PY2:
+            out = sys.stdout
+        else:
+            out = sys.stdout.buffer
+        with self._lock:
+            out.write(self._prefix(job).encode() + line)
+            out.flush()
+
+    def print_message(self, job, message):
+        with self._lock:
+            print(self._prefix(job) + message)
+            sys.stdout.flush()
+
 def cmd_run(args):
-    db = schedy.SchedyDB(config_path=args.config)
+    if args.persistent:
+        if any('%j' in arg or '%h' in arg for arg in args.cmd):
+            args.parser.error('The %j and %h formatters cannot be used with --persistent.')
+        if args.results_channel != 'stdout':
+            args.parser.error('--results-channel cannot be used with --persistent.')
+    if args.fork_server:
+        if args.persistent:
+            args.parser.error('--fork-server cannot be used with --persistent.')
+        if not hasattr(os, 'fork'):
+            args.parser.error('--fork-server is not supported on this platform.')
+    elif args.preload:
+        args.parser.error('--preload can only be used with --fork-server.')
+    if args.max_jobs_per_process is not None and args.max_jobs_per_process < 1:
+        args.parser.error('The maximum number of jobs per process must be at least 1.')
+    cache = None
+    if args.cache_dir is not None:
+        from schedy.cache import ResultsCache
+        cache = ResultsCache(args.cache_dir, args.cache_max_size)
+    elif args.cache_max_size is not None or args.cache_salt:
+        args.parser.error('--cache-salt and --cache-max-size can only be used with --cache-dir.')
+    cpu_sets = None
+    if args.cpus_per_job is not None:
+        if not hasattr(os, 'sched_setaffinity'):
+            args.parser.error('--cpus-per-job is not supported on this platform.')
+        if args.cpus_per_job < 1:
+            args.parser.error('The number of CPU cores per job must be at least 1.')
+        cpus = sorted(os.sched_getaffinity(0))
+        num_slots = len(cpus) // args.cpus_per_job
+        if num_slots == 0:
+            args.parser.error('Only {} CPU cores are available.'.format(len(cpus)))
+        if args.parallel is None:
+            args.parallel = num_slots
+        if args.parallel > num_slots:
+            args.parser.error('Cannot run {} jobs with {} CPU cores each using {} available cores.'.format(args.parallel, args.cpus_per_job, len(cpus)))
+        cpu_sets = [cpus[i * args.cpus_per_job:(i + 1) * args.cpus_per_job] for i in range(args.parallel)]
+    elif args.parallel is None:
+        args.parallel = 1
+    if args.parallel < 1:
+        args.parser.error('The number of parallel jobs must be at least 1.')
+    # All the slots share the same connection to Schedy
+    db = schedy.SchedyDB(config_path=args.config, max_connections=max(args.parallel, schedy.core.DEFAULT_MAX_CONNECTIONS))
     exp = db.get_experiment(args.experiment)
-    while True:
+    output = JobOutput(prefix_lines=args.parallel > 1)
+    if cpu_sets is None:
+        cpu_sets = [None] * args.parallel
+    fork_server = None
+    if args.fork_server:
+        from schedy.forkserver import ForkServer
+        fork_server = ForkServer(args.preload)
+    try:
+        run_slots(args, exp, output, cpu_sets, fork_server, cache)
+    finally:
+        if fork_server is not None:
+            fork_server.close()
+
+def run_slots(args, exp, output, cpu_sets, fork_server=None, cache=None):
+    if len(cpu_sets) == 1:
+        run_jobs(args, exp, output, cpus=cpu_sets[0], fork_server=fork_server, cache=cache)
+        return
+    stop = threading.Event()
+    errors = []
+    def run_slot(cpus):
         try:
-            with exp.next_job() as job:
-                cmd_args = format_cmd_args(args.cmd, job)
-                print('Calling {}'.format(cmd_args))
-                output_block = False
-                output_content = ''
-                with subprocess.Popen(cmd_args, stdout=subprocess.PIPE, bufsize=1) as p:
-                    for line in iter(p.stdout.readline, b''):
-                        if PY2:
-                            sys.stdout.write(line)
+            run_jobs(args, exp, output, stop, cpus, fork_server, cache)
+        except BaseException:
+            errors.append(sys.exc_info())
+            # Do not start new jobs, but let the running ones complete
+            stop.set()
+    threads = [threading.Thread(target=run_slot, args=(cpus,)) for cpus in cpu_sets]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            # Join with a timeout, so that KeyboardInterrupt is not ignored
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        raise
+    if errors:
+        reraise(*errors[0])
+
+def run_jobs(args, exp, output, stop=None, cpus=None, fork_server=None, cache=None):
+    persistent_cmd = None
+    if args.persistent:
+        persistent_cmd = PersistentCommand(args, output, cpus)
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                with exp.next_job() as job:
+                    cached_results = None
+                    if cache is not None:
+                        cmd_args = format_cmd_args(args.cmd, job)
+                        cache_key = cache.key(cmd_args, job.hyperparameters, args.cache_salt)
+                        cached_results = cache.get(cache_key)
+                    if cached_results is not None:
+                        output.print_message(job, 'Using the cached results of {}'.format(cmd_args))
+                        job.results.update(cached_results)
+                    else:
+                        if persistent_cmd is None:
+                            final_results = run_job(args, job, output, cpus, fork_server)
                         else:
-                            sys.stdout.buffer.write(line)
-                        try:
-                            line_str = line.decode()
-                            if line_str.rstrip() == '--- RESULTS ---':
-                                output_block = True
-                            elif line_str.rstrip() == '--- END RESULTS ---':
-                                output_block = False
-                            elif output_block:
-                                output_content += line_str
-                        except UnicodeError:
-                            pass
-                    p.communicate()
-                    if p.returncode != 0:
-                        raise SubcommandError('Command {} failed with return code {}'.format(cmd_args, p.returncode))
-                if not output_content:
-                    raise SubcommandError('No results found in output for command {}'.format(cmd_args))
-                try:
-                    for key, value in dict(json.loads(output_content)).items():
-                        job.results[key] = value
-                except (TypeError, ValueError) as e:
-                    raise_from(SubcommandError('Invalid results from command {}'.format(cmd_args)), e)
-        except (SubcommandError, json.JSONDecodeError):
-            t, e, tb = sys.exc_info()
-            if args.ignore_errors:
-                print(e)
+                            final_results = persistent_cmd.run_job(job)
+                        if cache is not None and final_results is not None:
+                            cache.put(cache_key, final_results)
+            except (SubcommandError, json.JSONDecodeError):
+                t, e, tb = sys.exc_info()
+                if args.ignore_errors:
+                    output.print_message(None, str(e))
+                else:
+                    reraise(t, e, tb)
+            except schedy.errors.NoJobError:
+                break
+            if args.once:
+                break
+    finally:
+        if persistent_cmd is not None:
+            persistent_cmd.close()
+
+class JobResults(object):
+    def __init__(self, job, output):
+        '''
+        Collects the results reported by a training command. Partial results
+        are pushed to Schedy while the command is running, at most once every
+        :py:data:`PARTIAL_RESULTS_INTERVAL` seconds: an update received
+        sooner is pushed when the interval expires, unless :py:meth:`close`
+        is called first.
+        '''
+        self.job = job
+        self.output = output
+        self.final_results = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._last_push = None
+        # Pushes the pending partial results, if any
+        self._timer = None
+        self._closed = False
+
+    def update(self, results, partial):
+        with self._lock:
+            if not partial:
+                if self.final_results is None:
+                    self.final_results = dict()
+                self.final_results.update(results)
+                return
+            self.job.results.update(results)
+            if self._closed or self._timer is not None:
+                return
+            delay = 0
+            if self._last_push is not None:
+                delay = self._last_push + PARTIAL_RESULTS_INTERVAL - time.time()
+            if delay > 0:
+                self._timer = threading.Timer(delay, self._push_pending)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+            self._push()
+
+    def _push_pending(self):
+        with self._lock:
+            self._timer = None
+            if not self._closed:
+                self._push()
+
+    def _push(self):
+        self._last_push = time.time()
+        try:
+            self.job.put()
+        except Exception as e:
+            # Including the network errors of the transport, which must not
+            # stop the command
+            self.output.print_message(self.job, 'Could not push partial results: {}'.format(_error_message(e)))
+
+    def close(self):
+        '''
+        Stops pushing partial results, before the job is updated with its
+        final status. The pending partial results are pushed with it.
+        '''
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def read(self, read_func, *args):
+        try:
+            read_func(*args, callback=self.update)
+        except (KeyError, TypeError, ValueError) as e:
+            self.error = e
+
+    def apply(self, cmd_args, allow_empty=False):
+        '''
+        Sets the final results of the job, or raises
+        :py:exc:`SubcommandError` if there are none.
+
+        Returns:
+            dict: The final results, or None if there are none.
+        '''
+        if self.error is not None:
+            raise_from(SubcommandError('Invalid results from command {}'.format(cmd_args)), self.error)
+        if self.final_results is None:
+            if allow_empty:
+                return None
+            raise SubcommandError('No results found in output for command {}'.format(cmd_args))
+        self.job.results.update(self.final_results)
+        return self.final_results
+
+def command_environment(cpus=None):
+    '''
+    Returns the environment of a training command.
+    '''
+    env = dict(os.environ)
+    if cpus is not None:
+        for name in THREAD_COUNT_VARIABLES:
+            env[name] = str(len(cpus))
+    return env
+
+def start_command(cmd_args, env, cpus=None, **popen_kwargs):
+    '''
+    Starts a training command, pinned to the CPU cores ``cpus``.
+    '''
+    import subprocess
+    if cpus is None:
+        return subprocess.Popen(cmd_args, env=env, **popen_kwargs)
+    # On Linux, the affinity of the calling thread is inherited by the
+    # command, which is thus pinned before any of its threads is started
+    # (preexec_fn is not safe when the slots run in threads). The other
+    # threads of this process are not affected.
+    previous_cpus = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cpus)
+    try:
+        return subprocess.Popen(cmd_args, env=env, **popen_kwargs)
+    finally:
+        os.sched_setaffinity(0, previous_cpus)
+
+def _protocol_message(line):
+    # Splits a line written by a persistent command into a protocol message
+    # (or None) and the output preceding it: the message can follow output
+    # that did not end with a newline (e.g. a progress bar using carriage
+    # returns)
+    index = line.find(schedy.channel.PROTOCOL_MESSAGE_PREFIX.encode())
+    if index < 0:
+        return None, line
+    try:
+        message = json.loads(line[index:].decode('utf-8'))
+    except ValueError:
+        if index == 0:
+            raise
+        # Output which happens to contain the prefix
+        return None, line
+    output = line[:index]
+    if output.strip():
+        return message, output + b'\n'
+    return message, b''
+
+class PersistentCommand(object):
+    def __init__(self, args, output, cpus=None):
+        '''
+        Training command processing several jobs, using the protocol of
+        :py:func:`schedy.channel.serve`. It is started when the first job is
+        run, and restarted after it crashes or after it processed
+        ``args.max_jobs_per_process`` jobs.
+        '''
+        self.args = args
+        self.output = output
+        self.cpus = cpus
+        self._process = None
+        self._cmd_args = None
+        self._num_jobs = 0
+
+    def run_job(self, job):
+        import subprocess
+        if self._process is None:
+            self._cmd_args = format_cmd_args(self.args.cmd, job)
+            self.output.print_message(None, 'Starting {}'.format(self._cmd_args))
+            env = command_environment(self.cpus)
+            env[schedy.channel.PERSISTENT_VARIABLE] = '1'
+            self._process = start_command(self._cmd_args, env, self.cpus, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self._num_jobs = 0
+        self.output.print_message(job, 'Sending job {} to {}'.format(job.job_id, self._cmd_args))
+        request = {
+            'schedy': 'job',
+            'experiment': job.experiment.name,
+            'job': job.job_id,
+            'hyperparameters': job.hyperparameters,
+        }
+        results = JobResults(job, self.output)
+        error = None
+        try:
+            self._process.stdin.write((json_dumps(request, cls=schedy.encoding.SchedyJSONEncoder) + '\n').encode('utf-8'))
+            self._process.stdin.flush()
+            self._num_jobs += 1
+            for line in iter(self._process.stdout.readline, b''):
+                message, output = _protocol_message(line)
+                if output:
+                    self.output.write_line(job, output)
+                if message is None:
+                    continue
+                message_type = message['schedy']
+                if message_type == 'results':
+                    results.update(dict(message['results']), bool(message.get('partial', False)))
+                elif message_type == 'error':
+                    error = message.get('error')
+                    break
+                elif message_type == 'done':
+                    break
             else:
-                reraise(t, e, tb)
-        except schedy.errors.NoJobError:
-            break
-        if args.once:
-            break
+                returncode = self._stop()
+                raise SubcommandError('Command {} exited with return code {} while running job {}'.format(self._cmd_args, returncode, job.job_id))
+        except (IOError, OSError, KeyError, TypeError, ValueError) as e:
+            # The command is in an unknown state
+            self._stop(kill=True)
+            raise_from(SubcommandError('Command {} failed while running job {} ({!r})'.format(self._cmd_args, job.job_id, e)), e)
+        finally:
+            results.close()
+        if self.args.max_jobs_per_process is not None and self._num_jobs >= self.args.max_jobs_per_process:
+            self.close()
+        if error is not None:
+            raise SubcommandError('Command {} failed while running job {}: {}'.format(self._cmd_args, job.job_id, error))
+        return results.apply(self._cmd_args, self.args.allow_empty_results)
+
+    def _stop(self, kill=False):
+        process = self._process
+        self._process = None
+        if kill and process.poll() is None:
+            process.kill()
+        try:
+            process.stdin.close()
+        except (IOError, OSError):
+            pass
+        # Forward the remaining output of the command
+        for line in iter(process.stdout.readline, b''):
+            self.output.write_line(None, line)
+        process.stdout.close()
+        return process.wait()
+
+    def close(self):
+        '''
+        Stops the command, by closing its standard input.
+        '''
+        if self._process is not None:
+            self._stop()
+
+def run_job(args, job, output, cpus=None, fork_server=None):
+    import subprocess
+    cmd_args = format_cmd_args(args.cmd, job)
+    output.print_message(job, 'Calling {}'.format(cmd_args))
+    results = JobResults(job, output)
+    env = command_environment(cpus)
+    popen_kwargs = dict()
+    stdout_parser = None
+    results_path = None
+    stop_reading = threading.Event()
+    if args.results_channel == 'stdout':
+        stdout_parser = schedy.channel._StdoutResultsParser()
+    elif args.results_channel == 'pipe':
+        if fork_server is None:
+            read_fd, write_fd = os.pipe()
+            env[schedy.channel.RESULTS_FD_VARIABLE] = str(write_fd)
+            popen_kwargs['pass_fds'] = (write_fd,)
+    else:
+        fd, results_path = tempfile.mkstemp(prefix='schedy-results-')
+        os.close(fd)
+        env[schedy.channel.RESULTS_FILE_VARIABLE] = results_path
+    # The output of the command is only read if it has to be parsed or
+    # prefixed
+    pipe_stdout = stdout_parser is not None or output.prefix_lines
+    try:
+        if fork_server is None:
+            if pipe_stdout:
+                popen_kwargs['stdout'] = subprocess.PIPE
+            try:
+                p = start_command(cmd_args, env, cpus, **popen_kwargs)
+            except BaseException as e:
+                if args.results_channel == 'pipe':
+                    os.close(read_fd)
+                if isinstance(e, OSError):
+                    raise_from(SubcommandError('Command {} could not be started ({})'.format(cmd_args, e)), e)
+                raise
+            finally:
+                if args.results_channel == 'pipe':
+                    # The command has its own copy of the write end
+                    os.close(write_fd)
+            results_file = None
+            if args.results_channel == 'pipe':
+                results_file = os.fdopen(read_fd, 'rb')
+        else:
+            try:
+                p = fork_server.spawn(cmd_args, env, cpus, pipe_stdout=pipe_stdout, pipe_results=args.results_channel == 'pipe')
+            except fork_server.Error as e:
+                raise_from(SubcommandError('Command {} could not be started ({})'.format(cmd_args, e)), e)
+            results_file = p.results
+        with p:
+            if results_file is not None:
+                reader = threading.Thread(target=results.read, args=(schedy.channel._read_messages, results_file))
+                reader.start()
+            elif args.results_channel == 'file':
+                reader = threading.Thread(target=results.read, args=(schedy.channel._follow_file, results_path, stop_reading))
+                reader.start()
+            if p.stdout is not None:
+                for line in iter(p.stdout.readline, b''):
+                    output.write_line(job, line)
+                    if stdout_parser is not None and results.error is None:
+                        results.read(stdout_parser.feed, line)
+            p.wait()
+            stop_reading.set()
+            if stdout_parser is not None:
+                results.read(stdout_parser.close)
+            else:
+                reader.join()
+    finally:
+        results.close()
+        if results_path is not None:
+            os.remove(results_path)
+    if p.returncode != 0:
+        raise SubcommandError('Command {} failed with return code {}'.format(cmd_args, p.returncode))
+    return results.apply(cmd_args, args.allow_empty_results)
+
+#: Multipliers of the suffixes of the sizes given to the command line tool.
+SIZE_SUFFIXES = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+def parse_size(text):
+    '''
+    Parses a size in bytes, optionally followed by a K, M, G or T suffix (e.g.
+    ``500M``), for argparse.
+    '''
+    number = text.strip().upper()
+    multiplier = 1
+    if number[-1:] in SIZE_SUFFIXES:
+        multiplier = SIZE_SUFFIXES[number[-1]]
+        number = number[:-1]
+    try:
+        size = int(float(number) * multiplier)
+    except (ValueError, OverflowError):
+        # OverflowError for infinite sizes
+        raise argparse.ArgumentTypeError('Invalid size: {!r}.'.format(text))
+    if size < 0:
+        raise argparse.ArgumentTypeError('The size must be positive.')
+    return size
 
 def format_cmd_args(formatters, job):
     args = []
@@ -380,84 +1122,130 @@ def main():
     setup_rm(subparsers)
     setup_show(subparsers)
     setup_list(subparsers)
+    setup_stats(subparsers)
+    setup_export(subparsers)
+    setup_import(subparsers)
     setup_push(subparsers)
     setup_gen_token(subparsers)
     setup_run(subparsers)
     args = parser.parse_args()
     args.func(args)
 
+def _header_names(headers, explicit=False):
+    used_names = dict()
+    if not explicit:
+        expand = [False] * len(headers)
+        for idx, (category, name) in enumerate(headers):
+            withoutexp = used_names.setdefault(name, idx)
+            withexp = used_names.setdefault(category + '.' + name, idx)
+            if withoutexp != idx:
+                expand[idx] = True
+                expand[withoutexp] = True
+            if withexp != idx:
+                expand[idx] = True
+                expand[withoutexp] = True
+    else:
+        expand = [True] * len(headers)
+    names = []
+    for (category, name), should_expand in zip(headers, expand):
+        if should_expand:
+            names.append(category + '.' + name)
+        else:
+            names.append(name)
+    return names
+
+def _fields_indices(headers, fields):
+    # Keep the first index of each name, as list.index would
+    explicit_indices = dict()
+    for idx, name in enumerate(_header_names(headers, explicit=True)):
+        explicit_indices.setdefault(name, idx)
+    implicit_indices = dict()
+    for idx, name in enumerate(_header_names(headers, explicit=False)):
+        implicit_indices.setdefault(name, idx)
+    indices = []
+    for field in fields:
+        try:
+            indices.append(explicit_indices[field])
+        except KeyError:
+            try:
+                indices.append(implicit_indices[field])
+            except KeyError:
+                raise KeyError('Field "{}" not found or ambiguous.'.format(field))
+    return indices
+
+def _sort_key(values, reverse):
+    key = tuple()
+    for val in values:
+        # Always put None at the end
+        if val is None:
+            key = key + (not reverse, None)
+        else:
+            key = key + (reverse, val)
+    return key
+
+def top_rows(rows, fields, k, reverse=False):
+    '''
+    Returns the first k rows, in the order of :py:meth:`TableData.sort`,
+    without storing the other rows.
+    '''
+    import heapq
+    def key_func(data):
+        return _sort_key([value for _, value in _select_fields(fields, data)], reverse)
+    select = heapq.nlargest if reverse else heapq.nsmallest
+    return select(k, rows, key=key_func)
+
 class TableData(object):
-    def __init__(self):
+    def __init__(self, rows=()):
         self.headers = list()
         self.rows = list()
+        self._headers_indices = dict()
+        self._header_names = dict()
+        for data in rows:
+            self.add_row(data)
+
+    def _header_index(self, key):
+        try:
+            return self._headers_indices[key]
+        except KeyError:
+            idx = len(self.headers)
+            self.headers.append(key)
+            self._headers_indices[key] = idx
+            self._header_names.clear()
+            return idx
+
+    def _set_headers(self, headers):
+        self.headers = headers
+        self._headers_indices = {key: idx for idx, key in enumerate(headers)}
+        self._header_names.clear()
 
     def add_row(self, data):
         row = [None] * len(self.headers)
         for key, value in data.items():
-            try:
-                idx = self.headers.index(key)
-            except ValueError:
-                idx = len(self.headers)
-                self.headers.append(key)
+            idx = self._header_index(key)
             if idx >= len(row):
                 row.extend([None] * (idx - len(row) + 1))
             row[idx] = value
         self.rows.append(row)
 
     def header_names(self, explicit=False):
-        used_names = dict()
-        if not explicit:
-            expand = [False] * len(self.headers)
-            for idx, (category, name) in enumerate(self.headers):
-                withoutexp = used_names.setdefault(name, idx)
-                withexp = used_names.setdefault(category + '.' + name, idx)
-                if withoutexp != idx:
-                    expand[idx] = True
-                    expand[withoutexp] = True
-                if withexp != idx:
-                    expand[idx] = True
-                    expand[withoutexp] = True
-        else:
-            expand = [True] * len(self.headers)
-        names = []
-        for (category, name), should_expand in zip(self.headers, expand):
-            if should_expand:
-                names.append(category + '.' + name)
-            else:
-                names.append(name)
-        return names
+        try:
+            return self._header_names[explicit]
+        except KeyError:
+            names = _header_names(self.headers, explicit)
+            self._header_names[explicit] = names
+            return names
 
     def _get_fields_indices(self, fields):
-        indices = []
-        for field in fields:
-            try:
-                indices.append(self.header_names(explicit=True).index(field))
-            except ValueError:
-                try:
-                    indices.append(self.header_names(explicit=False).index(field))
-                except ValueError:
-                    raise KeyError('Field "{}" not found or ambiguous.'.format(field))
-        return indices
+        return _fields_indices(self.headers, fields)
 
     def _filter_columns(self, indices):
         self.rows = [[row[idx] if idx < len(row) else None for idx in indices] for row in self.rows]
-        self.headers = [self.headers[idx] for idx in indices]
+        self._set_headers([self.headers[idx] for idx in indices])
 
     def sort(self, fields, reverse=False):
         indices = self._get_fields_indices(fields)
         def key_func(row):
-            key = tuple()
-            for idx in indices:
-                if idx < len(row):
-                    val = row[idx]
-                else:
-                    val = None
-                # Always put None at the end
-                if val is None:
-                    key = key + (not reverse, None)
-                else:
-                    key = key + (reverse, val)
-            return key
+            return _sort_key([row[idx] if idx < len(row) else None for idx in indices], reverse)
         self.rows = sorted(self.rows, key=key_func, reverse=reverse)
 
     def filter_categories(self, categories):
@@ -479,13 +1267,153 @@ class TableData(object):
                 print()
 
     def print_table(self, fmt='psql', include_headers=True):
+        if fmt == 'plain' and not include_headers:
+            # Same layout as streamed tables
+            layout = _PlainLayout(self.rows)
+            for values in self.rows:
+                print(layout.format(values))
+            return
+        from tabulate import tabulate
         if include_headers:
             print(tabulate(self.rows, self.header_names(), tablefmt=fmt))
         else:
             print(tabulate(self.rows, tablefmt=fmt))
 
-def exp_table(experiments):
-    data = TableData()
+class TableStream(object):
+    '''
+    Table whose rows are printed as they are produced, without being stored.
+    The columns, and their widths, are determined by the first rows (at least
+    :py:attr:`BATCH_SIZE`, and until all the selected fields are found). The
+    table thus cannot be sorted or printed with headers.
+    '''
+    #: Minimum number of rows read before the first one is printed.
+    BATCH_SIZE = 100
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._categories = None
+        self._fields = None
+
+    def filter_categories(self, categories):
+        self._categories = frozenset(categories)
+
+    def filter_fields(self, fields):
+        self._fields = list(fields)
+
+    def _read_columns(self):
+        # Returns the first rows, as a TableData whose columns are the
+        # selected ones (raising KeyError like TableData.filter_fields if a
+        # field is not found in any row)
+        table = TableData(itertools.islice(self._rows, self.BATCH_SIZE))
+        if self._fields is not None:
+            while True:
+                try:
+                    indices = table._get_fields_indices(self._fields)
+                    break
+                except KeyError:
+                    data = next(self._rows, None)
+                    if data is None:
+                        raise
+                    table.add_row(data)
+            table._filter_columns(indices)
+        elif self._categories is not None:
+            table.filter_categories(self._categories)
+        return table
+
+    def print_paragraphs(self):
+        table = self._read_columns()
+        fields = table.header_names()
+        first = True
+        for values in itertools.chain(table.rows, self._remaining_rows(table.headers)):
+            if not first:
+                print()
+            first = False
+            for field, value in zip(fields, values):
+                if value is not None:
+                    print('{}: {}'.format(field, value))
+
+    def print_table(self, fmt='plain', include_headers=False):
+        if include_headers or fmt != 'plain':
+            raise ValueError('Streamed tables can only be printed in the plain format, without headers.')
+        table = self._read_columns()
+        layout = _PlainLayout(table.rows)
+        for values in table.rows:
+            print(layout.format(values))
+        sys.stdout.flush()
+        for i, values in enumerate(self._remaining_rows(table.headers), 1):
+            print(layout.format(values))
+            if i % self.BATCH_SIZE == 0:
+                sys.stdout.flush()
+
+    def _remaining_rows(self, headers):
+        # The columns of the other rows are ignored
+        for data in self._rows:
+            yield [data.get(key) for key in headers]
+
+class _PlainLayout(object):
+    '''
+    Layout of a table printed without borders nor headers: the numbers are
+    aligned to the right, and the other values to the left. The widths of
+    the columns are computed from some rows, and wider values of other rows
+    overflow their cell.
+    '''
+    def __init__(self, rows):
+        rows = list(rows)
+        num_columns = max([len(values) for values in rows] or [0])
+        self.widths = [0] * num_columns
+        self.numeric = [True] * num_columns
+        for values in rows:
+            for idx, value in enumerate(values):
+                if value is None:
+                    continue
+                self.widths[idx] = max(self.widths[idx], len(_plain_cell(value)))
+                self.numeric[idx] = self.numeric[idx] and _is_number(value)
+
+    def format(self, values):
+        cells = []
+        for idx, value in enumerate(values):
+            text = _plain_cell(value)
+            width = self.widths[idx] if idx < len(self.widths) else 0
+            if idx < len(self.numeric) and self.numeric[idx]:
+                cells.append(text.rjust(width))
+            else:
+                cells.append(text.ljust(width))
+        return '  '.join(cells).rstrip()
+
+def _plain_cell(value):
+    # Same rendering as tabulate
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return format(value, 'g')
+    return '{}'.format(value)
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, numbers.Number):
+        return True
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def _select_fields(fields, data):
+    items = []
+    for field in fields:
+        key = tuple(field.split('.', 1))
+        if key not in data:
+            keys = [key for key in data if key[1] == field]
+            if len(keys) > 1:
+                raise KeyError('Field "{}" is ambiguous.'.format(field))
+            # Missing fields are allowed, since they can be present in other
+            # rows
+            key = keys[0] if keys else ('', field)
+        items.append((key, data.get(key)))
+    return items
+
+def exp_rows(experiments):
     for exp in experiments:
         row = {
             (DEFAULT_CATEGORY, 'name'): exp.name,
@@ -495,11 +1423,9 @@ def exp_table(experiments):
         if isinstance(exp, schedy.RandomSearch):
             for name, dist in exp.distributions.items():
                 row[('hyperparameter', name)] = '{} ({})'.format(dist._FUNC_NAME, json_dumps(dist._args(), cls=schedy.encoding.SchedyJSONEncoder))
-        data.add_row(row)
-    return data
+        yield row
 
-def job_table(jobs):
-    data = TableData()
+def job_rows(jobs):
     for job in jobs:
         row = {
             (DEFAULT_CATEGORY, 'id'): job.job_id,
@@ -510,8 +1436,38 @@ def job_table(jobs):
         if job.results is not None:
             for name, value in job.results.items():
                 row[('result', name)] = value
-        data.add_row(row)
-    return data
+        yield row
+
+def exp_table(experiments):
+    return TableData(exp_rows(experiments))
+
+def job_table(jobs):
+    return TableData(job_rows(jobs))
+
+def job_field(name):
+    category, sep, field_name = name.partition('.')
+    if category == DEFAULT_CATEGORY and field_name in ('id', 'status'):
+        return field_name
+    if sep and category in JOB_CATEGORY_KEYS:
+        return JOB_CATEGORY_KEYS[category] + '.' + field_name
+    if name == 'status':
+        return name
+    raise KeyError('Field "{}" is ambiguous, use hyperparameter.{} or result.{}.'.format(name, name, name))
+
+def job_fields(names):
+    fields = []
+    for name in names:
+        if name in ('id', 'status'):
+            continue
+        try:
+            field = job_field(name)
+        except KeyError:
+            # Could be either a hyperparameter or a result
+            fields.extend(key + '.' + name for key in JOB_CATEGORY_KEYS.values())
+        else:
+            if field not in ('id', 'status'):
+                fields.append(field)
+    return fields
 
 def print_exp(exp):
     exp_table([exp]).print_paragraphs()
@@ -6,44 +6,32 @@ from six import raise_from
 from .experiments import Experiment, RandomSearch, ManualSearch, PopulationBasedTraining, _make_experiment
 from .jwt import JWTTokenAuth
 from .pagination import PageObjectsIterator
+from .artifacts import ArtifactStore
+from .sqlite import is_sqlite_root, is_memory_root
+from .transport import Transport, SQLiteTransport, make_transport
 from . import errors, encoding
 from .compat import json_dumps
 
 import functools
 import json
-import requests
 import os.path
 import datetime
-from requests.compat import urljoin, quote as urlquote
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+import threading
+from six.moves.urllib.parse import urljoin, quote as urlquote
 import logging
 
 logger = logging.getLogger(__name__)
 
-class SchedyRetry(Retry):
-    BACKOFF_MAX = 8 * 60
-
-    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
-        logger.warn('Error while querying Schedy service, retrying.')
-        if response is not None:
-            logger.warn('Server message: {!s}'.format(response.data))
-        return super(SchedyRetry, self).increment(
-            method=method,
-            url=url,
-            response=response,
-            error=error,
-            *args,
-            **kwargs)
-
 #: Number of retries if the authentication fails.
 NUM_AUTH_RETRIES = 2
+#: Default maximum number of connections kept open with the Schedy service.
+DEFAULT_MAX_CONNECTIONS = 10
 
 def _default_config_path():
     return os.path.join(os.path.expanduser('~'), '.schedy', 'client.json')
 
 class SchedyDB(object):
-    def __init__(self, config_path=None, config_override=None):
+    def __init__(self, config_path=None, config_override=None, max_connections=DEFAULT_MAX_CONNECTIONS, transport=None):
         '''
         SchedyDB is the central component of Schedy. It represents your
         connection the the Schedy service.
@@ -55,8 +43,21 @@ class SchedyDB(object):
                 instructions about how to use this file.
             config_override (dict): Content of the configuration. You can use this to
                 if you do not want to use a configuration file.
+            max_connections (int): Maximum number of connections kept open
+                with the Schedy service. Increase it if this object is used by
+                more threads concurrently.
+            transport (str or schedy.transport.Transport): Transport used to
+                send the requests, or name of the transport (see
+                :py:mod:`schedy.transport`). By default, the ``transport``
+                value of the configuration is used, if any.
+
+        If the root of the configuration is a ``sqlite:`` URL, the experiments
+        and jobs are stored in a local SQLite database instead (see
+        :py:mod:`schedy.sqlite`), and no credentials are needed. Likewise,
+        they are stored in memory if the root is a ``memory:`` URL.
         '''
-        self._load_config(config_path, config_override)
+        self._load_config(config_path, config_override, transport)
+        self.max_connections = max_connections
         # Add the trailing slash if it's not there
         if len(self.root) == 0 or self.root[-1] != '/':
             self.root = self.root + '/'
@@ -64,7 +65,10 @@ class SchedyDB(object):
         self._register_default_schedulers()
         self._jwt_token = None
         self._jwt_expiration = datetime.datetime(year=1970, month=1, day=1)
-        self._session = None
+        self._transport = transport if isinstance(transport, Transport) else None
+        # Protects the transport and the authentication token when this object
+        # is shared by several threads
+        self._lock = threading.RLock()
 
     def _authenticate(self):
         '''
@@ -90,13 +94,19 @@ class SchedyDB(object):
         self._jwt_token = JWTTokenAuth(jwt_token, expires_at)
         logger.debug('A new token was obtained.')
 
-    def add_experiment(self, exp):
+    def add_experiment(self, exp, exist_ok=False):
         '''
         Adds an experiment to the Schedy service. Use this function to create
         new experiments.
 
         Args:
             exp (schedy.Experiment): The experiment to add.
+            exist_ok (bool): If true and an experiment with the same name
+                exists already, ``exp`` is bound to this experiment (without
+                checking its scheduler) instead of raising
+                :py:exc:`schedy.errors.ResourceExistsError`. Used by the
+                workers of experiments whose jobs are created by the client,
+                like :py:class:`schedy.QuasiRandomSearch`.
 
         Example:
             >>> db = schedy.SchedyDB()
@@ -108,8 +118,9 @@ class SchedyDB(object):
         data = json_dumps(content, cls=encoding.SchedyJSONEncoder)
         response = self._authenticated_request('PUT', url, data=data, headers={'If-None-Match': '*'})
         # Handle code 412: Precondition failed
-        if response.status_code == requests.codes.precondition_failed:
-            raise errors.ResourceExistsError(response.text, response.status_code)
+        if response.status_code == 412:
+            if not exist_ok:
+                raise errors.ResourceExistsError(response.text, response.status_code)
         else:
             errors._handle_response_errors(response)
         exp._db = self
@@ -181,7 +192,7 @@ class SchedyDB(object):
     def _job_url(self, experiment, job):
         return urljoin(self.root, 'experiments/{}/jobs/{}/'.format(urlquote(experiment, safe=''), urlquote(job, safe='')))
 
-    def _load_config(self, config_path, config):
+    def _load_config(self, config_path, config, transport=None):
         if config is None:
             if config_path is None:
                 config_path = _default_config_path()
@@ -191,49 +202,65 @@ class SchedyDB(object):
                 with open(config_path) as f:
                     config = json.load(f)
         self.root = config['root']
-        self.email = config['email']
         self.token_type = config.get('token_type', 'api_token')
         allowed_token_types = ['api_token', 'password']
         if self.token_type not in allowed_token_types:
             raise ValueError('Configuration value token_type must be one of {}.'.format(', '.join(allowed_token_types)))
-        self.api_token = config['token']
+        if is_sqlite_root(self.root):
+            default_transport = 'sqlite'
+        elif is_memory_root(self.root):
+            default_transport = 'memory'
+        else:
+            default_transport = 'requests'
+        self.transport_name = config.get('transport', default_transport)
+        if transport is not None and not isinstance(transport, Transport):
+            self.transport_name = transport
+        #: Store of the artifacts of the jobs (see :py:mod:`schedy.artifacts`).
+        self.artifacts = ArtifactStore(config.get('artifacts_dir'))
+        #: Store of the large result arrays (see :py:mod:`schedy.sidecar`), or
+        #: None if they are kept in the results.
+        self.sidecars = None
+        if config.get('sidecar_dir') is not None:
+            from .sidecar import SidecarStore, DEFAULT_THRESHOLD
+            self.sidecars = SidecarStore(config['sidecar_dir'], config.get('sidecar_threshold', DEFAULT_THRESHOLD))
+        if isinstance(transport, Transport):
+            local = isinstance(transport, SQLiteTransport)
+        else:
+            local = self.transport_name in ('sqlite', 'memory')
+        if local:
+            # Local transports do not authenticate their clients
+            self.email = config.get('email')
+            self.api_token = config.get('token')
+        else:
+            self.email = config['email']
+            self.api_token = config['token']
 
     def _authenticated_request(self, *args, **kwargs):
         response = None
         for _ in range(NUM_AUTH_RETRIES):
             if self._jwt_token is None or self._jwt_token.expires_soon():
-                self._authenticate()
+                with self._lock:
+                    # Another thread might have renewed the token already
+                    if self._jwt_token is None or self._jwt_token.expires_soon():
+                        self._authenticate()
             response = self._perform_request(*args, auth=self._jwt_token, **kwargs)
-            if response.status_code != requests.codes.unauthorized:
+            # Unauthorized
+            if response.status_code != 401:
                 break
         return response
 
-    def _make_session(self):
-        self._session = requests.Session()
-        retry_mgr = SchedyRetry(
-                total=10,
-                read=10,
-                connect=10,
-                backoff_factor=0.4,
-                status_forcelist=frozenset((requests.codes.server_error, requests.codes.unavailable)),
-                # Careful: POST and PATCH are in the whitelist. This means that
-                # the server should not be in an incomplete state or POSTING
-                # and PATCHING twice could do weird things. We do this because
-                # we do not want Schedy to crash in the face of the user when
-                # there's a connection or benign error.
-                method_whitelist=frozenset(('HEAD', 'TRACE', 'GET', 'PUT', 'OPTIONS', 'DELETE', 'POST', 'PATCH')),
-            )
-        adapter = HTTPAdapter(max_retries=retry_mgr)
-        self._session.mount('http://', adapter)
-        self._session.mount('https://', adapter)
+    def _make_transport(self):
+        self._transport = make_transport(self.transport_name, self.root, self.max_connections)
 
     def _perform_request(self, *args, **kwargs):
-        if self._session is None:
-            self._make_session()
+        if self._transport is None:
+            with self._lock:
+                if self._transport is None:
+                    self._make_transport()
         if 'data' in kwargs:
             logger.debug('Sent headers: %s', kwargs.get('headers'))
             logger.debug('Sent data: %s', kwargs['data'])
-        req = self._session.request(*args, **kwargs)
+        req = self._transport.request(*args, **kwargs)
         logger.debug('Received headers: %s', req.headers)
         logger.debug('Received data: %s', req.text)
         return req
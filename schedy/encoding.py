@@ -3,24 +3,23 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import json
+import sys
 from traceback import format_exc
 import warnings
 
-_additional_convert = []
-
-# Only add conversions if the modules exist.
-# This way, we do not add unnecessary dependencies
-try:
-    import numpy as np
-    def _np_convert(obj):
-        if isinstance(obj, np.ndarray):
-            return obj.tolist(), True
-        if isinstance(obj, np.generic):
-            return np.asscalar(obj), True
+def _np_convert(obj):
+    # An object can only be a numpy object if numpy was imported by the user,
+    # so there is no need to import it here (it is slow to import).
+    np = sys.modules.get('numpy')
+    if np is None:
         return None, False
-    _additional_convert.append(_np_convert)
-except ImportError:
-    pass
+    if isinstance(obj, np.ndarray):
+        return obj.tolist(), True
+    if isinstance(obj, np.generic):
+        return obj.item(), True
+    return None, False
+
+_additional_convert = [_np_convert]
 
 class SchedyJSONEncoder(json.JSONEncoder):
     def default(self, obj):
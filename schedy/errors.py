@@ -2,8 +2,6 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import requests
-
 class SchedyError(Exception):
     '''
     Base class for all Schedy exceptions.
@@ -95,11 +93,14 @@ def _handle_response_errors(response):
     code = response.status_code
     if code in [200, 201, 204]:
         return
-    if code == requests.codes.forbidden:
+    # Forbidden
+    if code == 403:
         raise AuthenticationError(response.text, code)
-    if code == requests.codes.unauthorized:
+    # Unauthorized
+    if code == 401:
         raise ReauthenticateError(response.text, code)
-    if code == requests.codes.precondition_failed:
+    # Precondition failed
+    if code == 412:
         raise UnsafeUpdateError(response.text, code)
     if code in range(400, 500):
         raise ClientRequestError(response.text, code)
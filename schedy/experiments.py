@@ -1,17 +1,21 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import absolute_import, division, print_function, unicode_literals
-from six import raise_from
+from six import raise_from, string_types
 
-import requests
-from requests.compat import urljoin
+from six.moves.urllib.parse import urljoin
 import functools
+import hashlib
+import itertools
 import logging
+# Not named random, which would shadow schedy.random with the star imports
+# of the package
+import random as _random
 
-from . import errors, encoding
+from . import errors, encoding, quasirandom
 from .random import _DISTRIBUTION_TYPES
 from .pbt import _EXPLOIT_STRATEGIES, _EXPLORE_STRATEGIES
-from .jobs import Job, _make_job, _job_from_response
+from .jobs import Job, INTERNAL_HYPERPARAMETER, _make_job, _job_from_response, _job_matches, _make_projected_job
 from .pagination import PageObjectsIterator
 from .compat import json_dumps
 
@@ -20,6 +24,28 @@ logger = logging.getLogger(__name__)
 def _check_status(status):
     return status in (Experiment.RUNNING, Experiment.DONE)
 
+def _distributions_from_params(params):
+    try:
+        items = params.items()
+    except AttributeError as e:
+        raise ValueError('Expected parameters as a dict, found {}.'.format(type(params)))
+    distributions = dict()
+    for key, dist_def in items:
+        try:
+            dist_name_raw, dist_args = next(iter(dist_def.items()))
+            dist_name = str(dist_name_raw)
+        except (KeyError, TypeError) as e:
+            raise_from(ValueError('Invalid distribution definition.'), e)
+        try:
+            dist_type = _DISTRIBUTION_TYPES[dist_name]
+        except KeyError as e:
+            raise ValueError('Invalid or unknown distribution type: {}.'.format(dist_name))
+        distributions[key] = dist_type._from_args(dist_args)
+    return distributions
+
+def _distributions_params(distributions):
+    return {key: {dist._FUNC_NAME: dist._args()} for key, dist in distributions.items()}
+
 class Experiment(object):
     #: Status of a running experiment.
     RUNNING = 'RUNNING'
@@ -57,18 +83,24 @@ class Experiment(object):
                 **kwargs)
         assert self._db is not None, 'Experiment was not added to a database'
         url = self._jobs_url()
-        map_def = partial_job._to_map_definition()
+        map_def = partial_job._to_map_definition(self._db.sidecars)
         data = json_dumps(map_def, cls=encoding.SchedyJSONEncoder)
         response = self._db._authenticated_request('POST', url, data=data)
         errors._handle_response_errors(response)
         return _job_from_response(self, response)
 
-    def next_job(self):
+    def next_job(self, memo=None):
         '''
         Returns a new job to be worked on. This job will be set in the
         ``RUNNING`` state. This function handles everything so that two
         workers never start working on the same job.
 
+        Args:
+            memo (schedy.fingerprint.FingerprintIndex): If set, the jobs
+                whose hyperparameters were already used by a ``DONE`` job of
+                the index are completed with a copy of its results, and
+                skipped.
+
         Returns:
             schedy.Job: The instance of the requested job.
         '''
@@ -80,7 +112,8 @@ class Experiment(object):
         # fail, so try and try again)
         while job is None:
             response = self._db._authenticated_request('GET', url)
-            if response.status_code == requests.codes.no_content:
+            # No content
+            if response.status_code == 204:
                 raise errors.NoJobError('No job left for experiment {}.'.format(self.name), None)
             errors._handle_response_errors(response)
             job = _job_from_response(self, response)
@@ -89,22 +122,155 @@ class Experiment(object):
             except errors.UnsafeUpdateError:
                 job = None
                 logger.debug('Two workers tried to start working on the same job, retrying.', exc_info=True)
+                continue
+            if memo is not None and memo.reuse(job) is not None:
+                job = None
         return job
 
-    def all_jobs(self):
+    def all_jobs(self, status=None, fields=None, where=None, include_internal=False):
         '''
         Retrieves all the jobs belonging to this experiment.
 
+        The filters and the field projection are sent to the service, so that
+        only the requested data is transferred. They are applied again on the
+        client side, so that the results are the same with services that do
+        not support them.
+
+        Args:
+            status (str or list): Only retrieve the jobs with this status (or
+                with one of these statuses). See :ref:`job_status`.
+            fields (list): Only retrieve these fields of the jobs, among
+                ``"hyperparameters"``, ``"results"``, or a single
+                hyperparameter or result (e.g. ``"hyperparameters.x"`` or
+                ``"results.loss"``). The id and the status of the jobs are
+                always retrieved. The jobs returned with this option are
+                incomplete, you should not push them back using
+                :py:meth:`schedy.Job.put`.
+            where (dict): Only retrieve the jobs whose fields are equal to the
+                values of this dictionary. The keys are field names, as for
+                ``fields``. For example, ``{"hyperparameters.x": 1}``.
+            include_internal (bool): Whether to retrieve the jobs in which the
+                client stores its own state too (see
+                :py:data:`schedy.jobs.INTERNAL_HYPERPARAMETER`).
+
         Returns:
             iterator of :py:class:`schedy.Job`: An iterator over all the jobs of this experiment.
+
+        Example:
+            >>> losses = [job.results.get('loss') for job in exp.all_jobs(status=schedy.Job.DONE, fields=['results.loss'])]
         '''
         assert self._db is not None, 'Experiment was not added to a database'
         url = self._jobs_url()
+        params = dict()
+        statuses = None
+        if status is not None:
+            if isinstance(status, string_types):
+                statuses = [status]
+            else:
+                statuses = list(status)
+            params['status'] = ','.join(statuses)
+        obj_creation_func = functools.partial(_make_job, self)
+        if fields is not None:
+            # The fields used by the filters must be retrieved so that the
+            # filters can be applied on the client side
+            fields = list(fields) + [field for field in (where or {}) if field not in fields]
+            obj_creation_func = functools.partial(_make_projected_job, self, fields=fields)
+            if not include_internal:
+                # Needed to recognize the internal jobs, but not returned
+                fields = fields + ['hyperparameters.' + INTERNAL_HYPERPARAMETER]
+            params['fields'] = ','.join(fields)
+        if where:
+            params['where'] = json_dumps(where, cls=encoding.SchedyJSONEncoder)
+        item_filter_func = functools.partial(_job_matches, statuses=statuses, where=where, include_internal=include_internal)
         return PageObjectsIterator(
             reqfunc=functools.partial(self._db._authenticated_request, 'GET', url),
-            obj_creation_func=functools.partial(_make_job, self),
+            obj_creation_func=obj_creation_func,
+            params=params,
+            item_filter_func=item_filter_func,
         )
 
+    def best(self, result, k=1, mode='min', status=None, where=None, fields=None):
+        '''
+        Retrieves the best jobs according to a result. The jobs are streamed,
+        and at most ``k`` jobs are kept in memory.
+
+        Args:
+            result (str): Name of the result.
+            k (int): Number of jobs to retrieve.
+            mode (str): ``'min'`` (:py:data:`schedy.pbt.MINIMIZE`) if lower
+                values are better, ``'max'`` (:py:data:`schedy.pbt.MAXIMIZE`)
+                otherwise.
+            status (str or list): Only consider the jobs with this status (or
+                with one of these statuses). See :ref:`job_status`.
+            where (dict): Only consider the jobs whose fields are equal to the
+                values of this dictionary (see :py:meth:`all_jobs`).
+            fields (list): Only retrieve these fields of the jobs (see
+                :py:meth:`all_jobs`). The result is always retrieved.
+
+        Returns:
+            list of :py:class:`schedy.Job`: The best jobs, best first.
+
+        Example:
+            >>> incumbent, = exp.best('loss')
+        '''
+        from .analytics import top_k
+        if fields is not None:
+            fields = list(fields) + ['results.' + result]
+        jobs = self.all_jobs(status=status, fields=fields, where=where)
+        return top_k(jobs, result, k, mode)
+
+    def summary(self, results=None, status=None, where=None, sketch_size=None):
+        '''
+        Summarizes the results of the jobs. The jobs are streamed, and each
+        result is summarized by a mergeable quantile sketch whose size does
+        not depend on the number of jobs.
+
+        Args:
+            results (list): Names of the summarized results. By default, all
+                the numeric results are summarized.
+            status (str or list): Only consider the jobs with this status (or
+                with one of these statuses). See :ref:`job_status`.
+            where (dict): Only consider the jobs whose fields are equal to the
+                values of this dictionary (see :py:meth:`all_jobs`).
+            sketch_size (int): Size parameter of the quantile sketches (see
+                :py:class:`schedy.analytics.QuantileSketch`).
+
+        Returns:
+            schedy.analytics.ExperimentSummary: The summary.
+
+        Example:
+            >>> summary = exp.summary(results=['loss'])
+            >>> summary.results['loss'].quantile(0.5)
+        '''
+        from .analytics import ExperimentSummary, DEFAULT_SKETCH_SIZE
+        summary = ExperimentSummary(sketch_size or DEFAULT_SKETCH_SIZE)
+        if results is not None:
+            fields = ['results.' + name for name in results]
+        else:
+            fields = ['results']
+        for job in self.all_jobs(status=status, fields=fields, where=where):
+            summary.update(job, results)
+        return summary
+
+    def map(self, func, workers=None, executor='thread', max_jobs=None, poll_interval=None, memo=None):
+        '''
+        Processes the jobs of this experiment with a pool of threads or
+        processes. See :py:class:`schedy.Worker` for a description of the
+        arguments.
+
+        Returns:
+            list of :py:class:`schedy.Job`: The processed jobs.
+
+        Example:
+            >>> def train(hyperparameters):
+            >>>     return {'loss': train_model(**hyperparameters)}
+            >>> jobs = exp.map(train, workers=8, executor='process')
+        '''
+        from .worker import Worker
+        assert self._db is not None, 'Experiment was not added to a database'
+        worker = Worker(self, func, workers=workers, executor=executor, max_jobs=max_jobs, poll_interval=poll_interval, memo=memo)
+        return worker.run()
+
     def get_job(self, job_id):
         '''
         Retrieves a job by id.
@@ -241,28 +407,334 @@ class RandomSearch(Experiment):
         super(RandomSearch, self).__init__(name, status)
         self.distributions = distributions
 
+    def sample_jobs(self, n, seed=None):
+        '''
+        Samples hyperparameters from the distributions of this experiment on
+        the client side, without creating any job. Requires NumPy.
+
+        Args:
+            n (int): Number of sets of hyperparameters to sample.
+            seed (numpy.random.Generator or int): Random generator, or seed
+                of a new generator, used to make the sampling reproducible.
+
+        Returns:
+            list: A list of ``n`` dictionaries of hyperparameters.
+
+        Example:
+            >>> manual = db.get_experiment('ManualExperiment')
+            >>> for hyperparameters in random_exp.sample_jobs(1000, seed=42):
+            >>>     manual.add_job(hyperparameters=hyperparameters)
+        '''
+        from .random import _make_rng
+        rng = _make_rng(seed)
+        # Sorting the names makes the samples only depend on the seed
+        names = sorted(self.distributions)
+        columns = [self.distributions[name].sample(n, rng).tolist() for name in names]
+        return [dict(zip(names, values)) for values in zip(*columns)] if names else [dict() for _ in range(n)]
+
     @classmethod
     def _create_from_params(cls, name, status, params):
-        try:
-            items = params.items()
-        except AttributeError as e:
-            raise ValueError('Expected parameters as a dict, found {}.'.format(type(params)))
-        distributions = dict()
-        for key, dist_def in items:
-            try:
-                dist_name_raw, dist_args = next(iter(dist_def.items()))
-                dist_name = str(dist_name_raw)
-            except (KeyError, TypeError) as e:
-                raise_from(ValueError('Invalid distribution definition.'), e)
-            try:
-                dist_type = _DISTRIBUTION_TYPES[dist_name]
-            except KeyError as e:
-                raise ValueError('Invalid or unknown distribution type: {}.'.format(dist_name))
-            distributions[key] = dist_type._from_args(dist_args)
+        distributions = _distributions_from_params(params)
         return cls(name=name, distributions=distributions, status=status)
 
     def _get_params(self):
-        return {key: {dist._FUNC_NAME: dist._args()} for key, dist in self.distributions.items()}
+        return _distributions_params(self.distributions)
+
+class QuasiRandomSearch(ManualSearch):
+    #: Value of :py:data:`schedy.jobs.INTERNAL_HYPERPARAMETER` identifying
+    #: the job which stores the position of the next batch in the sequence
+    #: (under the ``next_index`` hyperparameter). This job has the ``PRUNED``
+    #: status, so that it is never run.
+    CURSOR_JOB = 'quasirandom_cursor'
+
+    def __init__(self, name, distributions, method=quasirandom.SOBOL, batch_size=64, seed=None, status=Experiment.RUNNING):
+        '''
+        Represents a quasi-random search. The hyperparameters are sampled from
+        a low-discrepancy sequence, which covers the search space more evenly
+        than independent random samples.
+
+        The jobs are created by the client: when the queue is empty,
+        :py:meth:`next_job` queues a batch of new jobs, taken from the
+        sequence where the previous batches ended. Requires NumPy.
+
+        The service stores this experiment as a manual search, and the
+        parameters of the sequence are only known by the clients. Each worker
+        creates the experiment with the same parameters, and adds it with
+        ``db.add_experiment(exp, exist_ok=True)``.
+
+        Args:
+            name (str): Name of the experiment. An experiment is uniquely
+                identified by its name.
+            distributions (dict): A dictionary of distributions (see
+                :py:mod:`schedy.random`), whose keys are the names of the
+                hyperparameters. The points of the sequence are mapped to
+                each distribution through its inverse cumulative distribution
+                function.
+            method (str): :py:data:`schedy.quasirandom.SOBOL` for a Sobol
+                sequence (at most
+                :py:data:`schedy.quasirandom.SOBOL_MAX_DIMENSIONS`
+                hyperparameters), or
+                :py:data:`schedy.quasirandom.LATIN_HYPERCUBE` for a Latin
+                hypercube design per batch.
+            batch_size (int): Number of jobs queued when the queue is empty.
+                Powers of 2 give the most balanced Sobol batches.
+            seed (int): Seed of the random shift of the Sobol sequence, or of
+                the Latin hypercube designs. By default, the seed is derived
+                from the name of the experiment, so that all the workers use
+                the same sequence.
+            status (str): Status of the experiment. See :ref:`experiment_status`.
+        '''
+        super(QuasiRandomSearch, self).__init__(name, status)
+        if method not in (quasirandom.SOBOL, quasirandom.LATIN_HYPERCUBE):
+            raise ValueError('Invalid quasi-random method: {!r}.'.format(method))
+        if method == quasirandom.SOBOL and len(distributions) > quasirandom.SOBOL_MAX_DIMENSIONS:
+            raise ValueError('The Sobol sequence supports at most {} hyperparameters.'.format(quasirandom.SOBOL_MAX_DIMENSIONS))
+        if seed is None:
+            seed = _name_seed(name)
+        self.distributions = distributions
+        self.method = method
+        self.batch_size = batch_size
+        self.seed = seed
+        self._cursor_id = None
+
+    def next_job(self, memo=None):
+        '''
+        Returns a new job to be worked on, after queuing a new batch of jobs
+        if the queue is empty. See :py:meth:`schedy.Experiment.next_job`.
+
+        Args:
+            memo (schedy.fingerprint.FingerprintIndex): Index of the jobs whose
+                results can be reused.
+
+        Returns:
+            schedy.Job: The instance of the requested job.
+        '''
+        added = False
+        while True:
+            try:
+                return super(QuasiRandomSearch, self).next_job(memo)
+            except errors.NoJobError:
+                # Either the jobs of the new batch were all claimed by other
+                # workers, or they were all reused
+                if added:
+                    raise
+                # The status might have been changed by another client
+                self.status = self._db.get_experiment(self.name).status
+                if self.status != Experiment.RUNNING:
+                    raise
+            # If another worker reserved a batch at the same time, its jobs
+            # are returned by the next call
+            added = len(self._add_batch(None, retry=False)) > 0
+
+    def add_batch(self, n=None):
+        '''
+        Queues the next jobs of the sequence.
+
+        The position of the next batch is stored in a job of the experiment
+        (see :py:attr:`CURSOR_JOB`), which is updated with
+        :py:meth:`schedy.Job.put`, so that workers filling the queue at the
+        same time reserve different parts of the sequence.
+
+        Args:
+            n (int): Number of jobs to queue. Default: ``batch_size``.
+
+        Returns:
+            list of :py:class:`schedy.Job`: The new jobs.
+        '''
+        return self._add_batch(n, retry=True)
+
+    def _add_batch(self, n, retry):
+        from .random import _make_rng
+        assert self._db is not None, 'Experiment was not added to a database'
+        if n is None:
+            n = self.batch_size
+        start = self._reserve(n, retry)
+        if start is None:
+            return []
+        names = sorted(self.distributions)
+        if self.method == quasirandom.SOBOL:
+            shift = _make_rng(self.seed).random(len(names))
+            points = quasirandom.sobol(start, n, len(names), shift)
+        else:
+            points = quasirandom.latin_hypercube(n, len(names), _make_rng([self.seed, start]))
+        columns = [self.distributions[name]._ppf(points[:, i]).tolist() for i, name in enumerate(names)]
+        return [self.add_job(hyperparameters=dict(zip(names, values))) for values in zip(*columns)]
+
+    def _reserve(self, n, retry):
+        # Returns the position of the reserved batch, or None if another
+        # worker updated the cursor first and retry is false
+        while True:
+            cursor = self._cursor_job()
+            start = int(cursor.hyperparameters.get('next_index', 0))
+            cursor.hyperparameters['next_index'] = start + n
+            try:
+                # Only succeeds if the cursor was not updated since it was
+                # retrieved
+                cursor.put()
+            except errors.UnsafeUpdateError:
+                if not retry:
+                    return None
+                logger.debug('Another worker reserved a batch of %s, retrying.', self.name, exc_info=True)
+                continue
+            return start
+
+    def _cursor_job(self):
+        if self._cursor_id is not None:
+            try:
+                return self.get_job(self._cursor_id)
+            except errors.ClientRequestError:
+                # Deleted in the meantime
+                self._cursor_id = None
+        where = {'hyperparameters.' + INTERNAL_HYPERPARAMETER: self.CURSOR_JOB}
+        created = None
+        while True:
+            cursor = next(iter(self.all_jobs(status=Job.PRUNED, where=where, include_internal=True)), None)
+            if cursor is not None:
+                break
+            created = self.add_job(hyperparameters={INTERNAL_HYPERPARAMETER: self.CURSOR_JOB, 'next_index': 0}, status=Job.PRUNED)
+        if created is not None and created.job_id != cursor.job_id:
+            # Another worker created a cursor at the same time: all the workers
+            # use the first one
+            created.delete(ensure=False)
+        self._cursor_id = cursor.job_id
+        return self.get_job(cursor.job_id)
+
+def _name_seed(name):
+    # Stable across processes and Python versions, unlike hash()
+    return int(hashlib.sha256(name.encode('utf-8')).hexdigest()[:8], 16)
+
+class GridSearch(ManualSearch):
+    def __init__(self, name, values, shuffle=False, seed=None, status=Experiment.RUNNING):
+        '''
+        Represents a grid search, that is to say an experiment whose jobs are
+        all the combinations of a list of values per hyperparameter.
+
+        The jobs are created by the client, with :py:meth:`add_jobs`. The
+        combinations are generated one at a time, so that grids of any size
+        can be queued without being stored in memory. The service stores
+        this experiment as a manual search: the values only need to be known
+        when the jobs are queued.
+
+        Args:
+            name (str): Name of the experiment. An experiment is uniquely
+                identified by its name.
+            values (dict): A dictionary of lists of values, whose keys are
+                the names of the hyperparameters.
+            shuffle (bool): Whether to queue the combinations in a random
+                order, so that the first jobs cover the whole grid instead of
+                varying only the last hyperparameters.
+            seed (int): Seed of the random order. By default, the seed is
+                derived from the name of the experiment, so that an
+                interrupted :py:meth:`add_jobs` can be resumed by another
+                process.
+            status (str): Status of the experiment. See :ref:`experiment_status`.
+        '''
+        super(GridSearch, self).__init__(name, status)
+        for hp_name, hp_values in values.items():
+            if isinstance(hp_values, string_types) or not isinstance(hp_values, (list, tuple)) or len(hp_values) == 0:
+                raise ValueError('The values of {} must be a non-empty list.'.format(hp_name))
+        if seed is None:
+            seed = _name_seed(name)
+        self.values = {hp_name: list(hp_values) for hp_name, hp_values in values.items()}
+        self.shuffle = shuffle
+        self.seed = seed
+
+    @property
+    def size(self):
+        '''
+        Number of combinations of the grid.
+        '''
+        size = 1
+        for hp_values in self.values.values():
+            size *= len(hp_values)
+        return size
+
+    def iter_hyperparameters(self, start=0):
+        '''
+        Generates the combinations of the grid, in the order in which
+        :py:meth:`add_jobs` queues them.
+
+        Args:
+            start (int): Number of combinations to skip.
+
+        Returns:
+            iterator of dict: The hyperparameters of each combination.
+        '''
+        # Sorting the names makes the order only depend on the seed
+        names = sorted(self.values)
+        columns = [self.values[hp_name] for hp_name in names]
+        if not self.shuffle:
+            combinations = itertools.product(*columns)
+        else:
+            combinations = (_grid_point(columns, index) for index in _permutation(self.size, self.seed))
+        for combination in itertools.islice(combinations, start, None):
+            yield dict(zip(names, combination))
+
+    def add_jobs(self, start=0, workers=None, callback=None):
+        '''
+        Queues the combinations of the grid, with concurrent requests (see
+        :py:func:`schedy.bulk.import_jobs`).
+
+        Args:
+            start (int): Number of combinations to skip, to resume an
+                interrupted call.
+            workers (int): Number of jobs added concurrently. Default:
+                :py:data:`schedy.bulk.DEFAULT_WORKERS`.
+            callback (callable): Function called with each
+                :py:class:`schedy.bulk.Record` (whose line is the position in
+                the grid, starting at 1), the new job (or None) and the error
+                (or None).
+
+        Returns:
+            tuple: The number of jobs added, and the number of jobs that could
+            not be added.
+        '''
+        from . import bulk
+        assert self._db is not None, 'Experiment was not added to a database'
+        if workers is None:
+            workers = bulk.DEFAULT_WORKERS
+        records = (
+            bulk.Record(line, json_dumps(hyperparameters, cls=encoding.SchedyJSONEncoder), {'hyperparameters': hyperparameters})
+            for line, hyperparameters in enumerate(self.iter_hyperparameters(start), start + 1)
+        )
+        return bulk.import_jobs(self, records, workers=workers, callback=callback)
+
+def _grid_point(columns, index):
+    # Mixed radix decomposition of the index, the last column varying the
+    # fastest like with itertools.product
+    point = []
+    for column in reversed(columns):
+        index, position = divmod(index, len(column))
+        point.append(column[position])
+    point.reverse()
+    return point
+
+def _permutation(n, seed):
+    # Random permutation of range(n) in constant memory: a Feistel network is
+    # a bijection of the integers of 2 * half_bits bits, and values outside of
+    # the range are encrypted again until they fall inside it
+    half_bits = max(1, ((n - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    rng = _random.Random(seed)
+    keys = [rng.getrandbits(32) for _ in range(4)]
+
+    def encrypt(value):
+        left, right = value >> half_bits, value & mask
+        for key in keys:
+            left, right = right, left ^ (_mix(right ^ key) & mask)
+        return (left << half_bits) | right
+
+    for index in range(n):
+        value = encrypt(index)
+        while value >= n:
+            value = encrypt(value)
+        yield value
+
+def _mix(value):
+    value = (value * 0x45d9f3b) & 0xffffffff
+    value ^= value >> 16
+    value = (value * 0x45d9f3b) & 0xffffffff
+    return value ^ (value >> 16)
 
 class PopulationBasedTraining(Experiment):
     _SCHEDULER_NAME = 'PBT'
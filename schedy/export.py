@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+'''
+Export of the jobs of an experiment for offline analysis.
+
+The jobs are streamed from the service and written as they are received, so
+that experiments of any size can be exported in bounded memory. In CSV and
+Parquet files, the hyperparameters and the results are flattened into
+columns named ``hyperparameter.<name>`` and ``result.<name>``. Since these
+columns are only known once all the jobs are received, the rows are first
+spooled to a temporary file.
+
+Example:
+    >>> with open('jobs.csv', 'w') as f:
+    >>>     schedy.export.write_csv(exp.all_jobs(), f)
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import math
+import numbers
+import tempfile
+
+import six
+from six import raise_from
+
+from . import encoding
+from .compat import json_dumps
+
+JSONL = 'jsonl'
+CSV = 'csv'
+PARQUET = 'parquet'
+#: Supported formats.
+FORMATS = (JSONL, CSV, PARQUET)
+#: Default number of rows of the row groups of Parquet files.
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+def _dumps(value):
+    return json_dumps(value, cls=encoding.SchedyJSONEncoder)
+
+def _job_definition(job):
+    map_def = {
+        'id': job.job_id,
+        'status': job.status,
+        'hyperparameters': job.hyperparameters,
+    }
+    if job.results:
+        map_def['results'] = job.results
+    return map_def
+
+def _flatten(job):
+    row = [('id', job.job_id), ('status', job.status)]
+    for name, value in job.hyperparameters.items():
+        row.append(('hyperparameter.' + name, value))
+    for name, value in (job.results or {}).items():
+        row.append(('result.' + name, value))
+    return row
+
+def write_jsonl(jobs, f):
+    '''
+    Writes the jobs as JSON lines: one JSON object per job, with the keys
+    ``id``, ``status``, ``hyperparameters`` and ``results``.
+
+    Args:
+        jobs (iterable of schedy.Job): The jobs.
+        f (file-object): File opened in text mode.
+
+    Returns:
+        int: The number of jobs written.
+    '''
+    count = 0
+    for job in jobs:
+        f.write(_dumps(_job_definition(job)) + '\n')
+        count += 1
+    return count
+
+class _Spool(object):
+    '''
+    Temporary file containing the flattened rows, and the columns found in
+    them, in order of appearance (the hyperparameters before the results).
+    '''
+    def __init__(self, jobs):
+        self.num_rows = 0
+        self.columns = ['id', 'status']
+        self.kinds = {'id': set(), 'status': set()}
+        hyperparameters = []
+        results = []
+        self._file = tempfile.TemporaryFile(mode='w+b')
+        for job in jobs:
+            row = _flatten(job)
+            for column, value in row:
+                kinds = self.kinds.get(column)
+                if kinds is None:
+                    kinds = self.kinds[column] = set()
+                    (hyperparameters if column.startswith('hyperparameter.') else results).append(column)
+                kinds.add(_kind(value))
+            self._file.write((_dumps(dict(row)) + '\n').encode('utf-8'))
+            self.num_rows += 1
+        self.columns.extend(hyperparameters)
+        self.columns.extend(results)
+
+    def rows(self):
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line.decode('utf-8'))
+
+    def close(self):
+        self._file.close()
+
+def _kind(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return bool
+    if isinstance(value, numbers.Integral):
+        return int
+    if isinstance(value, numbers.Real):
+        return float
+    if isinstance(value, six.string_types):
+        return six.text_type
+    return object
+
+# Value of the cells of the columns that a job does not have
+_MISSING = object()
+
+def _cell(value):
+    # Written so that schedy.bulk reads back the same value: an empty cell is
+    # a missing value, the strings are written as is unless they would be
+    # read as JSON, and the other values are written as JSON (except the
+    # finite numbers, whose text is the same)
+    if value is _MISSING:
+        return ''
+    if isinstance(value, six.string_types):
+        try:
+            json.loads(value)
+        except ValueError:
+            if value:
+                return value
+        return _dumps(value)
+    if isinstance(value, numbers.Real) and not isinstance(value, bool) and not math.isinf(value) and not math.isnan(value):
+        return value
+    return _dumps(value)
+
+def write_csv(jobs, f):
+    '''
+    Writes the jobs as a CSV file, with one row per job.
+
+    The cells are empty if the job has no such hyperparameter or result.
+    Numbers are written as is, and strings too unless they would be read as
+    another value (e.g. ``"1"`` or ``"null"``, which are then quoted as JSON
+    strings). Other values, including None, are written as JSON, so that
+    :py:func:`schedy.bulk.read_csv` reads back the same jobs.
+
+    Args:
+        jobs (iterable of schedy.Job): The jobs.
+        f (file-object): File opened in text mode, with ``newline=''``
+            (binary mode with Python 2).
+
+    Returns:
+        int: The number of jobs written.
+    '''
+    import csv
+    spool = _Spool(jobs)
+    try:
+        writer = csv.writer(f)
+        writer.writerow(_csv_row(spool.columns))
+        for row in spool.rows():
+            # The id and the status are always written as is
+            values = [row.get('id'), row.get('status')]
+            values.extend(_cell(row.get(column, _MISSING)) for column in spool.columns[2:])
+            writer.writerow(_csv_row(values))
+    finally:
+        spool.close()
+    return spool.num_rows
+
+def _csv_row(values):
+    # The csv module of Python 2 only supports byte strings
+    if six.PY2:
+        return [value.encode('utf-8') if isinstance(value, six.text_type) else value for value in values]
+    return values
+
+def _arrow_type(pa, kinds):
+    kinds = kinds - {None}
+    if kinds == {bool}:
+        return pa.bool_(), None
+    if kinds == {int}:
+        return pa.int64(), None
+    if kinds and kinds <= {int, float}:
+        return pa.float64(), float
+    if kinds == {six.text_type} or not kinds:
+        return pa.string(), None
+    # Mixed or nested values are stored as JSON
+    return pa.string(), lambda value: value if isinstance(value, six.string_types) else _dumps(value)
+
+def write_parquet(jobs, path, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    '''
+    Writes the jobs as a Parquet file, with one row per job, in row groups of
+    ``row_group_size`` rows. Requires `PyArrow <https://arrow.apache.org/>`_.
+
+    Columns containing only booleans, only integers, numbers or strings get
+    the corresponding types. Other columns contain JSON values.
+
+    Args:
+        jobs (iterable of schedy.Job): The jobs.
+        path (str): Path to the Parquet file.
+        row_group_size (int): Number of rows of each row group.
+
+    Returns:
+        int: The number of jobs written.
+    '''
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise_from(ImportError('Writing Parquet files requires PyArrow, install it with: pip install pyarrow'), e)
+    spool = _Spool(jobs)
+    try:
+        types = [_arrow_type(pa, spool.kinds[column]) for column in spool.columns]
+        schema = pa.schema([pa.field(column, arrow_type) for column, (arrow_type, _) in zip(spool.columns, types)])
+        with pq.ParquetWriter(path, schema) as writer:
+            batch = []
+            for row in spool.rows():
+                batch.append(row)
+                if len(batch) == row_group_size:
+                    writer.write_table(_arrow_table(pa, schema, spool.columns, types, batch))
+                    batch = []
+            if batch or spool.num_rows == 0:
+                writer.write_table(_arrow_table(pa, schema, spool.columns, types, batch))
+    finally:
+        spool.close()
+    return spool.num_rows
+
+def _arrow_table(pa, schema, columns, types, rows):
+    arrays = dict()
+    for column, (_, convert) in zip(columns, types):
+        values = [row.get(column) for row in rows]
+        if convert is not None:
+            values = [None if value is None else convert(value) for value in values]
+        arrays[column] = values
+    return pa.Table.from_pydict(arrays, schema=schema)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+'''
+Fingerprints of hyperparameters, used to reuse the results of the jobs that
+were already completed with the same hyperparameters instead of computing
+them again.
+
+A :py:class:`FingerprintIndex` lists the ``DONE`` jobs of one or more
+experiments. When it is given to :py:meth:`schedy.Experiment.next_job` or
+:py:meth:`schedy.Experiment.map`, the jobs whose hyperparameters have the
+same fingerprint as a ``DONE`` job are completed with a copy of its results,
+and skipped.
+
+Example:
+    >>> memo = schedy.fingerprint.FingerprintIndex([exp, db.get_experiment('PreviousSweep')])
+    >>> jobs = exp.map(train, workers=8, memo=memo)
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import json
+import logging
+import math
+import numbers
+import threading
+import time
+
+from . import encoding, errors
+from .compat import json_dumps
+from .jobs import Job
+
+logger = logging.getLogger(__name__)
+
+#: Default minimum time between two refreshes of a fingerprint index, in seconds.
+DEFAULT_REFRESH_INTERVAL = 60
+
+def _normalize(value):
+    # Numbers that are equal have the same fingerprint (e.g. 1 and 1.0), but
+    # booleans are not numbers
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if not math.isinf(value) and not math.isnan(value) and value == int(value):
+            return int(value)
+        return value
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+def fingerprint(hyperparameters):
+    '''
+    Computes the fingerprint of a set of hyperparameters: a hash of their
+    values, which does not depend on the order of the keys, or on the types
+    used to represent them (e.g. tuples and lists, or NumPy and Python
+    numbers).
+
+    Args:
+        hyperparameters (dict): The hyperparameters.
+
+    Returns:
+        str: The fingerprint, as an hexadecimal string.
+    '''
+    # Encoding the values first converts them to plain JSON values
+    values = json.loads(json_dumps(hyperparameters, cls=encoding.SchedyJSONEncoder))
+    canonical = json.dumps(_normalize(values), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class FingerprintIndex(object):
+    def __init__(self, experiments, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        '''
+        Index of the fingerprints of the ``DONE`` jobs of some experiments,
+        kept in memory.
+
+        The index is built the first time it is used. When a fingerprint is
+        not found, the jobs completed since the last refresh are added to the
+        index, if the last refresh is older than ``refresh_interval``. Only
+        the hyperparameters of the jobs are retrieved, and only the new jobs
+        are hashed. The results are retrieved when a fingerprint is found.
+
+        Args:
+            experiments (list of schedy.Experiment): Experiments whose
+                results can be reused.
+            refresh_interval (float): Minimum time between two refreshes, in
+                seconds.
+        '''
+        self.experiments = list(experiments)
+        self.refresh_interval = refresh_interval
+        # Fingerprint => list of (experiment, job id), in order of discovery
+        self._jobs = dict()
+        self._indexed = set()
+        self._last_refresh = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._indexed)
+
+    def refresh(self):
+        '''
+        Adds the jobs completed since the last refresh to the index.
+        '''
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        for experiment in self.experiments:
+            for job in experiment.all_jobs(status=Job.DONE, fields=['hyperparameters']):
+                self._add(experiment, job.job_id, job.hyperparameters)
+        self._last_refresh = time.time()
+
+    def _add(self, experiment, job_id, hyperparameters):
+        key = (experiment.name, job_id)
+        if key in self._indexed:
+            return
+        self._indexed.add(key)
+        self._jobs.setdefault(fingerprint(hyperparameters), []).append((experiment, job_id))
+
+    def add(self, job):
+        '''
+        Adds a job to the index, if it is ``DONE``. Used to index the jobs
+        completed by this process without waiting for the next refresh.
+
+        Args:
+            job (schedy.Job): The job.
+        '''
+        if job.status != Job.DONE:
+            return
+        with self._lock:
+            self._add(job.experiment, job.job_id, job.hyperparameters)
+
+    def lookup(self, hyperparameters):
+        '''
+        Finds a ``DONE`` job with the same fingerprint as some hyperparameters.
+
+        Args:
+            hyperparameters (dict): The hyperparameters.
+
+        Returns:
+            schedy.Job: The job, or None if there is none.
+        '''
+        key = fingerprint(hyperparameters)
+        with self._lock:
+            if key not in self._jobs and (self._last_refresh is None or time.time() - self._last_refresh >= self.refresh_interval):
+                self._refresh()
+            candidates = list(self._jobs.get(key, []))
+        for experiment, job_id in candidates:
+            try:
+                job = experiment.get_job(job_id)
+            except errors.ClientRequestError:
+                job = None
+            if job is not None and job.status == Job.DONE:
+                return job
+            # The job was updated or deleted since it was indexed
+            with self._lock:
+                self._forget(key, experiment, job_id)
+        return None
+
+    def _forget(self, key, experiment, job_id):
+        candidates = self._jobs.get(key, [])
+        if (experiment, job_id) in candidates:
+            candidates.remove((experiment, job_id))
+            if not candidates:
+                del self._jobs[key]
+        self._indexed.discard((experiment.name, job_id))
+
+    def reuse(self, job):
+        '''
+        Completes a job with the results of a ``DONE`` job with the same
+        fingerprint, if there is one, and pushes it.
+
+        Args:
+            job (schedy.Job): The job.
+
+        Returns:
+            schedy.Job: The job whose results were copied, or None if there
+            is none (and the job was not modified).
+        '''
+        source = self.lookup(job.hyperparameters)
+        if source is None:
+            return None
+        job.results = dict(job.results)
+        job.results.update(source.results)
+        job.status = Job.DONE
+        job.put()
+        logger.info('Reused the results of job %s of %s for job %s.', source.job_id, source.experiment.name, job.job_id)
+        self.add(job)
+        return source
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+
+'''
+Fork server used by ``schedy run --fork-server``.
+
+The fork server is a Python process that imports a list of modules once, and
+then forks a new process for each training command. The commands share the
+preloaded modules, and do not pay the startup time of the interpreter and of
+these modules.
+
+The controller sends the requests to the standard input of the server, and
+receives the replies on a pipe, both as JSON lines.
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import errno
+import fcntl
+import importlib
+import json
+import os
+import select
+import signal
+import sys
+import threading
+import traceback
+
+from .compat import json_dumps
+
+class ForkServerError(RuntimeError):
+    pass
+
+class ForkedProcess(object):
+    def __init__(self, request_id, argv):
+        '''
+        Process forked by a :py:class:`ForkServer`. It can be used as a
+        context manager, which closes its pipes at the end of the ``with``
+        statement.
+
+        Attributes:
+            stdout (file): Standard output of the process, if it was
+                requested.
+            results (file): Read end of the results pipe, if it was
+                requested.
+        '''
+        self.request_id = request_id
+        self.argv = argv
+        self.pid = None
+        self.returncode = None
+        self.stdout = None
+        self.results = None
+        self._started = threading.Event()
+        self._exited = threading.Event()
+
+    def wait(self):
+        self._exited.wait()
+        return self.returncode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for pipe in (self.stdout, self.results):
+            if pipe is not None:
+                pipe.close()
+
+class ForkServer(object):
+    Error = ForkServerError
+
+    def __init__(self, preload=(), env=None):
+        '''
+        Starts a fork server, which imports the modules in ``preload``.
+
+        Args:
+            preload (list): Names of the modules to import.
+            env (dict): Environment of the server. It is inherited by the
+                preloaded modules, whereas the environment of each process is
+                set after it is forked.
+        '''
+        import subprocess
+        import tempfile
+        self._lock = threading.Lock()
+        self._processes = dict()
+        self._next_id = 0
+        self._stopped = False
+        self._fifo_dir = tempfile.mkdtemp(prefix='schedy-forkserver-')
+        reply_read_fd, reply_write_fd = os.pipe()
+        args = [sys.executable, '-m', 'schedy.forkserver', '--reply-fd', str(reply_write_fd)]
+        for module in preload:
+            args.extend(('--preload', module))
+        self._server = subprocess.Popen(args, stdin=subprocess.PIPE, env=env, pass_fds=(reply_write_fd,))
+        os.close(reply_write_fd)
+        self._replies = os.fdopen(reply_read_fd, 'rb')
+        self._reader = threading.Thread(target=self._read_replies)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def spawn(self, argv, env, cpus=None, pipe_stdout=False, pipe_results=False):
+        '''
+        Forks a process running a Python script, as ``python argv...`` would.
+
+        Args:
+            argv (list): The path of the script (or ``-m`` and the name of a
+                module), followed by its arguments.
+            env (dict): Environment of the process.
+            cpus (list): CPU cores the process is pinned to.
+            pipe_stdout (bool): If true, the standard output of the process
+                is sent to the ``stdout`` pipe of the returned process.
+            pipe_results (bool): If true, the process receives a pipe whose
+                file descriptor is set in the variable
+                :py:data:`schedy.channel.RESULTS_FD_VARIABLE` and whose read
+                end is the ``results`` attribute of the returned process.
+
+        Returns:
+            ForkedProcess: The new process, once it is started.
+        '''
+        from .channel import RESULTS_FD_VARIABLE
+        with self._lock:
+            if self._stopped:
+                raise ForkServerError('The fork server is not running.')
+            request_id = self._next_id
+            self._next_id += 1
+            process = ForkedProcess(request_id, argv)
+            self._processes[request_id] = process
+        request = {
+            'id': request_id,
+            'argv': list(argv),
+            'env': dict(env),
+            'cpus': list(cpus) if cpus is not None else None,
+        }
+        # The read ends of the FIFOs must be open before the server opens the
+        # write ends, and they are only read once the process owns them
+        fifos = []
+        if pipe_stdout:
+            request['stdout'], stdout_fd = self._make_fifo(request_id, 'stdout')
+            fifos.append(('stdout', stdout_fd))
+        if pipe_results:
+            request['results'], results_fd = self._make_fifo(request_id, 'results')
+            request['results_variable'] = RESULTS_FD_VARIABLE
+            fifos.append(('results', results_fd))
+        try:
+            with self._lock:
+                self._server.stdin.write((json_dumps(request) + '\n').encode('utf-8'))
+                self._server.stdin.flush()
+        except (IOError, OSError) as e:
+            for _, fd in fifos:
+                os.close(fd)
+            raise ForkServerError('The fork server is not running ({!r}).'.format(e))
+        process._started.wait()
+        for name, fd in fifos:
+            os.remove(request[name])
+            _set_blocking(fd)
+            setattr(process, name, os.fdopen(fd, 'rb'))
+        if process.pid is None:
+            process.__exit__(None, None, None)
+            raise ForkServerError('The fork server could not start {}.'.format(argv))
+        return process
+
+    def close(self):
+        '''
+        Stops the server, once all its processes have exited.
+        '''
+        try:
+            self._server.stdin.close()
+        except (IOError, OSError):
+            pass
+        self._server.wait()
+        self._reader.join()
+        try:
+            os.rmdir(self._fifo_dir)
+        except OSError:
+            pass
+
+    def _make_fifo(self, request_id, name):
+        path = os.path.join(self._fifo_dir, '{}.{}'.format(request_id, name))
+        os.mkfifo(path, 0o600)
+        return path, os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+    def _read_replies(self):
+        for line in iter(self._replies.readline, b''):
+            reply = json.loads(line.decode('utf-8'))
+            with self._lock:
+                process = self._processes.get(reply['id'])
+            if 'pid' in reply:
+                process.pid = reply['pid']
+                process._started.set()
+            else:
+                process.returncode = reply['returncode']
+                with self._lock:
+                    del self._processes[reply['id']]
+                process._started.set()
+                process._exited.set()
+        # The server stopped: the remaining processes are considered killed
+        with self._lock:
+            self._stopped = True
+            processes = list(self._processes.values())
+            self._processes.clear()
+        for process in processes:
+            process.returncode = -signal.SIGKILL
+            process._started.set()
+            process._exited.set()
+
+def _set_blocking(fd):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_NONBLOCK)
+
+def _send_reply(reply_fd, reply):
+    message = (json_dumps(reply) + '\n').encode('utf-8')
+    while message:
+        message = message[os.write(reply_fd, message):]
+
+def _open_fifo(path):
+    # The controller opened the read end already, so this does not block
+    fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    _set_blocking(fd)
+    return fd
+
+def _run_child(request, reply_fd, fifo_fds):
+    '''
+    Runs the script of a request in a forked process. Never returns.
+    '''
+    code = 1
+    try:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.close(reply_fd)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        if 'stdout' in fifo_fds:
+            os.dup2(fifo_fds.pop('stdout'), 1)
+        if 'results' in fifo_fds:
+            request['env'][request['results_variable']] = str(fifo_fds['results'])
+        if request.get('cpus') is not None:
+            os.sched_setaffinity(0, request['cpus'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        argv = request['argv']
+        import runpy
+        if argv[0] == '-m':
+            sys.argv = argv[1:]
+            runpy.run_module(argv[1], run_name='__main__', alter_sys=True)
+        else:
+            sys.argv = list(argv)
+            sys.path.insert(0, os.path.dirname(os.path.abspath(argv[0])))
+            runpy.run_path(argv[0], run_name='__main__')
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+def _exit_code(status):
+    # Same convention as subprocess
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+def serve(reply_fd):
+    '''
+    Processes the requests received on the standard input until it is closed,
+    and waits for the forked processes to exit.
+    '''
+    # Interruptions are handled by the controller and the forked processes
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    children = dict()
+    pending = b''
+    stdin_open = True
+    while stdin_open or children:
+        if stdin_open:
+            readable, _, _ = select.select([0], [], [], 0.1)
+            if readable:
+                data = os.read(0, 65536)
+                if not data:
+                    stdin_open = False
+                pending += data
+                lines = pending.split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line.decode('utf-8'))
+                    fifo_fds = dict()
+                    try:
+                        for name in ('stdout', 'results'):
+                            if request.get(name) is not None:
+                                fifo_fds[name] = _open_fifo(request[name])
+                        pid = os.fork()
+                    except OSError:
+                        traceback.print_exc()
+                        _send_reply(reply_fd, {'id': request['id'], 'returncode': 1})
+                        pid = None
+                    if pid == 0:
+                        _run_child(request, reply_fd, fifo_fds)
+                    for fd in fifo_fds.values():
+                        os.close(fd)
+                    if pid is not None:
+                        children[pid] = request['id']
+                        _send_reply(reply_fd, {'id': request['id'], 'pid': pid})
+        # Reap the processes that exited, without blocking unless there is
+        # nothing else to do
+        while children:
+            try:
+                pid, status = os.waitpid(-1, 0 if not stdin_open else os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if pid == 0:
+                break
+            request_id = children.pop(pid, None)
+            if request_id is not None:
+                _send_reply(reply_fd, {'id': request_id, 'returncode': _exit_code(status)})
+
+def main():
+    parser = argparse.ArgumentParser(description='Schedy fork server.')
+    parser.add_argument('--reply-fd', type=int, required=True, help='File descriptor to which replies are written.')
+    parser.add_argument('--preload', action='append', default=[], help='Module to import before forking.')
+    args = parser.parse_args()
+    for module in args.preload:
+        importlib.import_module(module)
+    serve(args.reply_fd)
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,16 @@ from six import raise_from
 from . import errors, encoding
 from .compat import json_dumps
 
+#: Keys of a job definition that are always kept when projecting fields.
+_JOB_REQUIRED_KEYS = ('id', 'experiment', 'status')
+#: Keys of a job definition whose values are dictionaries of named values.
+_JOB_VALUES_KEYS = ('hyperparameters', 'results')
+#: Hyperparameter marking the jobs in which the client stores its own state
+#: (e.g. the position of the next batch of a
+#: :py:class:`schedy.QuasiRandomSearch`). These jobs are never queued, and are
+#: not returned by :py:meth:`schedy.Experiment.all_jobs` by default.
+INTERNAL_HYPERPARAMETER = 'schedy_internal'
+
 def _check_status(status):
     return status in (Job.QUEUED, Job.RUNNING, Job.CRASHED, Job.PRUNED, Job.DONE)
 
@@ -69,7 +79,7 @@ class Job(object):
         '''
         db = self.experiment._db
         url = db._job_url(self.experiment.name, self.job_id)
-        map_def = self._to_map_definition()
+        map_def = self._to_map_definition(db.sidecars)
         data = json_dumps(map_def, cls=encoding.SchedyJSONEncoder)
         headers = dict()
         if safe:
@@ -108,6 +118,45 @@ class Job(object):
         response = db._authenticated_request('DELETE', url, headers=headers)
         errors._handle_response_errors(response)
 
+    def save_artifact(self, name, path_or_bytes, store=None):
+        '''
+        Adds a file to the artifact store, and records its hash in the results
+        of this job (see :py:mod:`schedy.artifacts`). The results are pushed
+        with the next call to :py:meth:`Job.put`, for example at the end of a
+        ``with`` block.
+
+        Files with the same content are only stored once, and the file is
+        linked into the store rather than copied when possible.
+
+        Args:
+            name (str): Name of the artifact (e.g. ``'weights'``).
+            path_or_bytes (str or bytes): Path to the file, or content of the
+                artifact.
+            store (schedy.artifacts.ArtifactStore): Artifact store. By
+                default, the store of the :py:class:`schedy.SchedyDB` is used.
+
+        Returns:
+            str: The hash of the artifact.
+        '''
+        from .artifacts import _save_artifact
+        return _save_artifact(self, name, path_or_bytes, store or self.experiment._db.artifacts)
+
+    def load_artifact(self, name, store=None):
+        '''
+        Returns the path to an artifact of this job, or of the job it inherited
+        its results from. The file is read-only, and must not be modified.
+
+        Args:
+            name (str): Name of the artifact.
+            store (schedy.artifacts.ArtifactStore): Artifact store. By
+                default, the store of the :py:class:`schedy.SchedyDB` is used.
+
+        Returns:
+            str: The path to the file of the artifact.
+        '''
+        from .artifacts import _load_artifact
+        return _load_artifact(self, name, store or self.experiment._db.artifacts)
+
     def __enter__(self):
         '''
         Context manager ``__enter__`` method. Will try to set the job as
@@ -163,6 +212,9 @@ class Job(object):
                 results = dict(results)
             else:
                 results = dict()
+            sidecars = getattr(experiment._db, 'sidecars', None)
+            if sidecars is not None:
+                results = sidecars._load_results(results)
         except (KeyError, ValueError) as e:
             raise_from(ValueError('Invalid job map definition.'), e)
         if experiment_name != experiment.name:
@@ -177,14 +229,17 @@ class Job(object):
                 results=results,
                 etag=etag)
 
-    def _to_map_definition(self):
+    def _to_map_definition(self, sidecars=None):
         map_def = {
                 'status': str(self.status),
             }
         if len(self.hyperparameters) > 0:
             map_def['hyperparameters'] = self.hyperparameters
         if self.results is not None and len(self.results) > 0:
-            map_def['results'] = self.results
+            if sidecars is not None:
+                map_def['results'] = sidecars._dump_results(self.results)
+            else:
+                map_def['results'] = self.results
         return map_def
 
 def _make_job(experiment, data, etag=None):
@@ -198,6 +253,52 @@ def _make_job(experiment, data, etag=None):
         raise_from(errors.UnhandledResponseError('Response contains an invalid job.', None), e)
     return job
 
+def _job_field(map_def, field):
+    section, _, name = field.partition('.')
+    if section not in map_def:
+        return False, None
+    value = map_def[section]
+    if not name:
+        return True, value
+    if section not in _JOB_VALUES_KEYS or value is None or name not in value:
+        return False, None
+    return True, value[name]
+
+def _job_matches(map_def, statuses=None, where=None, include_internal=True):
+    try:
+        if statuses is not None and map_def.get('status') not in statuses:
+            return False
+        if not include_internal and _job_field(map_def, 'hyperparameters.' + INTERNAL_HYPERPARAMETER)[0]:
+            return False
+        for field, expected in (where or {}).items():
+            found, value = _job_field(map_def, field)
+            if not found or value != expected:
+                return False
+    except (AttributeError, TypeError):
+        # Let the job creation function report invalid job definitions
+        return True
+    return True
+
+def _project_job(map_def, fields):
+    try:
+        projected = {key: map_def[key] for key in _JOB_REQUIRED_KEYS if key in map_def}
+        for field in fields:
+            section, _, name = field.partition('.')
+            if section not in map_def:
+                continue
+            if not name or section not in _JOB_VALUES_KEYS:
+                projected[section] = map_def[section]
+                continue
+            values = map_def[section]
+            if values is not None and name in values:
+                projected.setdefault(section, dict())[name] = values[name]
+    except (AttributeError, TypeError):
+        return map_def
+    return projected
+
+def _make_projected_job(experiment, data, fields):
+    return _make_job(experiment, _project_job(data, fields))
+
 def _job_from_response(experiment, response):
     try:
         content = response.json()
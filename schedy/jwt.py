@@ -2,13 +2,14 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import requests
 import datetime
 
 _PRE_EXPIRATION_TIME = datetime.timedelta(minutes=1)
 _PRE_EXPIRATION_RATIO = 0.95
 
-class JWTTokenAuth(requests.auth.AuthBase):
+# Requests accepts any callable as an authentication handler, which avoids
+# importing requests until a request is sent
+class JWTTokenAuth(object):
     def __init__(self, token_string, expires_at):
         self.token_string = token_string
         self.expires_at = expires_at
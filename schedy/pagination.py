@@ -3,6 +3,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 from six import raise_from
 
+import collections
 import warnings
 
 from . import errors
@@ -10,35 +11,39 @@ from . import errors
 _EXPECTED_PAGE_KEYS = {'items', 'next'}
 
 class PageObjectsIterator(object):
-    def __init__(self, reqfunc, obj_creation_func):
+    def __init__(self, reqfunc, obj_creation_func, params=None, item_filter_func=None):
         self._reqfunc = reqfunc
         self._create_obj = obj_creation_func
+        self._params = params
+        self._keep_item = item_filter_func
         self._next_token = None
-        self._items = []
+        self._items = collections.deque()
         self._get_page()
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        if len(self._items) == 0:
-            if self._next_token is None:
-                raise StopIteration
-            self._get_page(self._next_token)
+        while True:
             if len(self._items) == 0:
-                raise StopIteration
-        cur_item = self._create_obj(self._items[0])
-        self._items = self._items[1:]
-        return cur_item
+                if self._next_token is None:
+                    raise StopIteration
+                self._get_page(self._next_token)
+                if len(self._items) == 0:
+                    raise StopIteration
+            item = self._items.popleft()
+            # Items are filtered again on the client side, in case the server
+            # ignored some of the filters
+            if self._keep_item is None or self._keep_item(item):
+                return self._create_obj(item)
 
     # Python 2 support
     next = __next__
 
     def _get_page(self, start_token=None):
-        if start_token is None:
-            params = dict()
-        else:
-            params = {'start': start_token}
+        params = dict(self._params or {})
+        if start_token is not None:
+            params['start'] = start_token
         response = self._reqfunc(params)
         errors._handle_response_errors(response)
         try:
@@ -48,7 +53,7 @@ class PageObjectsIterator(object):
         if result.keys() > _EXPECTED_PAGE_KEYS:
             warnings.warn('Unexpected page keys: {}.'.format(result.keys() - _EXPECTED_PAGE_KEYS))
         try:
-            self._items = list(result['items'])
+            self._items = collections.deque(result['items'])
             next_token = result.get('next')
             if next_token is not None:
                 self._next_token = str(next_token)
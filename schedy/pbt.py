@@ -2,6 +2,12 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import math
+import numbers
+
+from .jobs import Job
+from .random import _make_rng, _import_numpy
+
 #: Minimize the objective
 MINIMIZE = 'min'
 #: Maximize the objective
@@ -24,6 +30,35 @@ class Truncate(object):
         '''
         self.proportion = proportion
 
+    def exploit(self, losses, rng=None):
+        '''
+        Selects the members of the population that are replaced. Requires
+        NumPy.
+
+        Args:
+            losses (list): Score of each member of the population, the lower
+                the better. NaN values are ranked last.
+            rng (numpy.random.Generator or int): Random generator, or seed of
+                a new generator.
+
+        Returns:
+            numpy.ndarray: For each member, the index of the member it must
+            copy: itself if it is not among the worst members, or a random
+            member among the best ones otherwise.
+        '''
+        np = _import_numpy()
+        rng = _make_rng(rng)
+        losses = np.asarray(losses, dtype=float)
+        size = len(losses)
+        sources = np.arange(size)
+        num_replaced = min(int(math.ceil(self.proportion * size)), size // 2)
+        if num_replaced == 0:
+            return sources
+        order = np.argsort(np.where(np.isnan(losses), np.inf, losses), kind='mergesort')
+        worst = order[size - num_replaced:]
+        sources[worst] = order[rng.integers(num_replaced, size=num_replaced)]
+        return sources
+
     def _get_params(self):
         return self.proportion
 
@@ -51,6 +86,23 @@ class Perturb(object):
         self.min_factor = min_factor
         self.max_factor = max_factor
 
+    def explore(self, values, rng=None):
+        '''
+        Perturbs values of the hyperparameter. Requires NumPy.
+
+        Args:
+            values (list): Values to perturb.
+            rng (numpy.random.Generator or int): Random generator, or seed of
+                a new generator.
+
+        Returns:
+            numpy.ndarray: The perturbed values.
+        '''
+        np = _import_numpy()
+        rng = _make_rng(rng)
+        values = np.asarray(values, dtype=float)
+        return values * rng.uniform(self.min_factor, self.max_factor, size=values.shape)
+
     def _get_params(self):
         return {
             'minFactor': float(self.min_factor),
@@ -76,3 +128,152 @@ _EXPLORE_STRATEGIES = {strat._EXPLORE_STRATEGY_NAME: strat for strat in [
     Perturb
 ]}
 
+
+#: Result containing the generation of a job, for :py:class:`PBTScheduler`.
+GENERATION_RESULT = 'pbt_generation'
+#: Result containing the id of the first job of the member of a job.
+MEMBER_RESULT = 'pbt_member'
+#: Result containing the id of the job whose state a job starts from.
+PARENT_RESULT = 'pbt_parent'
+
+class PBTScheduler(object):
+    def __init__(self, experiment, objective, result_name, exploit, explore=dict(), initial_distributions=dict(), population_size=None, max_generations=None, seed=None):
+        '''
+        Runs Population Based Training on the client side, by queuing the jobs
+        of an experiment (usually a :py:class:`schedy.ManualSearch`). The
+        arguments are the same as for
+        :py:class:`schedy.PopulationBasedTraining`. Requires NumPy.
+
+        Each member of the population is a sequence of jobs, one per
+        generation. When the last job of a member is done, the next job of the
+        member is queued. If the member is among the worst ones, the next job
+        copies the hyperparameters and results of the last completed job of a
+        better member, and its explored hyperparameters are perturbed.
+        Otherwise, it continues from the last job of the member. As with
+        :py:class:`schedy.PopulationBasedTraining`, workers resume their
+        training from the results of the job (e.g. the path of a checkpoint).
+
+        The scheduler adds the generation of each job, the id of the first
+        job of its member, and the id of the job it starts from to its
+        results (:py:data:`GENERATION_RESULT`, :py:data:`MEMBER_RESULT` and
+        :py:data:`PARENT_RESULT`).
+
+        Example:
+            >>> scheduler = schedy.pbt.PBTScheduler(exp, schedy.pbt.MAXIMIZE, 'accuracy',
+            >>>     exploit=schedy.pbt.Truncate(),
+            >>>     explore={'learning_rate': schedy.pbt.Perturb()},
+            >>>     initial_distributions={'learning_rate': schedy.random.LogUniform(1e-5, 1e-1)},
+            >>>     population_size=20)
+            >>> while True:
+            >>>     scheduler.step()
+            >>>     time.sleep(10)
+
+        Args:
+            experiment (schedy.Experiment): Experiment whose jobs are
+                scheduled.
+            objective (str): :py:data:`MINIMIZE` or :py:data:`MAXIMIZE`.
+            result_name (str): The name of the result to optimize.
+            exploit (schedy.pbt.ExploitStrategy): Strategy to use to exploit
+                the results.
+            explore (dict): Strategies to use to explore new hyperparameter
+                values, by hyperparameter name.
+            initial_distributions (dict): The distributions of the
+                hyperparameters of the initial jobs.
+            population_size (int): Number of initial jobs to create.
+            max_generations (int): Number of generations after which the
+                members are not continued.
+            seed (numpy.random.Generator or int): Random generator, or seed of
+                a new generator.
+        '''
+        if objective not in (MINIMIZE, MAXIMIZE):
+            raise ValueError('Invalid objective: {!r}.'.format(objective))
+        self.experiment = experiment
+        self.objective = objective
+        self.result_name = result_name
+        self.exploit = exploit
+        self.explore = explore
+        self.initial_distributions = initial_distributions
+        self.population_size = population_size
+        self.max_generations = max_generations
+        self._rng = _make_rng(seed)
+
+    def step(self):
+        '''
+        Queues the initial jobs that are missing, and the next job of each
+        member whose last job is done.
+
+        Returns:
+            list of :py:class:`schedy.Job`: The new jobs.
+        '''
+        np = _import_numpy()
+        members = dict()
+        for job in self.experiment.all_jobs():
+            member_id = str(job.results.get(MEMBER_RESULT, job.job_id))
+            members.setdefault(member_id, []).append(job)
+        new_jobs = self._create_population(len(members))
+        if not members:
+            return new_jobs
+        member_ids = sorted(members)
+        last_jobs = []
+        best_jobs = []
+        for member_id in member_ids:
+            jobs = sorted(members[member_id], key=self._generation)
+            last_jobs.append(jobs[-1])
+            completed = [job for job in jobs if job.status == Job.DONE and self._loss(job) is not None]
+            best_jobs.append(completed[-1] if completed else None)
+        losses = np.array([self._loss(job) if job is not None else np.nan for job in best_jobs], dtype=float)
+        # Crashed members start again from another member
+        crashed = np.array([job.status == Job.CRASHED for job in last_jobs])
+        losses[crashed] = np.nan
+        sources = self.exploit.exploit(losses, self._rng)
+        ready = [i for i, job in enumerate(last_jobs) if job.status in (Job.DONE, Job.CRASHED) and
+                (self.max_generations is None or self._generation(job) < self.max_generations)]
+        exploited = [i for i in ready if sources[i] != i and best_jobs[sources[i]] is not None]
+        hyperparameters = dict()
+        results = dict()
+        for i in ready:
+            source = best_jobs[sources[i]] if i in exploited else last_jobs[i]
+            hyperparameters[i] = dict(source.hyperparameters)
+            results[i] = dict(source.results)
+            results[i][PARENT_RESULT] = source.job_id
+        # Perturb the hyperparameters of the exploited members, one
+        # hyperparameter at a time
+        for name, strategy in self.explore.items():
+            indices = [i for i in exploited if isinstance(hyperparameters[i].get(name), numbers.Real)]
+            if not indices:
+                continue
+            values = strategy.explore([hyperparameters[i][name] for i in indices], self._rng)
+            for i, value in zip(indices, values.tolist()):
+                if isinstance(hyperparameters[i][name], numbers.Integral):
+                    value = int(round(value))
+                hyperparameters[i][name] = value
+        for i in ready:
+            results[i][MEMBER_RESULT] = member_ids[i]
+            results[i][GENERATION_RESULT] = self._generation(last_jobs[i]) + 1
+            new_jobs.append(self.experiment.add_job(hyperparameters=hyperparameters[i], results=results[i]))
+        return new_jobs
+
+    def _create_population(self, size):
+        if not self.initial_distributions or self.population_size is None or size >= self.population_size:
+            return []
+        num_jobs = self.population_size - size
+        names = sorted(self.initial_distributions)
+        columns = [self.initial_distributions[name].sample(num_jobs, self._rng).tolist() for name in names]
+        return [
+            self.experiment.add_job(hyperparameters=dict(zip(names, values)), results={GENERATION_RESULT: 0})
+            for values in zip(*columns)
+        ]
+
+    @staticmethod
+    def _generation(job):
+        try:
+            return int(job.results.get(GENERATION_RESULT, 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _loss(self, job):
+        try:
+            loss = float(job.results[self.result_name])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return -loss if self.objective == MAXIMIZE else loss
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+'''
+Low-discrepancy sequences used by :py:class:`schedy.QuasiRandomSearch`.
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+#: Sobol sequence.
+SOBOL = 'sobol'
+#: Latin hypercube sampling.
+LATIN_HYPERCUBE = 'lhs'
+
+_SOBOL_BITS = 32
+
+#: Primitive polynomials and initial direction numbers of the dimensions 2 to
+#: 21 of the Sobol sequence, from S. Joe and F. Y. Kuo (new-joe-kuo-6.21201).
+#: Each entry contains the degree of the polynomial, its coefficients and the
+#: initial direction numbers.
+_SOBOL_DIRECTIONS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+)
+
+#: Maximum number of dimensions of the Sobol sequence.
+SOBOL_MAX_DIMENSIONS = len(_SOBOL_DIRECTIONS) + 1
+
+def _sobol_direction_numbers(np, dimensions):
+    directions = np.zeros((_SOBOL_BITS, dimensions), dtype=np.uint64)
+    # The first dimension is the Van der Corput sequence
+    directions[:, 0] = [1 << (_SOBOL_BITS - 1 - k) for k in range(_SOBOL_BITS)]
+    for dim in range(1, dimensions):
+        degree, coefs, initial = _SOBOL_DIRECTIONS[dim - 1]
+        m = list(initial)
+        for k in range(degree, _SOBOL_BITS):
+            value = m[k - degree] ^ (m[k - degree] << degree)
+            for j in range(1, degree):
+                if (coefs >> (degree - 1 - j)) & 1:
+                    value ^= m[k - j] << j
+            m.append(value)
+        directions[:, dim] = [m[k] << (_SOBOL_BITS - 1 - k) for k in range(_SOBOL_BITS)]
+    return directions
+
+def sobol(start, n, dimensions, shift=None):
+    '''
+    Computes points of the Sobol sequence.
+
+    Args:
+        start (int): Index of the first point.
+        n (int): Number of points.
+        dimensions (int): Number of dimensions, at most
+            :py:data:`SOBOL_MAX_DIMENSIONS`.
+        shift (numpy.ndarray): Random shift of each dimension, in [0, 1).
+            The points are shifted modulo 1 (Cranley-Patterson rotation), so
+            that experiments with different shifts explore different points.
+
+    Returns:
+        numpy.ndarray: An array of shape ``(n, dimensions)`` with values in
+        [0, 1).
+    '''
+    import numpy as np
+    if dimensions > SOBOL_MAX_DIMENSIONS:
+        raise ValueError('The Sobol sequence supports at most {} dimensions, found {}.'.format(SOBOL_MAX_DIMENSIONS, dimensions))
+    directions = _sobol_direction_numbers(np, dimensions)
+    indices = np.arange(start, start + n, dtype=np.uint64)
+    # The point of index i is the XOR of the direction numbers selected by the
+    # bits of the Gray code of i
+    gray = indices ^ (indices >> np.uint64(1))
+    points = np.zeros((n, dimensions), dtype=np.uint64)
+    for bit in range(_SOBOL_BITS):
+        selected = ((gray >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[selected] ^= directions[bit]
+    result = points / float(1 << _SOBOL_BITS)
+    if shift is not None:
+        result = np.mod(result + shift, 1)
+    return result
+
+def latin_hypercube(n, dimensions, rng):
+    '''
+    Computes a Latin hypercube design: each dimension is split in ``n``
+    intervals of the same size, and each interval contains exactly one point.
+
+    Args:
+        n (int): Number of points.
+        dimensions (int): Number of dimensions.
+        rng (numpy.random.Generator): Random generator.
+
+    Returns:
+        numpy.ndarray: An array of shape ``(n, dimensions)`` with values in
+        [0, 1).
+    '''
+    import numpy as np
+    strata = np.argsort(rng.random((n, dimensions)), axis=0)
+    return (strata + rng.random((n, dimensions))) / n
@@ -2,6 +2,89 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError('NumPy is required to sample values on the client side ({}).'.format(e))
+    return numpy
+
+def _make_rng(rng):
+    '''
+    Returns a NumPy random generator from a generator, a seed or None.
+    '''
+    np = _import_numpy()
+    return np.random.default_rng(rng)
+
+def _object_array(np, values):
+    # Assigning the values one by one prevents NumPy from turning lists into
+    # additional dimensions
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+def _alias_table(np, weights):
+    '''
+    Builds the table of Vose's alias method, which samples from a discrete
+    distribution in constant time per sample.
+
+    Returns:
+        tuple: The probability of keeping each index, and the index used
+        otherwise.
+    '''
+    weights = np.asarray(weights, dtype=float)
+    if weights.ndim != 1 or len(weights) == 0 or np.any(weights < 0) or not np.isfinite(weights.sum()) or weights.sum() <= 0:
+        raise ValueError('Weights must be non-negative numbers with a positive sum.')
+    num = len(weights)
+    scaled = weights * (num / weights.sum())
+    prob = np.ones(num)
+    alias = np.arange(num)
+    small = [i for i in range(num) if scaled[i] < 1]
+    large = [i for i in range(num) if scaled[i] >= 1]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        if scaled[more] < 1:
+            small.append(more)
+        else:
+            large.append(more)
+    # The remaining entries are 1 up to rounding errors
+    return prob, alias
+
+# Coefficients of Acklam's rational approximation of the inverse of the
+# standard normal CDF (relative error below 1.15e-9)
+_NORM_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_NORM_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01, -1.328068155288572e+01)
+_NORM_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_NORM_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+_NORM_PPF_LOW = 0.02425
+
+def _norm_ppf(np, u):
+    '''
+    Inverse of the CDF of the standard normal distribution, for values in
+    (0, 1).
+    '''
+    a, b, c, d = _NORM_PPF_A, _NORM_PPF_B, _NORM_PPF_C, _NORM_PPF_D
+    u = np.asarray(u, dtype=float)
+    result = np.empty_like(u)
+    tails = np.minimum(u, 1 - u) < _NORM_PPF_LOW
+    # Central region
+    q = u[~tails] - 0.5
+    r = q * q
+    result[~tails] = (((((a[0]*r + a[1])*r + a[2])*r + a[3])*r + a[4])*r + a[5]) * q / \
+        (((((b[0]*r + b[1])*r + b[2])*r + b[3])*r + b[4])*r + 1)
+    # Tails, using the symmetry of the distribution
+    t = u[tails]
+    q = np.sqrt(-2 * np.log(np.minimum(t, 1 - t)))
+    x = (((((c[0]*q + c[1])*q + c[2])*q + c[3])*q + c[4])*q + c[5]) / \
+        ((((d[0]*q + d[1])*q + d[2])*q + d[3])*q + 1)
+    result[tails] = np.where(t < 0.5, x, -x)
+    return result
+
 class LogUniform(object):
     _FUNC_NAME = 'loguniform'
 
@@ -30,6 +113,30 @@ class LogUniform(object):
         high = float(args['high'])
         return cls(low, high)
 
+    def sample(self, n, rng=None):
+        '''
+        Samples values from this distribution on the client side. Requires
+        NumPy.
+
+        Args:
+            n (int): Number of values to sample.
+            rng (numpy.random.Generator or int): Random generator, or seed of
+                a new generator. By default, a generator seeded by the
+                operating system is used.
+
+        Returns:
+            numpy.ndarray: The sampled values.
+        '''
+        np = _import_numpy()
+        rng = _make_rng(rng)
+        return np.exp(rng.uniform(np.log(self.low), np.log(self.high), size=n))
+
+    def _ppf(self, u):
+        # Inverse of the CDF, mapping values of [0, 1) to values of the
+        # distribution
+        np = _import_numpy()
+        return np.exp(np.log(self.low) + np.asarray(u) * (np.log(self.high) - np.log(self.low)))
+
     def __eq__(self, other):
         return type(self) == type(other) and \
             self.low == other.low and \
@@ -61,6 +168,29 @@ class Uniform(object):
         high = float(args['high'])
         return cls(low, high)
 
+    def sample(self, n, rng=None):
+        '''
+        Samples values from this distribution on the client side. Requires
+        NumPy.
+
+        Args:
+            n (int): Number of values to sample.
+            rng (numpy.random.Generator or int): Random generator, or seed of
+                a new generator. By default, a generator seeded by the
+                operating system is used.
+
+        Returns:
+            numpy.ndarray: The sampled values.
+        '''
+        rng = _make_rng(rng)
+        return rng.uniform(self.low, self.high, size=n)
+
+    def _ppf(self, u):
+        # Inverse of the CDF, mapping values of [0, 1) to values of the
+        # distribution
+        np = _import_numpy()
+        return self.low + np.asarray(u) * (self.high - self.low)
+
     def __eq__(self, other):
         return type(self) == type(other) and \
             self.low == other.low and \
@@ -104,6 +234,48 @@ class Choice(object):
             weights = [float(w) for w in weights_val]
         return cls(values, weights)
 
+    def sample(self, n, rng=None):
+        '''
+        Samples values from this distribution on the client side. Requires
+        NumPy.
+
+        Args:
+            n (int): Number of values to sample.
+            rng (numpy.random.Generator or int): Random generator, or seed of
+                a new generator. By default, a generator seeded by the
+                operating system is used.
+
+        Returns:
+            numpy.ndarray: The sampled values. The array has an ``object`` type,
+            since the values can have any type.
+        '''
+        np = _import_numpy()
+        rng = _make_rng(rng)
+        num_values = len(self.values)
+        if num_values == 0:
+            raise ValueError('Cannot sample from an empty list of values.')
+        if self.weights is None:
+            indices = rng.integers(num_values, size=n)
+        else:
+            if len(self.weights) != num_values:
+                raise ValueError('There must be as many weights as there are values.')
+            prob, alias = _alias_table(np, self.weights)
+            columns = rng.integers(num_values, size=n)
+            indices = np.where(rng.random(size=n) < prob[columns], columns, alias[columns])
+        return _object_array(np, self.values)[indices]
+
+    def _ppf(self, u):
+        # Inverse of the CDF, mapping values of [0, 1) to values of the
+        # distribution
+        np = _import_numpy()
+        if self.weights is None:
+            weights = np.ones(len(self.values))
+        else:
+            weights = np.asarray(self.weights, dtype=float)
+        bounds = np.cumsum(weights)
+        indices = np.searchsorted(bounds, np.asarray(u) * bounds[-1], side='right')
+        return _object_array(np, self.values)[np.minimum(indices, len(self.values) - 1)]
+
     def __eq__(self, other):
         return type(self) == type(other) and \
             self.values == other.values and \
@@ -135,6 +307,31 @@ class Normal(object):
         std = float(args['std'])
         return cls(mean, std)
 
+    def sample(self, n, rng=None):
+        '''
+        Samples values from this distribution on the client side. Requires
+        NumPy.
+
+        Args:
+            n (int): Number of values to sample.
+            rng (numpy.random.Generator or int): Random generator, or seed of
+                a new generator. By default, a generator seeded by the
+                operating system is used.
+
+        Returns:
+            numpy.ndarray: The sampled values.
+        '''
+        rng = _make_rng(rng)
+        return rng.normal(self.mean, self.std, size=n)
+
+    def _ppf(self, u):
+        # Inverse of the CDF, mapping values of [0, 1) to values of the
+        # distribution
+        np = _import_numpy()
+        # 0 has no finite image
+        u = np.clip(u, np.finfo(float).tiny, 1)
+        return self.mean + self.std * _norm_ppf(np, u)
+
     def __eq__(self, other):
         return type(self) == type(other) and \
             self.mean == other.mean and \
@@ -162,6 +359,30 @@ class Constant(object):
         val = args
         return cls(val)
 
+    def sample(self, n, rng=None):
+        '''
+        Samples values from this distribution on the client side. Requires
+        NumPy.
+
+        Args:
+            n (int): Number of values to sample.
+            rng (numpy.random.Generator or int): Random generator, or seed of
+                a new generator. By default, a generator seeded by the
+                operating system is used.
+
+        Returns:
+            numpy.ndarray: The sampled values. The array has an ``object`` type,
+            since the value can have any type.
+        '''
+        np = _import_numpy()
+        return _object_array(np, [self.value] * n)
+
+    def _ppf(self, u):
+        # Inverse of the CDF, mapping values of [0, 1) to values of the
+        # distribution
+        np = _import_numpy()
+        return _object_array(np, [self.value] * len(u))
+
     def __eq__(self, other):
         return type(self) == type(other) and \
             self.value == other.value
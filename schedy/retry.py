@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from requests.packages.urllib3.util.retry import Retry
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SchedyRetry(Retry):
+    BACKOFF_MAX = 8 * 60
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        logger.warn('Error while querying Schedy service, retrying.')
+        if response is not None:
+            logger.warn('Server message: {!s}'.format(response.data))
+        return super(SchedyRetry, self).increment(
+            method=method,
+            url=url,
+            response=response,
+            error=error,
+            *args,
+            **kwargs)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+'''
+Storage of large result arrays in ``.npy`` sidecar files, outside of the
+results of the jobs.
+
+When the ``sidecar_dir`` key of the configuration is set, the NumPy arrays of
+the results whose size reaches ``sidecar_threshold`` bytes (64 KiB by
+default) are saved in this directory, and the results only contain a small
+reference to the file. Listing the jobs thus stays fast, even when they
+contain long training curves or large confusion matrices.
+
+When a job is retrieved, these arrays are replaced by
+:py:class:`SidecarArray` objects, which only read the file (with a
+memory map) when their content is accessed. The directory must be shared by
+all the machines that read or write the results.
+
+Example:
+    >>> db = schedy.SchedyDB(config_override={
+    >>>     ...,
+    >>>     'sidecar_dir': '/shared/schedy-sidecars',
+    >>> })
+    >>> with exp.next_job() as job:
+    >>>     job.results['loss_curve'] = np.array(losses)
+    >>> ...
+    >>> for job in exp.all_jobs():
+    >>>     # Only reads the last value of each curve
+    >>>     print(job.results['loss_curve'][-1])
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import sys
+import tempfile
+
+from . import encoding
+from .artifacts import ArtifactStore, _file_digest, _makedirs
+
+#: Default minimum size of the arrays saved in sidecar files, in bytes.
+DEFAULT_THRESHOLD = 64 * 1024
+#: Key of the references to sidecar files in the results.
+SIDECAR_KEY = 'schedy_sidecar'
+
+class SidecarArray(object):
+    def __init__(self, store, digest, shape, dtype):
+        '''
+        Array stored in a sidecar file, which is only read when needed. It can
+        be indexed, or converted with ``numpy.asarray``, like a NumPy array.
+
+        Args:
+            store (SidecarStore): Store containing the array.
+            digest (str): Hash of the sidecar file.
+            shape (tuple): Shape of the array.
+            dtype (str): Data type of the array.
+        '''
+        self.store = store
+        self.digest = digest
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self._array = None
+
+    @property
+    def path(self):
+        '''
+        Path to the sidecar file.
+        '''
+        return self.store.path(self.digest)
+
+    def load(self):
+        '''
+        Returns the array, as a read-only memory map of the sidecar file.
+        The file is opened the first time this method is called.
+
+        Returns:
+            numpy.ndarray: The array.
+        '''
+        if self._array is None:
+            import numpy as np
+            self._array = np.load(self.path, mmap_mode='r', allow_pickle=False)
+        return self._array
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.load()
+        if dtype is not None:
+            return array.astype(dtype)
+        return array
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return '{}(shape={!r}, dtype={!r})'.format(self.__class__.__name__, self.shape, str(self.dtype))
+
+    def _reference(self):
+        return {
+            SIDECAR_KEY: self.digest,
+            'shape': list(self.shape),
+            'dtype': str(self.dtype),
+        }
+
+class SidecarStore(ArtifactStore):
+    def __init__(self, root, threshold=DEFAULT_THRESHOLD):
+        '''
+        Directory containing the sidecar files of the results. Like the
+        artifacts (see :py:mod:`schedy.artifacts`), the files are named after
+        the hash of their content, so that unchanged arrays are only written
+        once.
+
+        Args:
+            root (str): Path to the directory.
+            threshold (int): Minimum size of the arrays saved in sidecar
+                files, in bytes.
+        '''
+        super(SidecarStore, self).__init__(root)
+        self.threshold = threshold
+
+    def add_array(self, array):
+        '''
+        Saves an array in a sidecar file.
+
+        Args:
+            array (numpy.ndarray): The array.
+
+        Returns:
+            SidecarArray: A reference to the saved array.
+        '''
+        import numpy as np
+        tmp_dir = os.path.join(self.root, 'tmp')
+        _makedirs(tmp_dir)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+            digest = _file_digest(tmp_path)
+            # The temporary file belongs to the store, so it is moved rather
+            # than copied (and made readable by all the users)
+            if not self._touch(digest):
+                self._store(tmp_path, digest)
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+        return SidecarArray(self, digest, array.shape, array.dtype.str)
+
+    def refcounts(self, experiments):
+        '''
+        Counts the references to each sidecar file, that is to say the number
+        of results containing it.
+
+        Args:
+            experiments (list of schedy.Experiment): Experiments whose jobs
+                use this store.
+
+        Returns:
+            dict: A dictionary mapping the hash of each referenced file to its
+            number of references.
+        '''
+        counts = dict()
+        for experiment in experiments:
+            for job in experiment.all_jobs(fields=['results']):
+                for value in job.results.values():
+                    if isinstance(value, SidecarArray):
+                        counts[value.digest] = counts.get(value.digest, 0) + 1
+        return counts
+
+    def _dump_results(self, results):
+        # An object can only be a NumPy array if NumPy was imported by the
+        # user
+        np = sys.modules.get('numpy')
+        if np is None or not results:
+            return results
+        dumped = None
+        for name, value in results.items():
+            if isinstance(value, np.ndarray) and value.dtype != object and value.nbytes >= self.threshold:
+                if dumped is None:
+                    dumped = dict(results)
+                dumped[name] = self.add_array(value)
+        return dumped if dumped is not None else results
+
+    def _load_results(self, results):
+        loaded = None
+        for name, value in results.items():
+            if isinstance(value, dict) and SIDECAR_KEY in value:
+                try:
+                    array = SidecarArray(self, str(value[SIDECAR_KEY]), value['shape'], value['dtype'])
+                except (KeyError, TypeError):
+                    continue
+                if loaded is None:
+                    loaded = dict(results)
+                loaded[name] = array
+        return loaded if loaded is not None else results
+
+def _sidecar_convert(obj):
+    if isinstance(obj, SidecarArray):
+        return obj._reference(), True
+    return None, False
+
+encoding._additional_convert.append(_sidecar_convert)
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+
+'''
+Local backend storing experiments and jobs in a SQLite database, used when
+the root of the configuration is a ``sqlite:`` URL, following the SQLAlchemy
+convention: ``sqlite:///relative/path.db`` or ``sqlite:////absolute/path.db``.
+
+Example:
+    >>> db = schedy.SchedyDB(config_override={'root': 'sqlite:///experiments.db'})
+
+The backend answers the requests of :py:class:`schedy.SchedyDB` as the Schedy
+service would. Several processes can share the same database file: the
+database uses write-ahead logging, and a job is claimed by
+:py:meth:`schedy.Experiment.next_job` in a single transaction.
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import math
+import os
+import random
+import threading
+
+from six.moves.urllib.parse import unquote, urlsplit
+
+from .compat import json_dumps
+from .jobs import _job_matches, _project_job
+from .transport import Response
+
+#: Prefix of the roots using the SQLite backend.
+SQLITE_ROOT_PREFIX = 'sqlite://'
+#: Prefix of the roots using an in-memory database.
+MEMORY_ROOT_PREFIX = 'memory://'
+#: Maximum number of items in a page of results.
+PAGE_SIZE = 100
+#: Number of seconds to wait for a lock held by another process.
+LOCK_TIMEOUT = 60
+
+# Expiration date of the tokens returned by the backend (January 2038)
+_TOKEN_EXPIRATION = 2 ** 31 - 1
+
+_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS experiments (
+        name TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        scheduler TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        experiment TEXT NOT NULL REFERENCES experiments (name) ON DELETE CASCADE,
+        status TEXT NOT NULL,
+        hyperparameters TEXT NOT NULL,
+        results TEXT NOT NULL,
+        version INTEGER NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (experiment, status, id)',
+    # Without it, each page of jobs sorts all the jobs of the experiment
+    'CREATE INDEX IF NOT EXISTS jobs_experiment ON jobs (experiment, id)',
+)
+
+def is_sqlite_root(root):
+    return root.startswith(SQLITE_ROOT_PREFIX)
+
+def is_memory_root(root):
+    return root.startswith(MEMORY_ROOT_PREFIX)
+
+def _database_path(root):
+    path = root[len(SQLITE_ROOT_PREFIX):].rstrip('/')
+    if not path.startswith('/'):
+        raise ValueError('Invalid SQLite root: {} (expected sqlite:///path).'.format(root))
+    # sqlite:///relative/path or sqlite:////absolute/path
+    return path[1:]
+
+def _response(status_code, content=None, headers=None):
+    if content is None:
+        text = ''
+    elif isinstance(content, dict):
+        text = json_dumps(content)
+    else:
+        text = content
+    return Response(status_code, text, headers)
+
+def _error(status_code, message):
+    return _response(status_code, message)
+
+class SQLiteBackend(object):
+    def __init__(self, root, memory=False):
+        '''
+        Opens (and creates if needed) the database of a ``sqlite:`` root.
+
+        Args:
+            root (str): Root of the configuration.
+            memory (bool): If true, the database is stored in memory instead,
+                and is only shared by the threads of this process.
+        '''
+        self.root = root
+        self.memory = memory
+        self.path = ':memory:' if memory else _database_path(root)
+        self._local = threading.local()
+        self._random = random.Random()
+        # An in-memory database only exists for one connection, which is
+        # shared by all the threads
+        self._shared_connection = None
+        self._shared_lock = threading.Lock()
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, auth=None):
+        '''
+        Processes a request sent by :py:class:`schedy.SchedyDB`.
+
+        Returns:
+            schedy.transport.Response: The response.
+        '''
+        # urljoin does not resolve relative URLs for the sqlite and memory
+        # schemes, so the URLs are usually relative to the root already
+        if url.startswith(self.root):
+            url = url[len(self.root):]
+        elif '://' in url:
+            url = urlsplit(url).path
+        parts = [unquote(part) for part in url.strip('/').split('/')]
+        params = params or dict()
+        headers = headers or dict()
+        if data is not None and not isinstance(data, dict):
+            try:
+                data = _loads(data)
+            except ValueError:
+                return _error(400, 'Invalid JSON body.')
+        if parts[0] in ('token', 'passauth') and len(parts) == 1 and method == 'POST':
+            return _response(200, {'token': 'sqlite', 'expiresAt': _TOKEN_EXPIRATION})
+        if parts[0] != 'experiments':
+            return _error(404, 'Not supported by the SQLite backend: {}.'.format(url))
+        if self.memory:
+            with self._shared_lock:
+                return self._route(self._connection(), method, url, parts, params, data, headers)
+        return self._route(self._connection(), method, url, parts, params, data, headers)
+
+    def close(self):
+        '''
+        Closes the connection of the current thread.
+        '''
+        if self.memory:
+            return
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.pid = None
+        self._local.connection = None
+
+    def _route(self, connection, method, url, parts, params, data, headers):
+        if len(parts) == 1 and method == 'GET':
+            return self._list_experiments(connection, params)
+        if len(parts) == 2:
+            handler = {
+                'GET': self._get_experiment,
+                'PUT': self._put_experiment,
+                'DELETE': self._delete_experiment,
+            }.get(method)
+        elif len(parts) == 3 and parts[2] == 'nextjob' and method == 'GET':
+            handler = self._next_job
+        elif len(parts) == 3 and parts[2] == 'jobs':
+            handler = {
+                'GET': self._list_jobs,
+                'POST': self._create_job,
+            }.get(method)
+        elif len(parts) == 4 and parts[2] == 'jobs':
+            handler = {
+                'GET': self._get_job,
+                'PUT': self._put_job,
+                'DELETE': self._delete_job,
+            }.get(method)
+        else:
+            handler = None
+        if handler is None:
+            return _error(404, 'Not supported by the SQLite backend: {} {}.'.format(method, url))
+        # Name of the experiment, and id of the job if any
+        path = parts[1:2] + parts[3:]
+        return handler(connection, path, params=params, data=data, headers=headers)
+
+    def _connection(self):
+        if self.memory:
+            if self._shared_connection is None:
+                self._shared_connection = self._connect(check_same_thread=False)
+            return self._shared_connection
+        # Connections cannot be shared by threads, nor by processes after a
+        # fork
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.connection = self._connect()
+            self._local.pid = pid
+        return self._local.connection
+
+    def _connect(self, **kwargs):
+        import sqlite3
+        connection = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, isolation_level=None, **kwargs)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('PRAGMA foreign_keys=ON')
+        for statement in _SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    # Experiments
+
+    def _list_experiments(self, connection, params):
+        start = params.get('start', '')
+        rows = connection.execute(
+            'SELECT name, status, scheduler FROM experiments WHERE name > ? ORDER BY name LIMIT ?',
+            (start, PAGE_SIZE + 1)).fetchall()
+        page = {'items': [_experiment_map(row) for row in rows[:PAGE_SIZE]]}
+        if len(rows) > PAGE_SIZE:
+            page['next'] = rows[PAGE_SIZE - 1][0]
+        return _response(200, page)
+
+    def _get_experiment(self, connection, path, **kwargs):
+        row = _select_experiment(connection, path[0])
+        if row is None:
+            return _error(404, 'Experiment {} not found.'.format(path[0]))
+        return _response(200, _experiment_map(row))
+
+    def _put_experiment(self, connection, path, data, headers, **kwargs):
+        try:
+            status = str(data['status'])
+            scheduler = json_dumps(dict(data['scheduler']))
+        except (KeyError, TypeError, ValueError):
+            return _error(400, 'Invalid experiment definition.')
+        with _transaction(connection):
+            exists = _select_experiment(connection, path[0]) is not None
+            if exists and headers.get('If-None-Match') == '*':
+                return _error(412, 'Experiment {} exists already.'.format(path[0]))
+            if not exists and headers.get('If-Match') == '*':
+                return _error(412, 'Experiment {} does not exist.'.format(path[0]))
+            if exists:
+                connection.execute('UPDATE experiments SET status = ?, scheduler = ? WHERE name = ?', (status, scheduler, path[0]))
+            else:
+                connection.execute('INSERT INTO experiments (name, status, scheduler) VALUES (?, ?, ?)', (path[0], status, scheduler))
+        return _response(200 if exists else 201)
+
+    def _delete_experiment(self, connection, path, headers, **kwargs):
+        with _transaction(connection):
+            deleted = connection.execute('DELETE FROM experiments WHERE name = ?', (path[0],)).rowcount
+        if not deleted:
+            return _error(412 if headers.get('If-Match') == '*' else 404, 'Experiment {} not found.'.format(path[0]))
+        return _response(204)
+
+    # Jobs
+
+    def _list_jobs(self, connection, path, params, **kwargs):
+        if _select_experiment(connection, path[0]) is None:
+            return _error(404, 'Experiment {} not found.'.format(path[0]))
+        try:
+            start = int(params.get('start', 0))
+            where = _loads(params['where']) if params.get('where') else None
+        except ValueError:
+            return _error(400, 'Invalid parameters.')
+        query = 'SELECT id, experiment, status, hyperparameters, results, version FROM jobs WHERE experiment = ? AND id > ?'
+        args = [path[0], start]
+        if params.get('status'):
+            statuses = params['status'].split(',')
+            query += ' AND status IN ({})'.format(', '.join('?' * len(statuses)))
+            args.extend(statuses)
+        query += ' ORDER BY id'
+        fields = params['fields'].split(',') if params.get('fields') else None
+        items = []
+        next_token = None
+        # The rows are filtered on this side, so the page can end before the
+        # last row retrieved
+        for row in connection.execute(query, args):
+            if len(items) == PAGE_SIZE:
+                next_token = str(last_id)
+                break
+            last_id = row[0]
+            map_def = _job_map(row)
+            if where and not _job_matches(map_def, where=where):
+                continue
+            items.append(_project_job(map_def, fields) if fields is not None else map_def)
+        page = {'items': items}
+        if next_token is not None:
+            page['next'] = next_token
+        return _response(200, page)
+
+    def _create_job(self, connection, path, data, **kwargs):
+        with _transaction(connection):
+            if _select_experiment(connection, path[0]) is None:
+                return _error(404, 'Experiment {} not found.'.format(path[0]))
+            try:
+                values = _job_values(data)
+            except ValueError as e:
+                return _error(400, str(e))
+            cursor = connection.execute(
+                'INSERT INTO jobs (experiment, status, hyperparameters, results, version) VALUES (?, ?, ?, ?, 0)',
+                (path[0],) + values)
+            row = _select_job(connection, path[0], cursor.lastrowid)
+        return _job_response(row, 201)
+
+    def _get_job(self, connection, path, **kwargs):
+        row = _select_job(connection, path[0], path[1])
+        if row is None:
+            return _error(404, 'Job {} not found.'.format(path[1]))
+        return _job_response(row)
+
+    def _put_job(self, connection, path, data, headers, **kwargs):
+        try:
+            values = _job_values(data)
+        except ValueError as e:
+            return _error(400, str(e))
+        with _transaction(connection):
+            row = _select_job(connection, path[0], path[1])
+            if row is None:
+                if 'If-Match' in headers:
+                    return _error(412, 'Job {} does not exist.'.format(path[1]))
+                if _select_experiment(connection, path[0]) is None:
+                    return _error(404, 'Experiment {} not found.'.format(path[0]))
+                try:
+                    job_id = int(path[1])
+                except ValueError:
+                    return _error(400, 'Invalid job id: {}.'.format(path[1]))
+                connection.execute(
+                    'INSERT INTO jobs (id, experiment, status, hyperparameters, results, version) VALUES (?, ?, ?, ?, ?, 0)',
+                    (job_id, path[0]) + values)
+                return _job_response(_select_job(connection, path[0], job_id), 201)
+            if headers.get('If-None-Match') == '*':
+                return _error(412, 'Job {} exists already.'.format(path[1]))
+            if_match = headers.get('If-Match')
+            if if_match not in (None, '*') and if_match != _etag(row):
+                return _error(412, 'Job {} was modified by another client.'.format(path[1]))
+            connection.execute(
+                'UPDATE jobs SET status = ?, hyperparameters = ?, results = ?, version = version + 1 WHERE id = ?',
+                values + (row[0],))
+            row = _select_job(connection, path[0], row[0])
+        return _job_response(row)
+
+    def _delete_job(self, connection, path, headers, **kwargs):
+        with _transaction(connection):
+            row = _select_job(connection, path[0], path[1])
+            if row is not None:
+                connection.execute('DELETE FROM jobs WHERE id = ?', (row[0],))
+        if row is None:
+            return _error(412 if headers.get('If-Match') == '*' else 404, 'Job {} not found.'.format(path[1]))
+        return _response(204)
+
+    def _next_job(self, connection, path, **kwargs):
+        # The job is claimed in the same transaction as it is selected, so two
+        # clients never receive the same job
+        with _transaction(connection):
+            experiment = _select_experiment(connection, path[0])
+            if experiment is None:
+                return _error(404, 'Experiment {} not found.'.format(path[0]))
+            if experiment[1] != 'RUNNING':
+                return _response(204)
+            row = connection.execute(
+                'SELECT id FROM jobs WHERE experiment = ? AND status = ? ORDER BY id LIMIT 1',
+                (path[0], 'QUEUED')).fetchone()
+            if row is not None:
+                connection.execute('UPDATE jobs SET status = ?, version = version + 1 WHERE id = ?', ('RUNNING', row[0]))
+                job_id = row[0]
+            else:
+                scheduler_name, scheduler_params = next(iter(_loads(experiment[2]).items()))
+                if scheduler_name == 'PBT':
+                    return _error(400, 'The PBT scheduler is not supported by the SQLite backend, use schedy.pbt.PBTScheduler instead.')
+                if scheduler_name != 'RandomSearch':
+                    return _response(204)
+                hyperparameters = {name: self._sample(dist) for name, dist in scheduler_params.items()}
+                job_id = connection.execute(
+                    'INSERT INTO jobs (experiment, status, hyperparameters, results, version) VALUES (?, ?, ?, ?, 0)',
+                    (path[0], 'RUNNING', json_dumps(hyperparameters), '{}')).lastrowid
+            row = _select_job(connection, path[0], job_id)
+        return _job_response(row)
+
+    def _sample(self, dist_def):
+        # Same sampling as the service, for random search experiments
+        dist_name, args = next(iter(dist_def.items()))
+        rand = self._random
+        if dist_name == 'uniform':
+            return rand.uniform(args['low'], args['high'])
+        if dist_name == 'loguniform':
+            return math.exp(rand.uniform(math.log(args['low']), math.log(args['high'])))
+        if dist_name == 'normal':
+            return rand.gauss(args['mean'], args['std'])
+        if dist_name == 'choice':
+            values = args['values']
+            weights = args.get('weights') or [1] * len(values)
+            threshold = rand.uniform(0, sum(weights))
+            for value, weight in zip(values, weights):
+                threshold -= weight
+                if threshold < 0:
+                    return value
+            return values[-1]
+        if dist_name == 'const':
+            return args
+        raise ValueError('Unknown distribution: {}.'.format(dist_name))
+
+class _transaction(object):
+    '''
+    Immediate transaction: the database is locked for writing at the start of
+    the transaction, so that the rows read cannot be modified concurrently.
+    '''
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
+
+def _loads(text):
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+    return json.loads(text)
+
+def _select_experiment(connection, name):
+    return connection.execute('SELECT name, status, scheduler FROM experiments WHERE name = ?', (name,)).fetchone()
+
+def _experiment_map(row):
+    return {'name': row[0], 'status': row[1], 'scheduler': _loads(row[2])}
+
+def _select_job(connection, experiment, job_id):
+    try:
+        job_id = int(job_id)
+    except ValueError:
+        return None
+    return connection.execute(
+        'SELECT id, experiment, status, hyperparameters, results, version FROM jobs WHERE experiment = ? AND id = ?',
+        (experiment, job_id)).fetchone()
+
+def _job_map(row):
+    return {
+        'id': str(row[0]),
+        'experiment': row[1],
+        'status': row[2],
+        'hyperparameters': _loads(row[3]),
+        'results': _loads(row[4]),
+    }
+
+def _job_values(data):
+    try:
+        status = str(data.get('status', 'QUEUED'))
+        hyperparameters = dict(data.get('hyperparameters') or {})
+        results = dict(data.get('results') or {})
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError('Invalid job definition.')
+    return status, json_dumps(hyperparameters), json_dumps(results)
+
+def _etag(row):
+    return str(row[5])
+
+def _job_response(row, status_code=200):
+    return _response(status_code, _job_map(row), {'ETag': _etag(row)})
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+
+'''
+Client-side Tree-structured Parzen Estimator (TPE) scheduler, which proposes
+new jobs from the results of the completed ones (see `paper
+<https://papers.nips.cc/paper/4443-algorithms-for-hyper-parameter-optimization.pdf>`_).
+
+Example:
+    >>> exp = db.get_experiment('ManualExperiment')
+    >>> scheduler = schedy.tpe.TPEScheduler(exp, {
+    >>>     'learning_rate': schedy.random.LogUniform(1e-5, 1e-1),
+    >>>     'optimizer': schedy.random.Choice(['adam', 'sgd']),
+    >>> }, result_name='loss')
+    >>> while True:
+    >>>     # Keep a job queued for each of the 100 workers
+    >>>     scheduler.fill_queue(100)
+    >>>     time.sleep(10)
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import math
+
+from .compat import json_dumps
+from .jobs import Job
+from .pbt import MINIMIZE, MAXIMIZE
+from .random import LogUniform, Uniform, Choice, Normal, Constant, _make_rng, _import_numpy
+
+#: Number of points of the grids on which the continuous densities are
+#: evaluated.
+_GRID_SIZE = 512
+#: Width of the grid of a normal distribution, in standard deviations.
+_NORMAL_GRID_WIDTH = 5
+
+class _GridDensity(object):
+    '''
+    Mixture of the prior distribution of a continuous hyperparameter and of
+    Gaussian kernels centered on observations, evaluated on a grid.
+    '''
+    def __init__(self, param, points):
+        np = param.np
+        self.param = param
+        self.points = points
+        self.count = len(points)
+        self.bandwidth = param.bandwidth(points)
+        grid = param.grid
+        # Kernel sums computed by binning the points and convolving the bins
+        # with the kernel, in O(grid size ** 2) instead of
+        # O(grid size * number of points)
+        bins = np.clip(np.rint((points - grid[0]) / param.step), 0, len(grid) - 1).astype(int)
+        counts = np.bincount(bins, minlength=len(grid))
+        offsets = np.arange(-len(grid) + 1, len(grid)) * param.step
+        self.sums = np.convolve(counts, self._kernel(offsets), mode='valid')
+
+    def _kernel(self, offsets):
+        np = self.param.np
+        return np.exp(-0.5 * (offsets / self.bandwidth) ** 2) / (math.sqrt(2 * math.pi) * self.bandwidth)
+
+    def log_pdf(self, x):
+        np = self.param.np
+        pdf = (self.sums + self.param.prior) / (self.count + 1)
+        return np.log(np.interp(x, self.param.grid, pdf))
+
+    def add(self, x):
+        self.sums = self.sums + self._kernel(self.param.grid - x)
+        self.count += 1
+
+    def sample(self, n, rng):
+        np = self.param.np
+        # Pick a component of the mixture, the last one being the prior
+        components = rng.integers(len(self.points) + 1, size=n)
+        from_prior = components == len(self.points)
+        samples = np.empty(n)
+        samples[from_prior] = self.param.sample_prior(int(from_prior.sum()), rng)
+        centers = self.points[components[~from_prior]]
+        samples[~from_prior] = centers + self.bandwidth * rng.standard_normal(len(centers))
+        return self.param.clip(samples)
+
+class _ContinuousParam(object):
+    '''
+    Continuous hyperparameter, represented in a space where its prior is
+    uniform (``Uniform``, ``LogUniform``) or normal (``Normal``).
+    '''
+    def __init__(self, np, distribution):
+        self.np = np
+        self.distribution = distribution
+        self.log = isinstance(distribution, LogUniform)
+        if isinstance(distribution, Normal):
+            self.bounded = False
+            self.low = distribution.mean - _NORMAL_GRID_WIDTH * distribution.std
+            self.high = distribution.mean + _NORMAL_GRID_WIDTH * distribution.std
+        else:
+            self.bounded = True
+            self.low, self.high = float(distribution.low), float(distribution.high)
+            if self.log:
+                self.low, self.high = math.log(self.low), math.log(self.high)
+        self.grid = np.linspace(self.low, self.high, _GRID_SIZE)
+        self.step = self.grid[1] - self.grid[0]
+        if self.bounded:
+            self.prior = np.full(_GRID_SIZE, 1 / (self.high - self.low))
+        else:
+            std = distribution.std
+            self.prior = np.exp(-0.5 * ((self.grid - distribution.mean) / std) ** 2) / (math.sqrt(2 * math.pi) * std)
+
+    def encode(self, values):
+        np = self.np
+        try:
+            encoded = np.array(values, dtype=float)
+        except (TypeError, ValueError):
+            encoded = None
+        if encoded is not None and encoded.ndim == 1:
+            if self.log:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    encoded = np.log(encoded)
+            return encoded
+        # Some values are missing or invalid
+        encoded = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                value = float(value)
+                encoded[i] = math.log(value) if self.log else value
+            except (TypeError, ValueError):
+                pass
+        return encoded
+
+    def decode(self, x):
+        return math.exp(x) if self.log else float(x)
+
+    def sample_prior(self, n, rng):
+        if self.bounded:
+            return rng.uniform(self.low, self.high, size=n)
+        return rng.normal(self.distribution.mean, self.distribution.std, size=n)
+
+    def clip(self, x):
+        if not self.bounded:
+            return x
+        # The upper bound is exclusive
+        return self.np.clip(x, self.low, self.np.nextafter(self.high, self.low))
+
+    def bandwidth(self, points):
+        # Scott's rule, bounded so that a few close points neither produce a
+        # degenerate density nor a flat one
+        width = self.high - self.low
+        n = len(points)
+        scott = 1.06 * points.std() * n ** -0.2 if n > 1 else width
+        return float(min(max(scott, width / min(100, n + 1), 2 * self.step), width))
+
+    def density(self, points):
+        return _GridDensity(self, points)
+
+class _CategoricalDensity(object):
+    '''
+    Prior weights of a categorical hyperparameter, plus the counts of its
+    observed values.
+    '''
+    def __init__(self, param, indices):
+        np = param.np
+        self.param = param
+        self.counts = np.bincount(indices, minlength=len(param.prior)).astype(float)
+        self.count = len(indices)
+
+    def log_pdf(self, indices):
+        np = self.param.np
+        return np.log((self.counts[indices] + self.param.prior[indices]) / (self.count + 1))
+
+    def add(self, index):
+        self.counts[index] += 1
+        self.count += 1
+
+    def sample(self, n, rng):
+        probs = (self.counts + self.param.prior) / (self.count + 1)
+        return rng.choice(len(probs), size=n, p=probs / probs.sum())
+
+class _CategoricalParam(object):
+    def __init__(self, np, distribution):
+        self.np = np
+        self.distribution = distribution
+        self.values = list(distribution.values)
+        if distribution.weights is None:
+            weights = np.ones(len(self.values))
+        else:
+            weights = np.asarray(distribution.weights, dtype=float)
+        self.prior = weights / weights.sum()
+        # Values can be lists or dictionaries, so they are looked up by their
+        # JSON representation, after a faster lookup of hashable values
+        self._indices = {self._key(value): i for i, value in enumerate(self.values)}
+        self._hashable_indices = dict()
+        self._cache = dict()
+        for i, value in enumerate(self.values):
+            try:
+                self._hashable_indices.setdefault((type(value), value), i)
+            except TypeError:
+                pass
+
+    @staticmethod
+    def _key(value):
+        try:
+            return json_dumps(value, sort_keys=True)
+        except TypeError:
+            return None
+
+    def _index(self, value):
+        try:
+            index = self._hashable_indices.get((type(value), value))
+        except TypeError:
+            index = None
+        if index is None:
+            # The JSON representation is slow to compute, so it is cached
+            # for each distinct value
+            cache_key = repr(value)
+            index = self._cache.get(cache_key)
+            if index is None:
+                index = self._cache[cache_key] = self._indices.get(self._key(value), -1)
+        return index
+
+    def encode(self, values):
+        np = self.np
+        return np.array([self._index(value) for value in values], dtype=int)
+
+    def decode(self, index):
+        return self.values[index]
+
+    def density(self, indices):
+        return _CategoricalDensity(self, indices)
+
+class TPEScheduler(object):
+    def __init__(self, experiment, distributions, result_name, objective=MINIMIZE, gamma=0.25, num_candidates=64, num_startup_jobs=20, seed=None):
+        '''
+        Proposes jobs for an experiment (usually a
+        :py:class:`schedy.ManualSearch`) using a Tree-structured Parzen
+        Estimator. Requires NumPy.
+
+        The completed jobs are split between the best ones (a proportion
+        ``gamma`` of them) and the others, and the distribution of the
+        hyperparameters of each group is estimated, independently for each
+        hyperparameter. The proposed points maximize the ratio of the
+        density of the best jobs to the density of the others, among
+        candidates sampled from the density of the best jobs.
+
+        Queued and running jobs are counted among the worst jobs (constant
+        liar), as are the points proposed earlier in the same batch, so that
+        the proposals of a batch are not all the same point.
+
+        Args:
+            experiment (schedy.Experiment): Experiment whose jobs are used,
+                and to which the proposed jobs are added.
+            distributions (dict): A dictionary of distributions (see
+                :py:mod:`schedy.random`), whose keys are the names of the
+                hyperparameters. They are the priors of the hyperparameters.
+            result_name (str): The name of the result to optimize.
+            objective (str): The objective of the optimization, either
+                :py:attr:`schedy.pbt.MINIMIZE` or
+                :py:attr:`schedy.pbt.MAXIMIZE`.
+            gamma (float): Proportion of the completed jobs considered as the
+                best jobs.
+            num_candidates (int): Number of candidates sampled for each
+                proposed job.
+            num_startup_jobs (int): Number of completed jobs under which the
+                proposed jobs are sampled from the priors.
+            seed (numpy.random.Generator or int): Random generator, or seed of
+                a new generator.
+        '''
+        if objective not in (MINIMIZE, MAXIMIZE):
+            raise ValueError('Invalid objective: {!r}.'.format(objective))
+        if not 0 < gamma < 1:
+            raise ValueError('gamma must be between 0 and 1, found {}.'.format(gamma))
+        self.experiment = experiment
+        self.distributions = distributions
+        self.result_name = result_name
+        self.objective = objective
+        self.gamma = gamma
+        self.num_candidates = num_candidates
+        self.num_startup_jobs = num_startup_jobs
+        self._np = _import_numpy()
+        self._rng = _make_rng(seed)
+        self._params = dict()
+        for name, dist in distributions.items():
+            if isinstance(dist, (LogUniform, Uniform, Normal)):
+                self._params[name] = _ContinuousParam(self._np, dist)
+            elif isinstance(dist, Choice):
+                self._params[name] = _CategoricalParam(self._np, dist)
+            elif not isinstance(dist, Constant):
+                raise ValueError('Unsupported distribution for hyperparameter {}: {}.'.format(name, type(dist).__name__))
+
+    def fill_queue(self, num_jobs):
+        '''
+        Adds jobs to the experiment until ``num_jobs`` jobs are queued.
+
+        Args:
+            num_jobs (int): Number of queued jobs to reach, usually the number
+                of workers.
+
+        Returns:
+            list of :py:class:`schedy.Job`: The new jobs.
+        '''
+        completed, pending = self._fetch_jobs()
+        num_queued = sum(1 for job in pending if job.status == Job.QUEUED)
+        proposals = self._propose(num_jobs - num_queued, completed, pending)
+        return [self.experiment.add_job(hyperparameters=hyperparameters) for hyperparameters in proposals]
+
+    def propose(self, n):
+        '''
+        Proposes new sets of hyperparameters, without adding them to the
+        experiment.
+
+        Args:
+            n (int): Number of sets of hyperparameters.
+
+        Returns:
+            list: A list of ``n`` dictionaries of hyperparameters.
+        '''
+        completed, pending = self._fetch_jobs()
+        return self._propose(n, completed, pending)
+
+    def _fetch_jobs(self):
+        result_field = 'results.' + self.result_name
+        jobs = self.experiment.all_jobs(status=[Job.DONE, Job.QUEUED, Job.RUNNING], fields=['hyperparameters', result_field])
+        completed = []
+        pending = []
+        for job in jobs:
+            if job.status == Job.DONE:
+                completed.append(job)
+            else:
+                pending.append(job)
+        return completed, pending
+
+    def _losses(self, jobs):
+        np = self._np
+        losses = np.full(len(jobs), np.nan)
+        for i, job in enumerate(jobs):
+            try:
+                losses[i] = float(job.results[self.result_name])
+            except (KeyError, TypeError, ValueError):
+                pass
+        if self.objective == MAXIMIZE:
+            losses = -losses
+        return losses
+
+    def _propose(self, n, completed, pending):
+        np = self._np
+        if n <= 0:
+            return []
+        losses = self._losses(completed)
+        observed = np.isfinite(losses)
+        names = sorted(self.distributions)
+        if observed.sum() < self.num_startup_jobs:
+            columns = [self.distributions[name].sample(n, self._rng).tolist() for name in names]
+            return [dict(zip(names, values)) for values in zip(*columns)] if names else [dict() for _ in range(n)]
+        completed = [job for job, ok in zip(completed, observed) if ok]
+        losses = losses[observed]
+        num_good = int(math.ceil(self.gamma * len(losses)))
+        order = np.argsort(losses, kind='mergesort')
+        is_good = np.zeros(len(losses), dtype=bool)
+        is_good[order[:num_good]] = True
+        # Fit the densities of the best jobs (l) and of the others (g)
+        good_densities = dict()
+        bad_densities = dict()
+        for name, param in self._params.items():
+            encoded = param.encode([job.hyperparameters.get(name) for job in completed])
+            pending_encoded = param.encode([job.hyperparameters.get(name) for job in pending])
+            valid = np.isfinite(encoded) if encoded.dtype == float else encoded >= 0
+            pending_valid = np.isfinite(pending_encoded) if pending_encoded.dtype == float else pending_encoded >= 0
+            good_densities[name] = param.density(encoded[valid & is_good])
+            bad_densities[name] = param.density(np.concatenate((encoded[valid & ~is_good], pending_encoded[pending_valid])))
+        proposals = []
+        for _ in range(n):
+            scores = np.zeros(self.num_candidates)
+            candidates = dict()
+            for name, good in good_densities.items():
+                candidates[name] = good.sample(self.num_candidates, self._rng)
+                scores += good.log_pdf(candidates[name]) - bad_densities[name].log_pdf(candidates[name])
+            best = int(np.argmax(scores))
+            hyperparameters = dict()
+            for name in names:
+                dist = self.distributions[name]
+                if isinstance(dist, Constant):
+                    hyperparameters[name] = dist.value
+                    continue
+                chosen = candidates[name][best]
+                hyperparameters[name] = self._params[name].decode(chosen)
+                # Constant liar: the proposal counts as a bad job for the next
+                # proposals of the batch
+                bad_densities[name].add(chosen)
+            proposals.append(hyperparameters)
+        return proposals
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+
+'''
+Transports used by :py:class:`schedy.SchedyDB` to send its requests.
+
+The transport is chosen with the ``transport`` argument of
+:py:class:`schedy.SchedyDB`, or the ``transport`` key of the configuration:
+
+- ``requests`` (default): uses the Requests library, with retries.
+- ``http.client``: uses the standard library, with fewer layers between the
+  client and the socket.
+- ``http2``: multiplexes the requests of all the threads over a few HTTP/2
+  connections (requires ``httpx[http2]``).
+- ``sqlite``: stores the experiments locally (see :py:mod:`schedy.sqlite`),
+  used by default for ``sqlite:`` roots.
+- ``memory``: stores the experiments in memory, for tests.
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import logging
+import os
+import threading
+import time
+
+from six import raise_from
+from six.moves.urllib.parse import urlencode, urlsplit
+
+from .compat import json_dumps
+
+logger = logging.getLogger(__name__)
+
+#: Number of times a request is retried after a connection error or a server
+#: error.
+NUM_RETRIES = 10
+#: Factor of the exponential backoff between retries, in seconds.
+BACKOFF_FACTOR = 0.4
+#: Maximum time between two retries, in seconds.
+BACKOFF_MAX = 8 * 60
+#: Status codes of the responses for which the request is retried.
+RETRY_STATUS_CODES = (500, 503)
+
+class Headers(dict):
+    '''
+    Dictionary of HTTP headers, whose keys are case-insensitive.
+    '''
+    def __init__(self, items=()):
+        super(Headers, self).__init__()
+        for key, value in dict(items).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        super(Headers, self).__setitem__(key.lower(), value)
+
+    def __getitem__(self, key):
+        return super(Headers, self).__getitem__(key.lower())
+
+    def __contains__(self, key):
+        return super(Headers, self).__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super(Headers, self).get(key.lower(), default)
+
+def _send_with_retries(send, errors):
+    # Retries the connection errors and the server errors with an exponential
+    # backoff, like the Requests transport
+    for attempt in range(NUM_RETRIES + 1):
+        error = None
+        try:
+            response = send()
+        except errors as e:
+            error = e
+        else:
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+        if attempt == NUM_RETRIES:
+            break
+        logger.warning('Error while querying Schedy service, retrying.')
+        # The first retry is immediate, as it is usually caused by a
+        # kept-alive connection closed by the server
+        if attempt > 0:
+            time.sleep(min(BACKOFF_FACTOR * 2 ** (attempt - 1), BACKOFF_MAX))
+    if error is not None:
+        raise error
+    return response
+
+class Response(object):
+    def __init__(self, status_code, text='', headers=None):
+        '''
+        Response returned by a transport.
+
+        Args:
+            status_code (int): HTTP status code.
+            text (str): Body of the response.
+            headers (dict): Headers of the response.
+        '''
+        self.status_code = status_code
+        self.text = text
+        self.headers = Headers(headers or {})
+
+    def json(self):
+        '''
+        Decodes the body of the response.
+
+        Returns:
+            The decoded JSON value.
+        '''
+        return json.loads(self.text)
+
+class Transport(object):
+    '''
+    Base class of the transports.
+    '''
+    def request(self, method, url, params=None, data=None, json=None, headers=None, auth=None):
+        '''
+        Sends a request.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Absolute URL of the resource.
+            params (dict): Query string parameters.
+            data (str): Body of the request.
+            json: Value sent as a JSON body, if ``data`` is None.
+            headers (dict): Headers of the request.
+            auth (schedy.jwt.JWTTokenAuth): Authentication token.
+
+        Returns:
+            Response: The response.
+        '''
+        raise NotImplementedError()
+
+    def close(self):
+        '''
+        Closes the connections of the transport.
+        '''
+        pass
+
+class RequestsTransport(Transport):
+    def __init__(self, max_connections):
+        '''
+        Transport using a session of the Requests library.
+
+        Args:
+            max_connections (int): Maximum number of connections kept open.
+        '''
+        # Requests is only imported when the transport is created, so that
+        # commands that do not need it start faster
+        import requests
+        from requests.adapters import HTTPAdapter
+        from .retry import SchedyRetry
+        session = requests.Session()
+        # Careful: POST and PATCH are in the whitelist. This means that the
+        # server should not be in an incomplete state or POSTING and PATCHING
+        # twice could do weird things. We do this because we do not want
+        # Schedy to crash in the face of the user when there's a connection or
+        # benign error.
+        methods = frozenset(('HEAD', 'TRACE', 'GET', 'PUT', 'OPTIONS', 'DELETE', 'POST', 'PATCH'))
+        # method_whitelist was renamed in urllib3 1.26, and removed in 2.0
+        if hasattr(SchedyRetry, 'DEFAULT_ALLOWED_METHODS'):
+            methods_kwargs = {'allowed_methods': methods}
+        else:
+            methods_kwargs = {'method_whitelist': methods}
+        retry_mgr = SchedyRetry(
+                total=NUM_RETRIES,
+                read=NUM_RETRIES,
+                connect=NUM_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=frozenset(RETRY_STATUS_CODES),
+                **methods_kwargs
+            )
+        adapter = HTTPAdapter(max_retries=retry_mgr, pool_maxsize=max_connections)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        self._session = session
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, auth=None):
+        response = self._session.request(method, url, params=params, data=data, json=json, headers=headers, auth=auth)
+        return Response(response.status_code, response.text, response.headers)
+
+    def close(self):
+        self._session.close()
+
+class HTTPClientTransport(Transport):
+    def __init__(self, max_connections):
+        '''
+        Transport using the ``http.client`` module of the standard library.
+        Each thread keeps its own connection open with each host.
+
+        Args:
+            max_connections (int): Ignored, there is one connection per
+                thread.
+        '''
+        self._local = threading.local()
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, auth=None):
+        split = urlsplit(url)
+        path = split.path or '/'
+        if split.query:
+            path += '?' + split.query
+        if params:
+            path += ('&' if split.query else '?') + urlencode(params)
+        request_headers = {'Accept': 'application/json'}
+        if data is None and json is not None:
+            data = json_dumps(json)
+            request_headers['Content-Type'] = 'application/json'
+        if data is not None and not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        request_headers.update(headers or {})
+        if auth is not None:
+            request_headers['Authorization'] = 'Bearer ' + auth.token_string
+        from six.moves import http_client
+
+        def send():
+            connection = self._connection(split.scheme, split.netloc)
+            try:
+                connection.request(method, path, body=data, headers=request_headers)
+                raw = connection.getresponse()
+                body = raw.read()
+            except:
+                # Includes the errors of http.client, and the closing of a
+                # kept-alive connection by the server
+                self._drop_connection(split.scheme, split.netloc)
+                raise
+            if raw.getheader('Connection', '').lower() == 'close':
+                self._drop_connection(split.scheme, split.netloc)
+            return Response(raw.status, body.decode('utf-8', 'replace'), raw.getheaders())
+
+        return _send_with_retries(send, (http_client.HTTPException, IOError, OSError))
+
+    def close(self):
+        for connection in getattr(self._local, 'connections', {}).values():
+            connection.close()
+        self._local.connections = dict()
+
+    def _connection(self, scheme, netloc):
+        from six.moves import http_client
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = dict()
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            if scheme == 'https':
+                connection = http_client.HTTPSConnection(netloc)
+            else:
+                connection = http_client.HTTPConnection(netloc)
+            connections[(scheme, netloc)] = connection
+        return connection
+
+    def _drop_connection(self, scheme, netloc):
+        connection = getattr(self._local, 'connections', {}).pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+class HTTP2Transport(Transport):
+    def __init__(self, max_connections, **client_kwargs):
+        '''
+        Transport multiplexing the requests of all the threads over a few
+        HTTP/2 connections, using `HTTPX <https://www.python-httpx.org/>`_.
+        This avoids one connection (and one TLS handshake) per thread when
+        many threads share the same :py:class:`schedy.SchedyDB`. Requires
+        Python 3 and ``httpx[http2]`` (``pip install schedy[http2]``).
+
+        The connections are driven by an event loop running in a background
+        thread, to which the other threads submit their requests. The server
+        must support HTTP/2, otherwise HTTP/1.1 is used.
+
+        Args:
+            max_connections (int): Maximum number of connections kept open.
+                With HTTP/2, one connection per host is usually enough.
+            **client_kwargs: Additional arguments of ``httpx.AsyncClient``
+                (e.g. ``verify``, or ``http1=False`` to use HTTP/2 without
+                TLS).
+        '''
+        try:
+            import httpx
+        except ImportError as e:
+            raise_from(ImportError('The http2 transport requires httpx, install it with: pip install schedy[http2]'), e)
+        self._httpx = httpx
+        client_kwargs.setdefault('http2', True)
+        client_kwargs.setdefault('limits', httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ))
+        self._client_kwargs = client_kwargs
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._client = None
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, auth=None):
+        request_headers = {'Accept': 'application/json'}
+        if data is None and json is not None:
+            data = json_dumps(json)
+            request_headers['Content-Type'] = 'application/json'
+        request_headers.update(headers or {})
+        if auth is not None:
+            request_headers['Authorization'] = 'Bearer ' + auth.token_string
+
+        def send():
+            # The body is read before the coroutine returns
+            raw = self._run(lambda client: client.request(method, url, params=params, content=data, headers=request_headers))
+            return Response(raw.status_code, raw.text, raw.headers.items())
+
+        # Connection errors are retried by _send_with_retries, not by HTTPX
+        return _send_with_retries(send, (self._httpx.TransportError,))
+
+    def close(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        import asyncio
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _run(self, coroutine_function):
+        # Runs coroutine_function(client) in the event loop, and waits for its
+        # result
+        import asyncio
+        with self._lock:
+            # The thread of the event loop does not survive a fork
+            if self._loop is None or self._pid != os.getpid():
+                self._start_loop()
+            loop, client = self._loop, self._client
+        return asyncio.run_coroutine_threadsafe(coroutine_function(client), loop).result()
+
+    def _start_loop(self):
+        import asyncio
+        self._loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self._loop.run_forever, name='schedy-http2')
+        thread.daemon = True
+        thread.start()
+        self._client = self._httpx.AsyncClient(**self._client_kwargs)
+        self._pid = os.getpid()
+
+class SQLiteTransport(Transport):
+    def __init__(self, root):
+        '''
+        Transport storing the experiments in a SQLite database. See
+        :py:mod:`schedy.sqlite`.
+
+        Args:
+            root (str): ``sqlite:`` root of the configuration.
+        '''
+        from .sqlite import SQLiteBackend
+        self._backend = SQLiteBackend(root)
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, auth=None):
+        return self._backend.request(method, url, params=params, data=data, json=json, headers=headers)
+
+    def close(self):
+        self._backend.close()
+
+class MemoryTransport(SQLiteTransport):
+    def __init__(self, root):
+        '''
+        Transport storing the experiments in memory, mostly useful for tests.
+        Each transport has its own experiments, which are lost when it is
+        garbage collected.
+
+        Args:
+            root (str): Root of the configuration.
+        '''
+        from .sqlite import SQLiteBackend
+        self._backend = SQLiteBackend(root, memory=True)
+
+#: Names of the transports that can be selected in the configuration.
+TRANSPORTS = ('requests', 'http.client', 'http2', 'sqlite', 'memory')
+
+def make_transport(name, root, max_connections):
+    '''
+    Creates a transport from its name.
+
+    Args:
+        name (str): Name of the transport, among :py:data:`TRANSPORTS`.
+        root (str): Root of the configuration.
+        max_connections (int): Maximum number of connections kept open.
+
+    Returns:
+        Transport: The new transport.
+    '''
+    if name == 'requests':
+        return RequestsTransport(max_connections)
+    if name == 'http.client':
+        return HTTPClientTransport(max_connections)
+    if name == 'http2':
+        return HTTP2Transport(max_connections)
+    if name == 'sqlite':
+        return SQLiteTransport(root)
+    if name == 'memory':
+        return MemoryTransport(root)
+    raise ValueError('Invalid transport: {!r}, expected one of {}.'.format(name, ', '.join(TRANSPORTS)))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+'''
+Worker pools processing the jobs of an experiment.
+
+Example:
+    >>> def train(hyperparameters):
+    >>>     return {'loss': train_model(**hyperparameters)}
+    >>> db = schedy.SchedyDB()
+    >>> exp = db.get_experiment('MinimizeRandom')
+    >>> jobs = exp.map(train, workers=8, executor='process')
+'''
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+import time
+
+from . import errors
+
+logger = logging.getLogger(__name__)
+
+#: Executors that can be used by a :py:class:`Worker`.
+EXECUTORS = ('thread', 'process')
+
+def _default_workers():
+    import multiprocessing
+    return multiprocessing.cpu_count()
+
+class Worker(object):
+    def __init__(self, experiment, func, workers=None, executor='thread', max_jobs=None, poll_interval=None, memo=None):
+        '''
+        Processes the jobs of an experiment with a pool of threads or
+        processes.
+
+        The jobs are claimed, and their results pushed, by the thread calling
+        :py:meth:`run`, so that all the requests share the connections of the
+        :py:class:`schedy.SchedyDB` of the experiment. The workers of the pool
+        only run ``func``.
+
+        Args:
+            experiment (schedy.Experiment): Experiment whose jobs are
+                processed.
+            func (callable): Function called with the dictionary of
+                hyperparameters of each job. It returns a dictionary of
+                results, or None. If it raises an exception, the job is marked
+                as ``CRASHED``. Otherwise it is marked as ``DONE``. With the
+                ``process`` executor, it must be picklable (i.e. defined at
+                the top level of a module).
+            workers (int): Number of jobs processed concurrently. Default: the
+                number of CPU cores.
+            executor (str): ``thread`` to run ``func`` in threads of this
+                process, or ``process`` to run it in other processes.
+            max_jobs (int): Maximum number of jobs to process. Default: no
+                limit.
+            poll_interval (float): Number of seconds to wait before asking for
+                new jobs again when the queue is empty. If None, :py:meth:`run`
+                returns as soon as the queue is empty and the running jobs are
+                finished.
+            memo (schedy.fingerprint.FingerprintIndex): If set, the jobs whose
+                hyperparameters were already used by a ``DONE`` job of the
+                index are completed with a copy of its results instead of
+                running ``func`` (see :py:meth:`schedy.Experiment.next_job`).
+                The jobs completed by this worker are added to the index.
+        '''
+        if executor not in EXECUTORS:
+            raise ValueError('Invalid executor: {!r}, expected one of {}.'.format(executor, ', '.join(EXECUTORS)))
+        if workers is None:
+            workers = _default_workers()
+        if workers < 1:
+            raise ValueError('The number of workers must be at least 1, found {}.'.format(workers))
+        self.experiment = experiment
+        self.func = func
+        self.workers = workers
+        self.executor = executor
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self.memo = memo
+
+    def run(self):
+        '''
+        Processes jobs until the queue is empty (or forever, if
+        ``poll_interval`` is set), or until ``max_jobs`` jobs were processed.
+
+        If this method is interrupted, the running jobs are marked as
+        ``CRASHED``.
+
+        Returns:
+            list of :py:class:`schedy.Job`: The processed jobs, in the order
+            in which they were finished.
+        '''
+        import concurrent.futures
+        if self.executor == 'process':
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        running = dict()
+        finished = []
+        num_claimed = 0
+        queue_empty = False
+        try:
+            while True:
+                # Keep all the workers busy
+                while not queue_empty and len(running) < self.workers and \
+                        (self.max_jobs is None or num_claimed < self.max_jobs):
+                    try:
+                        job = self.experiment.next_job(self.memo)
+                    except errors.NoJobError:
+                        queue_empty = True
+                        break
+                    num_claimed += 1
+                    running[pool.submit(self.func, dict(job.hyperparameters))] = job
+                if not running:
+                    if self.poll_interval is None or \
+                            (self.max_jobs is not None and num_claimed >= self.max_jobs):
+                        break
+                    time.sleep(self.poll_interval)
+                    queue_empty = False
+                    continue
+                # Wait until a worker is free, or until it is time to ask for
+                # new jobs again
+                timeout = self.poll_interval if queue_empty else None
+                done, _ = concurrent.futures.wait(list(running), timeout=timeout,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    self._finish_job(job, future)
+                    finished.append(job)
+                # Finished jobs may have caused the scheduler to create new
+                # ones (e.g. for Population Based Training)
+                queue_empty = False
+        except BaseException:
+            for future, job in running.items():
+                future.cancel()
+                job.status = job.CRASHED
+                try:
+                    job.put()
+                except errors.SchedyError:
+                    logger.warning('Could not mark job %s as crashed.', job.job_id, exc_info=True)
+            pool.shutdown(wait=False)
+            raise
+        pool.shutdown()
+        return finished
+
+    def _finish_job(self, job, future):
+        try:
+            results = future.result()
+            if results is not None:
+                job.results = dict(job.results)
+                job.results.update(results)
+        except Exception:
+            logger.error('Job %s crashed.', job.job_id, exc_info=True)
+            job.status = job.CRASHED
+        else:
+            job.status = job.DONE
+        try:
+            job.put()
+        except errors.SchedyError:
+            # Another worker may have updated the job in the meantime: report
+            # the error without stopping the other jobs
+            logger.error('Could not push the results of job %s.', job.job_id, exc_info=True)
+        else:
+            if self.memo is not None:
+                self.memo.add(job)
@@ -14,7 +14,13 @@ setup(
         'requests>=2.18.4',
         'tabulate>=0.8.2',
         'six>=1.11.0',
+        'futures>=3.2.0; python_version < "3"',
     ],
+    extras_require={
+        'numpy': ['numpy>=1.17'],
+        'http2': ['httpx[http2]>=0.18'],
+        'parquet': ['pyarrow'],
+    },
     packages=['schedy'],
     entry_points={
         'console_scripts': [